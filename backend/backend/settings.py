@@ -1,4 +1,4 @@
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 
 from pathlib import Path
@@ -31,7 +31,14 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'core','core.user','core.auth','core.post',
-    'core.comment',
+    'core.comment','core.tag','core.trending','core.archive',
+    'core.notification',
+    'core.moderation',
+    'core.analytics',
+    'core.shard',
+    'core.outbox',
+    'core.sync',
+    'core.revision',
     
 ]
 
@@ -39,6 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.abstract.compression.CompressionMiddleware', #gzip, br or zstd, before anything that reads the body
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,6 +90,12 @@ DATABASES = {
     }
 }
 
+SHARDS = config('SHARDS', default='', cast=Csv()) #aliases the posts, comments and likes are spread over by author, see core/shard/router.py; empty: all in default
+for alias in SHARDS:
+    if alias not in DATABASES: #a database per shard on the same server, SHARD_<ALIAS>_NAME to name it
+        DATABASES[alias] = {**DATABASES['default'], 'NAME': config(f'SHARD_{alias.upper()}_NAME', default=f"{DATABASES['default']['NAME']}_{alias}")}
+DATABASE_ROUTERS = ['core.shard.router.ShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,15 +138,52 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+COMPRESSED_CACHE_BYTES = config('COMPRESSED_CACHE_BYTES', default=32 * 1024 * 1024, cast=int) #per process with the default LocMemCache
+
+CACHES = { #throttling counters are kept in the cache, use a shared one (e.g. django.core.cache.backends.redis.RedisCache) when running several processes
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    },
+    'compressed': { #compressed response bodies by digest, kept apart so they never push the throttling counters out
+        'BACKEND': config('COMPRESSED_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('COMPRESSED_CACHE_LOCATION', default='compressed'),
+        'TIMEOUT': 600,
+        'OPTIONS': {'MAX_ENTRIES': COMPRESSED_CACHE_BYTES // (64 * 1024)}, #bodies over 64 KiB aren't kept (CACHE_MAX_SIZE of core/abstract/compression.py), so the entries take at most COMPRESSED_CACHE_BYTES
+    },
+}
+
+DUPLICATE_ACTION = config('DUPLICATE_ACTION', default='flag') #near-duplicate posts and comments: 'flag' or 'reject', see core/moderation/duplicates.py
+BANNED_TERMS_FILE = config('BANNED_TERMS_FILE', default='') #one term per line, on top of the BannedTerm table, see core/moderation/filter.py
+
 REST_FRAMEWORK= {
     'DEFAULT_AUTHENTICATION_CLASSES':(
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.auth.authentication.JWTAuthentication', #Simple JWT's JWTAuthentication + revoked tokens
     ),#This sets JWT (JSON Web Token) authentication as the default method for Django REST Framework — meaning all API requests must include a valid JWT token (usually in the Authorization header) to authenticate the user.
     'DEFAULT_FILTER_BACKENDS':['django_filters.rest_framework.DjangoFilterBackend'],# using the django-filter library — allows clients to filter query results via URL parameters (e.g., /users/?is_active=True)
     'DEFAULT_PAGINATION_CLASS' : 'rest_framework.pagination.LimitOffsetPagination', #This sets the default pagination style to LimitOffsetPagination, allowing clients to control how many results are returned (limit) and where to start (offset).
     "PAGE_SIZE":15, #This sets the default number of results per page to 15 when using pagination.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.abstract.renderers.FastJSONRenderer', #renders with msgspec when it is installed (pip install msgspec), with the stdlib json module otherwise
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': ['core.auth.throttling.SlidingWindowThrottle'], #views choose their scopes with throttle_scopes
+    'DEFAULT_THROTTLE_RATES': { #"10/min": at most 10 requests in any minute
+        'auth-ip': config('THROTTLE_AUTH_IP', default='30/min'),
+        'auth-email': config('THROTTLE_AUTH_EMAIL', default='10/min'),
+        'post-create-user': config('THROTTLE_POST_CREATE', default='30/min'),
+        'comment-create-user': config('THROTTLE_COMMENT_CREATE', default='60/min'),
+        'like-user': config('THROTTLE_LIKE', default='120/min'),
+        'search-user': config('THROTTLE_SEARCH', default='300/min'),
+    },
+    'DEFAULT_PARSER_CLASSES': [
+        'core.abstract.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),  # Set to any duration you want
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),     # Optional: change refresh token lifetime
+    'ROTATE_REFRESH_TOKENS': True, # every refresh returns a new refresh token and revokes the old one (core/auth/serializers/refresh.py)
 }
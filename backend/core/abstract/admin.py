@@ -0,0 +1,92 @@
+import json
+
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
+
+
+class SoftDeleteAdminMixin:
+    """The admin delete actions soft-delete like the API, the reaper (manage.py reap) removes the rows later
+    instead of one transaction cascading over every post, comment and like.
+
+    The bulk action calls soft_delete() on each object too, DELETE_CHUNK of them per transaction: its post_save
+    handlers write the sync Tombstone, the outbox event and take the notifications off the unread badge, which
+    an UPDATE of the queryset would skip."""
+    DELETE_CHUNK = 500
+
+    def delete_model(self, request, obj):
+        obj.soft_delete()
+
+    def delete_queryset(self, request, queryset):
+        pks = list(queryset.filter(deleted__isnull=True).values_list('pk', flat=True))
+        for start in range(0, len(pks), self.DELETE_CHUNK):
+            with transaction.atomic(using=queryset.db):
+                for obj in queryset.model._base_manager.using(queryset.db).filter(pk__in=pks[start:start + self.DELETE_CHUNK]):
+                    obj.soft_delete()
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator of the big changelists: on PostgreSQL the number of rows is the planner's estimate (EXPLAIN
+    of the changelist query, from the statistics of ANALYZE) instead of a COUNT(*) reading the whole table.
+    Below EXACT_BELOW rows the estimate is not trusted and the rows are counted, which is cheap then."""
+    EXACT_BELOW = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < self.EXACT_BELOW:
+            return super().count
+        return estimate
+
+
+def estimated_count(queryset):
+    """The planner's estimate of the rows of `queryset`, None on other databases than PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class LargeTableAdminMixin:
+    """Changelists of tables with millions of rows: estimated counts, and no second count of the unfiltered
+    table for the "N results (M total)" line."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class LookupFilter(admin.SimpleListFilter):
+    """A text box instead of the list of choices, for relations with too many rows to list: ?<parameter_name>=
+    filters on `lookup` with the value typed, e.g. an username, with the index of the related column."""
+    template = 'admin/lookup_filter.html'
+    lookup = None
+    placeholder = ''
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        # the other filters of the changelist, kept as hidden inputs of the form
+        params = changelist.get_filters_params()
+        params.pop(self.parameter_name, None)
+        yield {'query_parts': [(name, value) for name, values in params.items() for value in (values if isinstance(values, list) else [values])]}
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if value:
+            try:
+                return queryset.filter(**{self.lookup: value})
+            except (ValueError, ValidationError) as error: # e.g. ?post=notauuid, the changelist shows "?e=1"
+                raise IncorrectLookupParameters(error)
+        return queryset
@@ -0,0 +1,183 @@
+"""Compiled read path for the list endpoints.
+
+DRF builds every item of a list response field by field: get_attribute(), to_representation() and a
+ReturnDict for each post, plus a nested UserSerializer for its author. For a given serializer (the same
+fields and the same ?expand=) the work is always the same, so it is compiled once into:
+
+  * the flat list of columns it reads, fetched with values_list() with the author columns joined,
+  * a generated python function turning one row tuple into the output dict, keys in Meta.fields order.
+
+The output is the same as serializer.data, item for item. SerializerMethodFields depend on the request, so a
+serializer can only be compiled when each of them has a `<method_name>_batch(pks)` companion computing the
+value for a whole page at once (see PostSerializer.get_liked_batch). Anything the compiler does not know
+(other field types, a custom to_representation, a nullable expanded relation, ...) makes it fall back to the
+regular serializer."""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+
+from core.abstract.serializers import AbstractSerializer
+
+# the model already returns the exact value these fields output: CharField.to_representation is str(value),
+# BooleanField and IntegerField return bools and ints unchanged
+_IDENTITY_FIELDS = (serializers.CharField, serializers.EmailField, serializers.BooleanField, serializers.IntegerField)
+
+
+class NotCompilable(Exception):
+    pass
+
+
+def _file_url(storage, name, request):
+    # FileField.to_representation with the file name read by values_list() instead of a FieldFile
+    if not name:
+        return None
+    url = storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+class _Builder:
+    def __init__(self):
+        self.columns = []
+        self.namespace = {'_file_url': _file_url}
+
+    def column(self, path):
+        self.columns.append(path)
+        return f"row[{len(self.columns) - 1}]"
+
+    def constant(self, value):
+        name = f"_c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+
+def _not_null(expression, nullable, value):
+    # serializers output None for a None attribute without calling to_representation()
+    return f"(None if {value} is None else {expression})" if nullable else expression
+
+
+def _field_expression(builder, serializer, name, field, prefix, top):
+    model = serializer.Meta.model
+    source = field.source
+    if source == '*' or '.' in source:
+        raise NotCompilable(name)
+    try:
+        model_field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        raise NotCompilable(name)
+    if not model_field.concrete:
+        raise NotCompilable(name)
+
+    if name in serializer.expand:
+        if model_field.null:
+            raise NotCompilable(name) # the nested serializer would render an empty object
+        nested = serializer.expandable_fields[name]()
+        return _object_expression(builder, nested, f"{prefix}{source}__", top=False)
+
+    if isinstance(field, serializers.SlugRelatedField):
+        value = builder.column(f"{prefix}{source}__{field.slug_field}")
+        slug_field = model_field.related_model._meta.get_field(field.slug_field)
+        if name in serializer.expandable_fields and isinstance(slug_field, models.UUIDField):
+            return _not_null(f"{value}.hex", model_field.null, value) # see AbstractSerializer.to_representation
+        return value
+
+    value = builder.column(prefix + source)
+    if type(field) in _IDENTITY_FIELDS:
+        return value
+    if isinstance(field, serializers.UUIDField):
+        if field.uuid_format == 'hex_verbose':
+            return _not_null(f"str({value})", model_field.null, value)
+        return _not_null(f"{value}.{field.uuid_format}", model_field.null, value)
+    if isinstance(field, serializers.DateTimeField):
+        return _not_null(f"{builder.constant(field.to_representation)}({value})", model_field.null, value)
+    if isinstance(field, serializers.FileField) and getattr(field, 'use_url', True):
+        # nested serializers are built without a context, so without the request
+        request = "request" if top else "None"
+        return f"_file_url({builder.constant(model_field.storage)}, {value}, {request})"
+    raise NotCompilable(name)
+
+
+def _object_expression(builder, serializer, prefix, top):
+    if type(serializer).to_representation is not AbstractSerializer.to_representation:
+        raise NotCompilable(type(serializer).__name__)
+
+    items = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            if not top or not hasattr(serializer, f"{field.method_name}_batch"):
+                raise NotCompilable(name)
+            expression = f"batches[{name!r}][row[0]]"
+        else:
+            expression = _field_expression(builder, serializer, name, field, prefix, top)
+        items.append(f"{name!r}: {expression}")
+    return "{" + ", ".join(items) + "}"
+
+
+class CompiledSerializer:
+    def __init__(self, serializer):
+        builder = _Builder()
+        builder.column(serializer.Meta.model._meta.pk.name) # row[0], the key of the batched method fields
+        expression = _object_expression(builder, serializer, "", top=True)
+        exec(f"def build(row, batches, request):\n    return {expression}\n", builder.namespace)
+
+        self.columns = builder.columns
+        self.methods = {
+            name: f"{field.method_name}_batch"
+            for name, field in serializer.fields.items()
+            if isinstance(field, serializers.SerializerMethodField)
+        }
+        self._build = builder.namespace['build']
+
+    def queryset(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def represent(self, rows, serializer):
+        """Output of `serializer` for `rows`, the tuples of queryset()."""
+        pks = [row[0] for row in rows]
+        batches = {name: getattr(serializer, method)(pks) for name, method in self.methods.items()}
+        request = serializer.context.get('request')
+        build = self._build
+        return [build(row, batches, request) for row in rows]
+
+
+_compiled = {}
+
+
+def compile_serializer(serializer):
+    """The CompiledSerializer of a serializer instance, or None when it can't be compiled.
+
+    Compiled once per serializer class and set of fields, ?fields=/?expand= included."""
+    if not isinstance(serializer, AbstractSerializer):
+        return None
+    key = (type(serializer), tuple(serializer.fields), frozenset(serializer.expand))
+    try:
+        return _compiled[key]
+    except KeyError:
+        pass
+    try:
+        compiled = CompiledSerializer(serializer)
+    except NotCompilable:
+        compiled = None
+    _compiled[key] = compiled
+    return compiled
+
+
+def represent_pks(serializer, model, pks, using=None):
+    """Output of `serializer` for the `model` rows of `pks`, in the order of `pks`, read from `using` (a shard,
+    or a list of them when the rows may be on any, e.g. databases()) or the default database. Compiled when it
+    can be, pks of rows hidden by the manager (soft-deleted) are skipped."""
+    compiled = compile_serializer(serializer)
+    aliases = using if isinstance(using, (list, tuple)) else [using]
+    if compiled is not None:
+        rows = {}
+        for alias in aliases: #the ids of posts and comments are unique across the shards
+            rows.update((row[0], row) for row in compiled.queryset(model.objects.db_manager(alias).filter(pk__in=pks)))
+        return compiled.represent([rows[pk] for pk in pks if pk in rows], serializer)
+    objects = {}
+    for alias in aliases:
+        objects.update(serializer.narrow_queryset(model.objects.db_manager(alias).filter(pk__in=pks)).in_bulk())
+    return type(serializer)([objects[pk] for pk in pks if pk in objects], many=True, context=serializer.context).data
@@ -0,0 +1,195 @@
+"""Compresses the responses, see MIDDLEWARE in settings.py.
+
+The encoding is picked from the Accept-Encoding of the request: the one with the highest q-value among those
+installed, zstd, br and gzip (in that order of preference when the q-values tie). gzip is in the standard
+library, brotli and zstandard are optional dependencies like msgspec (pip install brotli zstandard).
+
+  * bodies under MIN_SIZE are sent as they are, the headers of a compressed body would cost more than it saves;
+  * a streaming response is compressed chunk by chunk, each chunk is flushed so the client gets it right away;
+  * a compressed body is kept in the `compressed` cache (CACHES in settings.py) under the digest of the body
+    and the encoding. A page served again unchanged, e.g. the post list that nothing wrote to since the last
+    request, costs a blake2b of the body instead of compressing it again. Only bodies up to CACHE_MAX_SIZE are
+    kept, and the cache holds COMPRESSED_CACHE_BYTES // CACHE_MAX_SIZE of them: a few tens of MB per process.
+
+Only the types in COMPRESSIBLE are compressed. The HTML pages (the admin) are left out: they carry the CSRF
+token next to the query string echoed back, what the BREACH attack guesses through the compressed size."""
+
+import hashlib
+import re
+import zlib
+
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError: # pip install brotli to enable br
+    brotli = None
+
+try:
+    import zstandard
+except ImportError: # pip install zstandard to enable zstd
+    zstandard = None
+
+MIN_SIZE = 1024 # bytes
+CACHE_MAX_SIZE = 64 * 1024 # bigger bodies are compressed for every request, not kept, see COMPRESSED_CACHE_BYTES in settings.py
+CACHE_ALIAS = 'compressed'
+COMPRESSIBLE = ('application/json', 'application/javascript', 'text/css', 'text/javascript', 'text/plain')
+
+GZIP_LEVEL = 6 # zlib's default
+BROTLI_QUALITY = 5 # 11, the default, is meant for static files compressed once
+ZSTD_LEVEL = 3 # zstandard's default
+
+_ACCEPT = re.compile(r'^\s*([^\s;]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def _gzip_compress(data):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) # 31: zlib's gzip container
+    return compressor.compress(data) + compressor.flush()
+
+
+class _GzipStream:
+    def __init__(self):
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def _brotli_compress(data):
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+class _BrotliStream:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data):
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+class _ZstdStream:
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def chunk(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def coders():
+    """{encoding: (compress, stream class)} of the installed encodings, the preferred one first."""
+    found = {}
+    if zstandard is not None:
+        found['zstd'] = (_zstd_compress, _ZstdStream)
+    if brotli is not None:
+        found['br'] = (_brotli_compress, _BrotliStream)
+    found['gzip'] = (_gzip_compress, _GzipStream)
+    return found
+
+
+CODERS = coders()
+
+
+def negotiate(accept_encoding, available=None):
+    """The encoding to answer an Accept-Encoding header with, None for none (identity)."""
+    available = list(CODERS if available is None else available)
+    weights = {}
+    for item in (accept_encoding or '').lower().split(','):
+        match = _ACCEPT.match(item)
+        if match is None:
+            continue
+        try:
+            weights[match.group(1)] = float(match.group(2)) if match.group(2) is not None else 1.0
+        except ValueError: # e.g. q=1.0.0
+            continue
+    best, best_weight = None, 0.0
+    for encoding in available: # in order of preference, a tie keeps the first one
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def _compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type in COMPRESSIBLE or content_type.endswith('+json')
+
+
+def _cached_compress(encoding, content):
+    compress = CODERS[encoding][0]
+    if len(content) > CACHE_MAX_SIZE:
+        return compress(content)
+    cache = caches[CACHE_ALIAS]
+    key = f'{encoding}:{hashlib.blake2b(content, digest_size=16).hexdigest()}'
+    compressed = cache.get(key)
+    if compressed is None:
+        compressed = compress(content)
+        cache.set(key, compressed)
+    return compressed
+
+
+def _stream(stream_class, chunks):
+    compressor = stream_class()
+    for chunk in chunks:
+        data = compressor.chunk(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _async_stream(stream_class, chunks):
+    compressor = stream_class()
+    async for chunk in chunks:
+        data = compressor.chunk(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compresses the response body with the encoding negotiate() picks, see the module docstring. Goes near
+    the top of MIDDLEWARE, before any middleware that reads or changes the body."""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not _compressible(response):
+            return response
+        if not response.streaming and len(response.content) < MIN_SIZE:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',)) # a cache in front must not serve one encoding to all
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+        stream_class = CODERS[encoding][1]
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _async_stream(stream_class, response.streaming_content)
+            else:
+                response.streaming_content = _stream(stream_class, response.streaming_content)
+            response.headers.pop('Content-Length', None) # not known before the last chunk
+        else:
+            compressed = _cached_compress(encoding, response.content)
+            if len(compressed) >= len(response.content): # e.g. a body of random tokens
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'): # the bytes differ from the uncompressed ones, like GZipMiddleware does
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -3,25 +3,47 @@ or attributes that must be created within any child classes built from the abstr
  In this file, we will write two classes: AbstractModel and AbstractManager.
  The AbstractModel class will contain fields such as public_id, created, and updated. 
 On the other side, the AbstractManager class will contain the function used to retrieve an object 
-by its public_id field"""
+by its public_id field
 
-from django.db import models
+Deleting goes in two steps: soft_delete() only sets `deleted`, which hides the row from AbstractManager (and
+so from the API) right away, and the reaper (manage.py reap, see core/reaper.py) removes the rows later in
+small batches."""
+
+from django.db import models, transaction
+from django.utils import timezone
 import uuid
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import Http404
 
+from core.abstract.objectcache import cached
+
 class AbstractManager(models.Manager): #models.Manager is Django’s base class for model managers — it provides
     #the interface through which database query operations are made (like User.objects.all() or 
     # User.objects.create())
+    hidden_with = () #relations whose soft deletion also hides the rows, e.g. ("author",): the posts of a deleted
+    #user disappear with the user, before the reaper gets to them
+
+    def get_queryset(self): #every query through Model.objects skips the soft-deleted rows
+        queryset = super().get_queryset().filter(deleted__isnull=True)
+        for relation in self.hidden_with:
+            queryset = queryset.filter(**{f"{relation}__deleted__isnull": True})
+        return queryset
+
+    def with_deleted(self): #all the rows, soft-deleted ones included (used by the reaper)
+        return super().get_queryset()
+
     def get_object_by_public_id(self, public_id): #Tries to retrieve an object with the given public_id.
+        from core.shard.router import db_for_public_id
         try:
-            instance = self.get(public_id = public_id) #The public_id is typically passed through the ViewSet — 
+            manager = self.db_manager(db_for_public_id(self.model, public_id)) #the shard of a post or comment, see core/shard/router.py
+            instance = cached((self.model, str(public_id)), lambda: manager.get(public_id = public_id)) #loaded once per /api/batch/ call, see core/abstract/objectcache.py
+            #The public_id is typically passed through the ViewSet — 
             #often extracted from the URL (self.kwargs['pk']), then used in the ORM query like:
             # User.objects.get_object_by_public_id(public_id)
             return instance
         except (ObjectDoesNotExist, ValueError, TypeError):
-            return Http404
+            raise Http404
         
 
 class AbstractModel(models.Model):
@@ -31,10 +53,20 @@ class AbstractModel(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True) # auto_now_add=True sets the timestamp only once when the object 
     #is created, while auto_now=True updates it automatically every time the object is saved.
+    deleted = models.DateTimeField(null=True, blank=True, db_index=True, editable=False) #set by soft_delete()
     
     objects = AbstractManager() #assigns your custom manager (AbstractManager) to the model, enabling custom query
     #methods (like get_object_by_public_id) through Model.objects.
     
+    def save_base(self, *args, using=None, **kwargs): #the post_save handlers run in the transaction of the save,
+        #the change event of core/outbox/signals.py commits (or rolls back) with the row
+        with transaction.atomic(using=using, savepoint=False):
+            super().save_base(*args, using=using, **kwargs)
+
+    def soft_delete(self): #hides the object now, core/reaper.py deletes it and what depends on it later
+        self.deleted = timezone.now()
+        self.save(update_fields=['deleted'])
+
     class Meta:
         abstract = True #class Meta: abstract = True marks the model as abstract, meaning Django won't create 
         #a database table for it — it's meant to be inherited by other models to reuse common fields or logic.
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""Objects shared by the sub-requests of one /api/batch/ call (see core/batch.py).
+
+Inside object_cache(), get_object_by_public_id() loads each (model, public_id) once: a post detail and the
+comments of the post, or the author profile read twice, share the same instance. Any write clears it, so a
+GET after a POST/PATCH in the same batch sees the new state. Outside of a batch nothing is cached."""
+
+import contextlib
+import contextvars
+
+_objects = contextvars.ContextVar('batch_objects', default=None)
+
+
+@contextlib.contextmanager
+def object_cache():
+    token = _objects.set({})
+    try:
+        yield
+    finally:
+        _objects.reset(token)
+
+
+def cached(key, load):
+    objects = _objects.get()
+    if objects is None:
+        return load()
+    try:
+        return objects[key]
+    except KeyError:
+        value = objects[key] = load() #exceptions (e.g. Http404) are not cached
+        return value
+
+
+def clear():
+    objects = _objects.get()
+    if objects is not None:
+        objects.clear()
@@ -0,0 +1,27 @@
+"""JSON parser used for every API request body, the counterpart of core.abstract.renderers.FastJSONRenderer.
+msgspec decodes the body bytes directly when it is installed, DRF's stdlib json parser is used otherwise."""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core.abstract.renderers import FastJSONRenderer, msgspec
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        # msgspec never accepts NaN/Infinity, a non strict parser has to go through json.load
+        if msgspec is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+        try:
+            if encoding.lower().replace('-', '') != 'utf8': # msgspec only reads utf-8
+                body = body.decode(encoding).encode()
+            return msgspec.json.decode(body)
+        except (msgspec.DecodeError, UnicodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,53 @@
+"""JSON renderer used for every API response (see REST_FRAMEWORK in settings.py).
+
+It renders with msgspec when it is installed: msgspec encodes dicts, lists, UUIDs, datetimes and Decimals in C
+straight to bytes instead of going through json.dumps and a Python `default()` call for every UUID and datetime.
+When msgspec is not installed the stdlib json encoder of DRF is used, so msgspec stays an optional dependency.
+Both paths write the responses byte for byte like JSONRenderer: a UUID object (e.g. a SlugRelatedField on
+public_id) as str(uuid) with its dashes; AbstractSerializer.id is a hex string already."""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgspec
+except ImportError: # pip install msgspec to enable the fast path
+    msgspec = None
+
+
+def _enc_hook(obj):
+    # msgspec calls this for the types it does not know (lazy translations, querysets, ...), DRF's encoder
+    # already knows what to do with them. Subclasses of str/int/float, like DRF's ErrorDetail, are also sent
+    # here while json.dumps writes them as their base type.
+    for base in (str, int, float):
+        if isinstance(obj, base):
+            return base(obj)
+    return JSONEncoder().default(obj)
+
+
+_LINE_SEPARATORS = (b'\xe2\x80\xa8', b'\xe2\x80\xa9') # U+2028 and U+2029 encoded in utf-8
+
+
+class FastJSONRenderer(JSONRenderer):
+    if msgspec is not None:
+        _encoder = msgspec.json.Encoder(enc_hook=_enc_hook, uuid_format='canonical', decimal_format='number')
+    else:
+        _encoder = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # msgspec always writes compact utf-8, the settings asking for something else go through json.dumps
+        if self._encoder is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        ret = self._encoder.encode(data)
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None:
+            ret = msgspec.json.format(ret, indent=indent)
+
+        # same as JSONRenderer: escape U+2028 and U+2029 so the output is also valid javascript
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(_LINE_SEPARATORS[0], b'\\u2028').replace(_LINE_SEPARATORS[1], b'\\u2029')
+        return ret
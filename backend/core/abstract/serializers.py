@@ -1,15 +1,100 @@
-"""All the objects sent back as a response in our API will contain the id, created, and updated fields. 
-It’ll be repetitive to write these fields all over again on every ModelSerializer, so let’s just create 
-an AbstractSerializer class. """
+"""All the objects sent back as a response in our API will contain the id, created, and updated fields.
+It’ll be repetitive to write these fields all over again on every ModelSerializer, so let’s just create
+an AbstractSerializer class.
 
+Clients can also ask for a sparse response: ?fields=id,body keeps only the listed fields and ?expand=author
+replaces a related public_id with the nested object. Fields that are not requested are removed from the
+serializer before anything is rendered, so their SerializerMethodField methods are never called."""
 
+
+import uuid
+
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
 
-class AbstractSerializer(serializers.ModelSerializer): #serializers.ModelSerializer is a Django REST Framework 
-    #class that auto-generates serializer fields from a model — simplifying conversion between model instances 
+
+def _csv_param(request, name):
+    value = request.query_params.get(name) if request is not None else None
+    if value is None:
+        return None
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+class AbstractSerializer(serializers.ModelSerializer): #serializers.ModelSerializer is a Django REST Framework
+    #class that auto-generates serializer fields from a model — simplifying conversion between model instances
     # and JSON.
-    id = serializers.UUIDField(source='public_id', read_only =True, format= 'hex') #creates a serializer 
-    #field id that pulls its value from the model's public_id field (source='public_id'), formats the UUID as 
-    # a hex string (format='hex') for easy readability in JSON. 
+    id = serializers.UUIDField(source='public_id', read_only =True, format= 'hex') #creates a serializer
+    #field id that pulls its value from the model's public_id field (source='public_id'), formats the UUID as
+    # a hex string (format='hex') for easy readability in JSON.
     created = serializers.DateTimeField(read_only= True)
-    updated = serializers.DateTimeField(read_only= True)
\ No newline at end of file
+    updated = serializers.DateTimeField(read_only= True)
+
+    expandable_fields = {} # field name -> serializer used for the nested representation, e.g. {"author": UserSerializer}
+    default_expand = () # what is expanded when the client sends neither ?fields= nor ?expand=
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = _csv_param(request, 'fields')
+        expand = _csv_param(request, 'expand')
+        self.sparse = requested is not None or expand is not None
+        self.expand = (expand or set()) if self.sparse else set(self.default_expand)
+        self.expand &= set(self.expandable_fields)
+        if requested is not None:
+            for name in list(self.fields):
+                if name not in requested:
+                    self.fields.pop(name) # popped fields are never bound, so nothing computes them
+
+    def to_representation(self, instance):
+        rep = super().to_representation(instance)
+        for name, serializer_class in self.expandable_fields.items():
+            if name not in rep:
+                continue
+            if name in self.expand:
+                # instance.<name> is already loaded when the queryset went through narrow_queryset()
+                rep[name] = serializer_class(getattr(instance, name)).data
+            elif isinstance(rep[name], uuid.UUID):
+                rep[name] = rep[name].hex # same format as the `id` of the expanded object
+        return rep
+
+    @classmethod
+    def _model_paths(cls, serializer_fields, model, prefix=""):
+        """Model field paths read by `serializer_fields`, used to build the only() of the queryset."""
+        paths = []
+        for field in serializer_fields.values():
+            source = field.source
+            if source == '*' or '.' in source:
+                continue
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue # SerializerMethodField and properties only need the primary key
+            if model_field.concrete:
+                paths.append(prefix + source)
+        return paths
+
+    def narrow_queryset(self, queryset):
+        """Load only the columns and relations the response will read.
+
+        Related objects rendered as a slug (the author public_id) or expanded (the nested author) are joined
+        with select_related instead of being fetched once per row."""
+        model = self.Meta.model
+        paths = [model._meta.pk.name]
+        related = []
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in self.expand:
+                nested = self.expandable_fields[name]()
+                paths += self._model_paths(nested.fields, nested.Meta.model, prefix=f"{field.source}__")
+                related.append(field.source)
+            elif isinstance(field, serializers.SlugRelatedField):
+                paths.append(f"{field.source}__{field.slug_field}")
+                related.append(field.source)
+            else:
+                paths += self._model_paths({name: field}, model)
+        if related:
+            queryset = queryset.select_related(*related)
+        if self.sparse:
+            queryset = queryset.only(*paths)
+        return queryset
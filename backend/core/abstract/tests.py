@@ -0,0 +1,206 @@
+import datetime
+import decimal
+import io
+import uuid
+
+import pytest
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.abstract.parsers import FastJSONParser
+from core.abstract.renderers import FastJSONRenderer
+from core.fixtures.user import user
+from core.fixtures.post import post
+
+
+def test_fast_renderer_native_types():
+    public_id = uuid.uuid4()
+    data = {
+        "id": public_id,
+        "created": datetime.datetime(2024, 5, 1, 12, 30, 15, 250000, tzinfo=datetime.timezone.utc),
+        "price": decimal.Decimal("1.50"),
+        "body": "café  ",
+    }
+
+    rendered = FastJSONRenderer().render(data)
+
+    assert isinstance(rendered, bytes)
+    assert rendered == (
+        b'{"id":"%s","created":"2024-05-01T12:30:15.250000Z","price":1.50,"body":"caf\xc3\xa9 \\u2028"}'
+        % str(public_id).encode()
+    )
+    assert FastJSONParser().parse(io.BytesIO(rendered))["id"] == str(public_id)
+
+
+def test_fast_renderer_builtin_subclasses():
+    from rest_framework.exceptions import ErrorDetail
+
+    data = {"detail": [ErrorDetail("Not found.", code="not_found")]}
+
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_fast_parser_rejects_invalid_json():
+    with pytest.raises(ParseError):
+        FastJSONParser().parse(io.BytesIO(b'{"body": NaN}'))
+
+
+@pytest.mark.django_db
+def test_post_list_renders_like_stdlib(client, post):
+    response = client.get("/api/post/")
+
+    assert response.content == JSONRenderer().render(response.data)
+
+
+@pytest.mark.django_db
+def test_uuid_fields_render_like_stdlib(client, user, post):
+    from core.comment.models import Comment
+
+    comment = Comment.objects.create(author=user, post=post, body="Nice")
+    response = client.get(f"/api/post/{post.public_id.hex}/comment/{comment.public_id.hex}/")
+
+    assert response.content == JSONRenderer().render(response.data)
+    assert response.json()["post"] == str(post.public_id) # a SlugRelatedField on public_id, with its dashes
+
+
+@pytest.mark.django_db
+def test_admin_changelists_do_not_grow_with_rows(client, user, post, django_assert_max_num_queries):
+    from core.comment.models import Comment
+    from core.post.models import Post
+    from core.user.models import User
+
+    admin = User.objects.create_superuser(username="admin", email="admin@gmail.com", password="admin_password")
+    client.force_login(admin)
+    for i in range(3):
+        Comment.objects.create(author=user, post=Post.objects.create(author=user, body=f"Post {i}"), body=f"Comment {i}")
+
+    for url in ("/admin/core_post/post/", "/admin/core_comment/comment/", "/admin/core_user/user/"):
+        with django_assert_max_num_queries(8): # session, user, count and one page, whatever the rows
+            assert client.get(url).status_code == 200
+
+    response = client.get("/admin/core_post/post/", {"author": "admin"})
+    assert response.context["cl"].result_count == 0
+    response = client.get("/admin/core_comment/comment/", {"post": post.public_id.hex})
+    assert response.context["cl"].result_count == 0
+    assert b'placeholder="username"' in response.content
+    response = client.get("/admin/core_comment/comment/", {"post": "notauuid"}) # not a 500
+    assert response.status_code == 302 and response.url.endswith("?e=1")
+
+
+@pytest.mark.django_db
+def test_admin_bulk_delete_soft_deletes_each_object(client, user, post):
+    from core.notification.delivery import deliver
+    from core.notification.models import UnreadCounter
+    from core.outbox.models import DELETED, ChangeEvent
+    from core.post.models import Post
+    from core.sync.models import Tombstone
+    from core.user.models import User
+
+    admin = User.objects.create_superuser(username="admin", email="admin@gmail.com", password="admin_password")
+    admin.like(post)
+    deliver()
+    client.force_login(admin)
+
+    response = client.post("/admin/core_post/post/", {"action": "delete_selected", "_selected_action": [post.pk], "post": "yes"})
+
+    assert response.status_code == 302
+    assert Post._base_manager.get(pk=post.pk).deleted is not None
+    assert Tombstone.objects.filter(public_id=post.public_id).exists()
+    assert ChangeEvent.objects.filter(key=post.public_id.hex, action=DELETED).exists()
+    assert UnreadCounter.objects.get(user=user).unread == 0
+
+
+@pytest.mark.django_db
+def test_estimated_count(user, post):
+    from django.db import connection
+    from core.abstract.admin import EstimatedCountPaginator, estimated_count
+    from core.post.models import Post
+
+    estimate = estimated_count(Post.objects.all())
+    if connection.vendor == "postgresql":
+        assert isinstance(estimate, int) and estimate >= 0
+    else:
+        assert estimate is None
+    assert EstimatedCountPaginator(Post.objects.order_by("pk"), 10).count == 1 # exact below EXACT_BELOW
+
+
+def test_negotiate_encoding():
+    from core.abstract.compression import negotiate
+
+    available = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, deflate, br, zstd", available) == "zstd" # a tie goes to the preferred one
+    assert negotiate("gzip;q=1.0, br;q=0.8", available) == "gzip"
+    assert negotiate("br;q=0, *;q=0.5", available) == "zstd"
+    assert negotiate("gzip, br", ["gzip"]) == "gzip" # brotli not installed
+    assert negotiate("identity", available) is None
+    assert negotiate("gzip;q=0", available) is None
+    assert negotiate("", available) is None
+    assert negotiate("gzip;q=nope, br;q=1.0.0", available) is None
+
+
+def _decompress(encoding, data):
+    if encoding == "gzip":
+        import gzip
+        return gzip.decompress(data)
+    if encoding == "br":
+        import brotli
+        return brotli.decompress(data)
+    import zstandard
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data) # streamed frames have no size
+
+
+@pytest.mark.django_db
+def test_post_list_compressed(client, user, monkeypatch):
+    from django.core.cache import caches
+    from core.abstract import compression
+    from core.post.models import Post
+
+    for number in range(20):
+        Post.objects.create(author=user, body=f"Post number {number} with a body long enough to be worth compressing")
+    caches[compression.CACHE_ALIAS].clear()
+    calls = []
+    compress, stream_class = compression.CODERS["gzip"]
+    monkeypatch.setitem(compression.CODERS, "gzip", (lambda data: calls.append(data) or compress(data), stream_class))
+
+    plain = client.get("/api/post/")
+    first = client.get("/api/post/", HTTP_ACCEPT_ENCODING="gzip")
+    second = client.get("/api/post/", HTTP_ACCEPT_ENCODING="gzip")
+
+    assert "Content-Encoding" not in plain
+    assert first["Content-Encoding"] == "gzip" and "Accept-Encoding" in first["Vary"]
+    assert int(first["Content-Length"]) == len(first.content) < len(plain.content)
+    assert _decompress("gzip", first.content) == plain.content
+    assert second.content == first.content
+    assert len(calls) == 1 # the second body came from the cache
+
+    small = client.get(f"/api/user/{user.public_id.hex}/", HTTP_ACCEPT_ENCODING="gzip")
+    assert "Content-Encoding" not in small
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "br", "gzip"])
+def test_streaming_response_compressed(encoding):
+    import asyncio
+    from django.http import StreamingHttpResponse
+    from django.test import RequestFactory
+    from core.abstract.compression import CODERS, CompressionMiddleware
+
+    if encoding not in CODERS:
+        pytest.skip(f"{encoding} is not installed")
+    chunks = [b'{"results": [', *(b'{"id": %d, "body": "a chunk"},' % number for number in range(200)), b"{}]}"]
+    request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=encoding)
+    middleware = CompressionMiddleware(lambda request: None)
+
+    response = middleware.process_response(request, StreamingHttpResponse(iter(chunks), content_type="application/json"))
+    assert response["Content-Encoding"] == encoding and not response.has_header("Content-Length")
+    assert _decompress(encoding, b"".join(response.streaming_content)) == b"".join(chunks)
+
+    async def produce():
+        for chunk in chunks:
+            yield chunk
+
+    async def consume(response):
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    response = middleware.process_response(request, StreamingHttpResponse(produce(), content_type="application/json"))
+    assert response.is_async
+    assert _decompress(encoding, asyncio.run(consume(response))) == b"".join(chunks)
@@ -1,12 +1,40 @@
 from rest_framework import viewsets
+from rest_framework.response import Response
 from rest_framework import filters #This imports Django REST Framework’s built-in filtering classes (like 
 #SearchFilter, OrderingFilter) to enable features like search and ordering in your API views or viewsets.
 
-class AbstractViewSet(viewsets.ModelViewSet): #This defines a reusable base viewset by extending ModelViewSet,
+from core.abstract.compiled import compile_serializer
+from core.auth.throttling import ThrottleFirstMixin
+
+class AbstractViewSet(ThrottleFirstMixin, viewsets.ModelViewSet): #This defines a reusable base viewset by extending ModelViewSet,
     #which bundles common CRUD operations (list, create, retrieve, update, delete) into a single class — useful 
     # for shared behavior across multiple viewsets.
     filter_backends = [filters.OrderingFilter] #enables sorting of API results by specified fields using the 
     #?ordering= query parameter (e.g., ?ordering=created or ?ordering=-username).
     ordering_fields = ['updated', 'created']
     ordering = ['-updated'] #sets the default sort order of query results to descending by the updated 
-    #field (most recently updated items first).
\ No newline at end of file
+    #field (most recently updated items first).
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_serializer()
+        if hasattr(serializer, 'narrow_queryset'): #AbstractSerializer knows which columns and relations the
+            #response reads (?fields=/?expand=), list endpoints load only those with only()/select_related().
+            queryset = serializer.narrow_queryset(queryset)
+        return queryset
+
+    def perform_destroy(self, instance): #DELETE only hides the object, see AbstractModel.soft_delete()
+        instance.soft_delete()
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        compiled = compile_serializer(serializer) #None when the serializer has fields the compiled read path
+        #doesn't know, see core/abstract/compiled.py
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = compiled.queryset(self.filter_queryset(self.get_queryset())) #rows as values_list() tuples
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(compiled.represent(page, serializer))
+        return Response(compiled.represent(list(queryset), serializer))
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import DailyStats
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(admin.ModelAdmin): #read-only, the rows are written by manage.py rollup
+    list_display = ('day', 'posts', 'comments', 'likes', 'new_users', 'active_authors')
+    date_hierarchy = 'day'
+    ordering = ('-day',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
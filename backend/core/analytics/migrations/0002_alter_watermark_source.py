@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='watermark',
+            name='source',
+            field=models.CharField(max_length=80, primary_key=True, serialize=False),
+        ),
+    ]
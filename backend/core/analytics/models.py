@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class DailyStats(models.Model):
+    """Everything /api/analytics/ and the admin show about a day, written by core/analytics/rollup.py only."""
+    day = models.DateField(primary_key=True)
+    posts = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0) #likes given that day, unlikes are not subtracted
+    new_users = models.PositiveIntegerField(default=0)
+    active_authors = models.PositiveIntegerField(default=0) #users with a post or a comment that day
+
+    class Meta:
+        verbose_name_plural = 'daily stats'
+
+
+class AuthorDay(models.Model):
+    """What one user wrote and received on one day. Kept when the user is deleted, the history doesn't change."""
+    day = models.DateField()
+    author = models.ForeignKey("core_user.User", on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    posts = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    likes_received = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['day', 'author'], name='unique_author_day')]
+
+
+class Watermark(models.Model):
+    """How far a source table is rolled up: rows created before `created` or, for the likes which have no
+    date, with a primary key up to `position`. A source on a shard is named `post@<alias>`, see rollup.py."""
+    source = models.CharField(max_length=80, primary_key=True)
+    created = models.DateTimeField(null=True)
+    position = models.BigIntegerField(default=0)
@@ -0,0 +1,167 @@
+"""Daily rollups of the posts, comments, likes and signups, so analytics never GROUP BY the live tables.
+
+Each source has a Watermark. A rollup reads only the rows past it, with the `created` indexes, adds them up
+per day (and per author) into DailyStats and AuthorDay, and moves the watermark, all in one transaction, so a
+row is counted exactly once. Rows created in the last LAG are left for the next run: `created` is set before
+the INSERT commits, a transaction still running could otherwise land behind the watermark. A run covers at
+most STEP of history per source, the first ones (or `manage.py rollup --backfill`) catch up step by step.
+
+The likes table (User.posts_liked) has no date, its watermark is the primary key: the likes added since the
+previous run are counted on the day of the run. Running it every few minutes (`manage.py rollup --interval`)
+dates them closely enough. The likes that exist when the rollups start are not dated, so not counted, and
+for the same reason a backfill keeps the likes already rolled up and their watermark.
+
+With SHARDS set, the posts, comments and likes of each of databases() are a source of their own (`post@<alias>`,
+see _source()); the signups are on `default`. A reshard (core/shard/mover.py) copies the likes of the moved posts
+with new ids, the target counts them again on the day of its next run."""
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.analytics.models import AuthorDay, DailyStats, Watermark
+from core.comment.models import Comment
+from core.post.models import Post
+from core.shard.router import databases
+from core.user.models import User
+
+Like = User.posts_liked.through
+
+LAG = timedelta(minutes=1)
+STEP = timedelta(days=7)
+LIKES_CHUNK = 50000
+
+DAY_FIELDS = ('posts', 'comments', 'likes', 'new_users')
+AUTHOR_FIELDS = ('posts', 'comments', 'likes_received')
+
+
+def _source(name, using):
+    # the watermark of a table on a shard, `default` keeps the plain name
+    return name if using == DEFAULT_DB_ALIAS else f'{name}@{using}'
+
+
+def _watermark(source):
+    watermark, _ = Watermark.objects.select_for_update().get_or_create(source=source)
+    return watermark
+
+
+def _start(watermark, model, using):
+    # the first run of a source starts at its oldest row
+    if watermark.created is None:
+        watermark.created = model._base_manager.using(using).aggregate(oldest=Min('created'))['oldest']
+    return watermark.created
+
+
+def _created(source, model, field, until, days, authors=None, using=DEFAULT_DB_ALIAS):
+    """Add up the rows of `model` on `using` past the watermark of `source` into `field`, returns True when
+    caught up with `until`."""
+    watermark = _watermark(_source(source, using))
+    since = _start(watermark, model, using)
+    if since is None: # an empty table, nothing to wait for
+        return True
+    end = min(until, since + STEP)
+    rows = model._base_manager.using(using).filter(created__gte=since, created__lt=end).annotate(day=TruncDate('created'))
+    if authors is None:
+        for day, count in rows.values('day').annotate(count=Count('pk')).values_list('day', 'count'):
+            days[day][field] += count
+    else:
+        for day, author_id, count in rows.values('day', 'author_id').annotate(count=Count('pk')).values_list('day', 'author_id', 'count'):
+            days[day][field] += count
+            authors[day, author_id][field] += count
+    watermark.created = end
+    watermark.save()
+    return end >= until
+
+
+def _likes(now, days, authors, using=DEFAULT_DB_ALIAS):
+    watermark = _watermark(_source('like', using))
+    if watermark.created is None: # the likes that exist now are not dated, start after them
+        watermark.created = now
+        watermark.position = Like.objects.using(using).aggregate(last=Max('pk'))['last'] or 0
+        watermark.save()
+        return True
+    rows = list(
+        Like.objects.using(using).filter(pk__gt=watermark.position).order_by('pk')
+        .values_list('pk', 'post__author_id')[:LIKES_CHUNK]
+    )
+    day = timezone.localdate(now)
+    for _, author_id in rows:
+        days[day]['likes'] += 1
+        authors[day, author_id]['likes_received'] += 1
+    if rows:
+        watermark.position = rows[-1][0]
+    watermark.created = now
+    watermark.save()
+    return len(rows) < LIKES_CHUNK
+
+
+def _apply(days, authors):
+    stats = DailyStats.objects.select_for_update().in_bulk(list(days))
+    for day, counts in days.items():
+        row = stats.get(day) or DailyStats(day=day)
+        for field in DAY_FIELDS:
+            setattr(row, field, getattr(row, field) + counts[field])
+        stats[day] = row
+    existing = {
+        (row.day, row.author_id): row
+        for row in AuthorDay.objects.select_for_update().filter(day__in={day for day, _ in authors}, author_id__in={a for _, a in authors})
+    }
+    created = []
+    for key, counts in authors.items():
+        row = existing.get(key)
+        if row is None:
+            row = AuthorDay(day=key[0], author_id=key[1])
+            created.append(row)
+        for field in AUTHOR_FIELDS:
+            setattr(row, field, getattr(row, field) + counts[field])
+    AuthorDay.objects.bulk_update([existing[key] for key in authors if key in existing], AUTHOR_FIELDS, batch_size=500)
+    AuthorDay.objects.bulk_create(created, batch_size=500)
+
+    active = dict(
+        AuthorDay.objects.filter(Q(posts__gt=0) | Q(comments__gt=0), day__in=list(days))
+        .values('day').annotate(count=Count('pk')).values_list('day', 'count')
+    )
+    for day, row in stats.items():
+        row.active_authors = active.get(day, 0)
+    DailyStats.objects.bulk_create(
+        stats.values(), batch_size=500,
+        update_conflicts=True, unique_fields=['day'], update_fields=[*DAY_FIELDS, 'active_authors'],
+    )
+
+
+def rollup(now=None):
+    """Roll up the rows past the watermarks, returns True once every source is caught up."""
+    now = now or timezone.now()
+    until = now - LAG
+    days, authors = defaultdict(Counter), defaultdict(Counter)
+    with transaction.atomic():
+        done = _created('user', User, 'new_users', until, days)
+        for alias in databases():
+            done = all([
+                _created('post', Post, 'posts', until, days, authors, alias),
+                _created('comment', Comment, 'comments', until, days, authors, alias),
+                _likes(now, days, authors, alias),
+            ]) and done
+        if days:
+            _apply(days, authors)
+    return done
+
+
+def backfill(progress=None):
+    """Roll up the posts, comments and signups of the whole history again. The likes columns and the like
+    watermark are kept, the likes can't be dated again."""
+    with transaction.atomic():
+        DailyStats.objects.filter(likes=0).delete()
+        DailyStats.objects.update(posts=0, comments=0, new_users=0, active_authors=0)
+        AuthorDay.objects.filter(likes_received=0).delete()
+        AuthorDay.objects.update(posts=0, comments=0)
+        Watermark.objects.exclude(Q(source='like') | Q(source__startswith='like@')).delete()
+    runs = 0
+    while not rollup():
+        runs += 1
+        if progress:
+            progress(runs)
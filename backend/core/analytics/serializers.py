@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+from core.analytics.models import DailyStats
+
+
+class DailyStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyStats
+        fields = ['day', 'posts', 'comments', 'likes', 'new_users', 'active_authors']
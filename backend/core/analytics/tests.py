@@ -0,0 +1,86 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from rest_framework.test import APIClient
+
+from core.analytics.models import AuthorDay, DailyStats
+from core.analytics.rollup import backfill, rollup
+from core.comment.models import Comment
+from core.fixtures.user import user
+from core.post.models import Post
+from core.user.models import User
+
+NOW = datetime(2026, 3, 10, 12, tzinfo=dt_timezone.utc)
+
+
+def _at(obj, when):
+    type(obj)._base_manager.filter(pk=obj.pk).update(created=when)
+
+
+def _stats(day):
+    return DailyStats.objects.filter(day=day).values_list("posts", "comments", "likes", "new_users", "active_authors").get()
+
+
+@pytest.mark.django_db
+def test_rollups_are_incremental(user):
+    other = User.objects.create_user(username="other", email="other@gmail.com", password="test_password")
+    for who in (user, other):
+        _at(who, NOW - timedelta(days=2))
+    first = Post.objects.create(author=user, body="Monday")
+    _at(first, NOW - timedelta(days=1))
+    _at(Comment.objects.create(author=other, post=first, body="Nice"), NOW - timedelta(days=1))
+    _at(Post.objects.create(author=user, body="Too recent"), NOW - timedelta(seconds=10)) # for the next run
+
+    assert rollup(NOW)
+    assert _stats(date(2026, 3, 8)) == (0, 0, 0, 2, 0)
+    assert _stats(date(2026, 3, 9)) == (1, 1, 0, 0, 2)
+    assert not DailyStats.objects.filter(day=date(2026, 3, 10)).exists()
+
+    other.like(first) # the likes are dated by the run that sees them
+    _at(Post.objects.create(author=other, body="Tuesday"), NOW + timedelta(minutes=5))
+    assert rollup(NOW + timedelta(minutes=10))
+    assert rollup(NOW + timedelta(minutes=10)) # nothing new, nothing counted twice
+
+    assert _stats(date(2026, 3, 10)) == (2, 0, 1, 0, 2)
+    assert AuthorDay.objects.filter(day=date(2026, 3, 10), author=user).values_list("posts", "likes_received").get() == (1, 1)
+    assert _stats(date(2026, 3, 9)) == (1, 1, 0, 0, 2)
+
+
+@pytest.mark.django_db
+def test_backfill_catches_up_by_steps(user):
+    _at(user, NOW - timedelta(weeks=3))
+    for weeks in range(4):
+        _at(Post.objects.create(author=user, body=f"Week {weeks}"), NOW - timedelta(weeks=weeks))
+    rollup(NOW + timedelta(hours=1))
+    User.objects.create_user(username="fan", email="fan@gmail.com", password="test_password").like(Post.objects.first())
+    rollup(NOW + timedelta(hours=2)) # the like is dated on the day of this run
+    DailyStats.objects.update(posts=99) # wrong rollups are rebuilt
+
+    backfill()
+
+    assert sorted(DailyStats.objects.values_list("posts", flat=True)) == [1, 1, 1, 1]
+    assert sum(DailyStats.objects.values_list("new_users", flat=True)) == 1 # the fan signed up in the last LAG
+    assert sum(DailyStats.objects.values_list("likes", flat=True)) == 1 # not dated again, kept
+    assert sum(AuthorDay.objects.values_list("likes_received", flat=True)) == 1
+
+
+@pytest.mark.django_db
+def test_analytics_endpoints_are_staff_only(user, django_assert_max_num_queries):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    assert client.get("/api/analytics/").status_code == 403
+
+    DailyStats.objects.create(day=date(2026, 3, 9), posts=3, active_authors=1)
+    AuthorDay.objects.create(day=date(2026, 3, 9), author=user, posts=3, likes_received=2)
+    user.is_staff = True
+    user.save()
+
+    with django_assert_max_num_queries(1): # the rollup table only
+        response = client.get("/api/analytics/?start=2026-03-01&end=2026-03-31")
+    assert response.json()["results"] == [
+        {"day": "2026-03-09", "posts": 3, "comments": 0, "likes": 0, "new_users": 0, "active_authors": 1}
+    ]
+    authors = client.get("/api/analytics/authors/?start=2026-03-01&end=2026-03-31").json()["results"]
+    assert authors == [{"author": user.public_id.hex, "username": user.username, "posts": 3, "comments": 0, "likes_received": 2}]
+    assert client.get("/api/analytics/authors/?limit=-1").status_code == 400
+    assert client.get("/api/analytics/?start=March").status_code == 400
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from core.analytics.models import AuthorDay, DailyStats
+from core.analytics.serializers import DailyStatsSerializer
+from core.user.models import User
+
+DEFAULT_DAYS = 30
+MAX_AUTHORS = 100
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """Staff only, reads the rollup tables of core/analytics/rollup.py and nothing else."""
+    permission_classes = (IsAdminUser,)
+    http_method_names = ['get']
+
+    def days(self):
+        # ?start=YYYY-MM-DD&end=YYYY-MM-DD, both included, the last DEFAULT_DAYS days by default
+        end = self._date('end') or timezone.localdate()
+        start = self._date('start') or end - timedelta(days=DEFAULT_DAYS - 1)
+        if start > end:
+            raise ValidationError({'start': 'start has to be before end.'})
+        return start, end
+
+    def _date(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError({name: 'A YYYY-MM-DD date is required.'})
+        return day
+
+    def list(self, request, *args, **kwargs): #/api/analytics/ one row per day, days without activity have no row
+        start, end = self.days()
+        rows = DailyStats.objects.filter(day__range=(start, end)).order_by('day')
+        return Response({'start': start, 'end': end, 'results': DailyStatsSerializer(rows, many=True).data})
+
+    @action(methods=['get'], detail=False) #/api/analytics/authors/ the most active authors of the period
+    def authors(self, request, *args, **kwargs):
+        start, end = self.days()
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), MAX_AUTHORS)
+        except ValueError:
+            raise ValidationError({'limit': 'An integer is required.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'At least 1.'})
+        rows = list(
+            AuthorDay.objects.filter(day__range=(start, end)).values('author_id')
+            .annotate(posts=Sum('posts'), comments=Sum('comments'), likes_received=Sum('likes_received'))
+            .order_by(-(F('posts') + F('comments')), '-likes_received', 'author_id')[:limit]
+        )
+        users = User.objects.with_deleted().in_bulk([row['author_id'] for row in rows])
+        results = [
+            {
+                'author': users[row['author_id']].public_id.hex if row['author_id'] in users else None, #None once reaped
+                'username': users[row['author_id']].username if row['author_id'] in users else None,
+                **{key: row[key] for key in ('posts', 'comments', 'likes_received')},
+            }
+            for row in rows
+        ]
+        return Response({'start': start, 'end': end, 'results': results})
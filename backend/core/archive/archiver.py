@@ -0,0 +1,111 @@
+"""Moves the posts older than a cutoff, with their comments, from the hot tables to the archive tables.
+
+The hot tables (core.post, core_comment_comment) are not partitioned themselves: on PostgreSQL every unique
+constraint of a partitioned table has to include the partition key, so the primary keys, the unique
+public_id and every foreign key to them (comments, likes, tags, mentions) would have to carry `created`.
+They stay small instead: everything older than the cutoff leaves them, so their indexes and their vacuums
+only ever cover the recent weeks. Archived rows go to tables partitioned by month (see partitions.py),
+which only receive inserts and are frozen once their month is done.
+
+Archived posts are read-only. Their likes are kept as a count, their comments in ArchivedComment, the edit
+history of both in their archived document, and the API still answers GET /api/post/{public_id}/, its
+comments and their revisions through core/archive/reads.py."""
+
+import time
+
+from django.db import transaction
+from django.db.models import Count
+
+from core.archive import partitions
+from core.archive.models import ArchivedComment, ArchivedPost, pack
+from core.comment.models import Comment
+from core.notification.delivery import discount
+from core.post.models import Post
+from core.revision.models import CommentRevision, PostRevision
+from core.shard.router import moving_authors
+from core.user.models import User
+
+Like = User.posts_liked.through
+
+
+def _revisions(model, field, pks, using):
+    """{pk: [[number, created, full, data], ...]} of the revisions of the posts or comments `pks`, oldest first,
+    see archived_versions() in core/revision/history.py."""
+    found = {}
+    rows = model.objects.using(using).filter(**{f'{field}__in': pks}).order_by(field, 'number').values_list(field, 'number', 'created', 'full', 'data')
+    for pk, number, created, full, data in rows:
+        found.setdefault(pk, []).append([number, created.isoformat(), full, data])
+    return found
+
+
+def _document(row, fields, revisions):
+    document = {**{key: row[key] for key in fields}, 'updated': row['updated'].isoformat()}
+    if row['pk'] in revisions:
+        document['revisions'] = revisions[row['pk']]
+    return document
+
+
+class Archiver:
+    def __init__(self, before, chunk_size=500, pause=0.05, using='default', progress=None):
+        self.before = before # posts created before it are archived
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.using = using
+        self.progress = progress # called with (posts archived so far, comments archived so far)
+
+    def run(self):
+        """Archive everything created before `before`, returns the number of posts and comments archived.
+        Soft-deleted posts are left to the reaper."""
+        posts = comments = 0
+        while True:
+            pks = list(
+                Post.objects.using(self.using).filter(created__lt=self.before)
+                .exclude(author_id__in=moving_authors()) # archived on the target once reshard moved them
+                .order_by('pk').values_list('pk', flat=True)[:self.chunk_size]
+            )
+            if not pks:
+                return {'posts': posts, 'comments': comments}
+            with transaction.atomic(using=self.using):
+                comments += self._archive(pks)
+            posts += len(pks)
+            if self.progress:
+                self.progress(posts, comments)
+            if self.pause:
+                time.sleep(self.pause)
+
+    def _archive(self, pks):
+        posts = list(
+            Post.objects.using(self.using).filter(pk__in=pks)
+            .annotate(likes_count=Count('liked_by'))
+            .values('pk', 'public_id', 'author_id', 'body', 'edited', 'created', 'updated', 'likes_count', 'views', 'unique_viewers')
+        )
+        comments = list(
+            Comment.objects.using(self.using).filter(post_id__in=pks) # comments of soft-deleted authors are dropped
+            .values('pk', 'public_id', 'post__public_id', 'author_id', 'body', 'edited', 'created', 'updated')
+        )
+        post_revisions = _revisions(PostRevision, 'post_id', pks, self.using)
+        comment_revisions = _revisions(CommentRevision, 'comment_id', [comment['pk'] for comment in comments], self.using)
+        partitions.ensure({partitions.month_of(row['created']) for row in posts + comments}, self.using)
+
+        ArchivedPost.objects.using(self.using).bulk_create([
+            ArchivedPost(
+                created=post['created'], public_id=post['public_id'], author_id=post['author_id'],
+                data=pack(_document(post, ('body', 'edited', 'likes_count', 'views', 'unique_viewers'), post_revisions)),
+            )
+            for post in posts
+        ])
+        ArchivedComment.objects.using(self.using).bulk_create([
+            ArchivedComment(
+                created=comment['created'], public_id=comment['public_id'], post_public_id=comment['post__public_id'],
+                author_id=comment['author_id'],
+                data=pack(_document(comment, ('body', 'edited'), comment_revisions)),
+            )
+            for comment in comments
+        ])
+
+        discount(pks, self.using) # their unread notification groups are deleted with them
+        # children first, comments PROTECT their post; tags, mentions and revisions go with their post or comment
+        Comment._base_manager.using(self.using).filter(post_id__in=pks).delete()
+        Like.objects.using(self.using).filter(post_id__in=pks).delete()
+        Post._base_manager.using(self.using).filter(pk__in=pks).delete()
+        return len(comments)
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+MODELS = ('ArchivedPost', 'ArchivedComment')
+
+# PostgreSQL: the same columns, partitioned by month of created. The partitions are created by
+# core/archive/partitions.py, the DEFAULT partition only takes rows of months without one.
+POSTGRES_TABLES = {
+    'ArchivedPost': (
+        'core_archive_archivedpost',
+        'author_id bigint NOT NULL',
+        ['CREATE INDEX archived_post_public_id ON core_archive_archivedpost (public_id)'],
+    ),
+    'ArchivedComment': (
+        'core_archive_archivedcomment',
+        'post_public_id uuid NOT NULL, author_id bigint NOT NULL',
+        [
+            'CREATE INDEX archived_comment_public_id ON core_archive_archivedcomment (public_id)',
+            'CREATE INDEX archived_comment_post ON core_archive_archivedcomment (post_public_id, created)',
+        ],
+    ),
+}
+
+
+def create_tables(apps, schema_editor):
+    for name in MODELS:
+        if schema_editor.connection.vendor != 'postgresql':
+            schema_editor.create_model(apps.get_model('core_archive', name))
+            continue
+        table, columns, indexes = POSTGRES_TABLES[name]
+        schema_editor.execute(
+            f'CREATE TABLE {table} (created timestamp with time zone NOT NULL, public_id uuid NOT NULL, '
+            f'{columns}, data bytea NOT NULL, PRIMARY KEY (created, public_id)) PARTITION BY RANGE (created)'
+        )
+        schema_editor.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+        for index in indexes:
+            schema_editor.execute(index)
+
+
+def drop_tables(apps, schema_editor):
+    for name in MODELS:
+        schema_editor.delete_model(apps.get_model('core_archive', name))
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ArchivedComment',
+                    fields=[
+                        ('pk', models.CompositePrimaryKey('created', 'public_id', blank=True, editable=False, primary_key=True, serialize=False)),
+                        ('created', models.DateTimeField()),
+                        ('public_id', models.UUIDField()),
+                        ('post_public_id', models.UUIDField()),
+                        ('author_id', models.BigIntegerField()),
+                        ('data', models.BinaryField()),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['public_id'], name='archived_comment_public_id'), models.Index(fields=['post_public_id', 'created'], name='archived_comment_post')],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='ArchivedPost',
+                    fields=[
+                        ('pk', models.CompositePrimaryKey('created', 'public_id', blank=True, editable=False, primary_key=True, serialize=False)),
+                        ('created', models.DateTimeField()),
+                        ('public_id', models.UUIDField()),
+                        ('author_id', models.BigIntegerField()),
+                        ('data', models.BinaryField()),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['public_id'], name='archived_post_public_id')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_tables, drop_tables), #with the models of the state created above
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_archive', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FrozenPartition',
+            fields=[
+                ('name', models.CharField(max_length=63, primary_key=True, serialize=False)),
+                ('tablespace', models.CharField(blank=True, max_length=63)),
+                ('changes', models.BigIntegerField()),
+                ('frozen', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+"""Posts and comments moved out of the hot tables by core/archive/archiver.py.
+
+On PostgreSQL both tables are partitioned by month of `created` (see migration 0001 and partitions.py), the
+primary key includes `created` since every unique constraint of a partitioned table has to. The columns
+needed to find a row are plain, the rest is a zlib-compressed JSON document in `data`."""
+
+import json
+import zlib
+
+from django.db import models
+
+
+def pack(document):
+    return zlib.compress(json.dumps(document, separators=(',', ':')).encode(), 6)
+
+
+def unpack(data):
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+class ArchivedPost(models.Model):
+    pk = models.CompositePrimaryKey('created', 'public_id')
+    created = models.DateTimeField()
+    public_id = models.UUIDField()
+    author_id = models.BigIntegerField() #no foreign key, the author can be reaped after the archival
+    data = models.BinaryField() #body, edited, updated, likes_count, views, unique_viewers and revisions
+
+    class Meta:
+        indexes = [models.Index(fields=['public_id'], name='archived_post_public_id')]
+
+
+class ArchivedComment(models.Model):
+    pk = models.CompositePrimaryKey('created', 'public_id')
+    created = models.DateTimeField()
+    public_id = models.UUIDField()
+    post_public_id = models.UUIDField()
+    author_id = models.BigIntegerField()
+    data = models.BinaryField() #body, edited, updated and revisions
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['public_id'], name='archived_comment_public_id'),
+            models.Index(fields=['post_public_id', 'created'], name='archived_comment_post'),
+        ]
+
+
+class FrozenPartition(models.Model):
+    """A partition partitions.cool() froze, with its pg_stat_user_tables write counters at that time: it is
+    frozen again only after rows were written to it or to move it to another tablespace."""
+    name = models.CharField(max_length=63, primary_key=True) #PostgreSQL's identifier length
+    tablespace = models.CharField(max_length=63, blank=True)
+    changes = models.BigIntegerField() #n_tup_ins + n_tup_upd + n_tup_del
+    frozen = models.DateTimeField(auto_now=True)
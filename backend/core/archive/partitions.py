@@ -0,0 +1,117 @@
+"""Monthly partitions of the archive tables on PostgreSQL. On other databases the tables are not
+partitioned and every function here does nothing."""
+
+from datetime import date
+
+from django.db import connections
+
+from core.archive.models import FrozenPartition
+
+TABLES = ('core_archive_archivedpost', 'core_archive_archivedcomment')
+
+
+def month_of(when):
+    return date(when.year, when.month, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def supported(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def attached(using='default'):
+    """{table: {month: partition}} of the partitions attached to the archive tables."""
+    if not supported(using):
+        return {}
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT parent.relname, child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = inhparent JOIN pg_class child ON child.oid = inhrelid "
+            "WHERE parent.relname = ANY(%s)",
+            [list(TABLES)],
+        )
+        rows = cursor.fetchall()
+    partitions = {table: {} for table in TABLES}
+    for table, name in rows:
+        suffix = name[len(table):]
+        if suffix.startswith('_p') and suffix[2:].isdigit():
+            partitions[table][date(int(suffix[2:6]), int(suffix[6:8]), 1)] = name
+    return partitions
+
+
+def ensure(months, using='default'):
+    """Create the partitions of `months` (first days of months) that don't exist yet, returns their names."""
+    if not supported(using):
+        return []
+    existing = attached(using)
+    created = []
+    with connections[using].cursor() as cursor:
+        for table in TABLES:
+            for month in sorted(set(months) - set(existing[table])):
+                name = partition_name(table, month)
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{next_month(month).isoformat()} 00:00+00')"
+                )
+                created.append(name)
+    return created
+
+
+def _changes(names, using):
+    """{partition: rows inserted, updated and deleted since the statistics were reset}."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, n_tup_ins + n_tup_upd + n_tup_del FROM pg_stat_user_tables WHERE relname = ANY(%s)",
+            [list(names)],
+        )
+        return dict(cursor.fetchall())
+
+
+def cool(before, tablespace=None, using='default'):
+    """Freeze the partitions of the months before `before` once they stopped changing, and move them to
+    `tablespace` (e.g. on cheaper, compressed storage). Frozen partitions are skipped by the anti-wraparound
+    vacuums, so vacuum work stays proportional to the recent months. A partition is frozen once, again only
+    when rows were written to it since (FrozenPartition) or to move it. Returns the partitions frozen."""
+    if not supported(using):
+        return []
+    names = [name for partitions in attached(using).values() for month, name in partitions.items() if month < before]
+    changes = _changes(names, using)
+    frozen = FrozenPartition.objects.using(using).in_bulk(names)
+    cooled = []
+    with connections[using].cursor() as cursor:
+        for name in names:
+            record = frozen.get(name)
+            if record and record.changes == changes.get(name) and (not tablespace or record.tablespace == tablespace):
+                continue
+            if tablespace:
+                cursor.execute(f"ALTER TABLE {name} SET TABLESPACE {connections[using].ops.quote_name(tablespace)}")
+            cursor.execute(f"VACUUM (FREEZE, ANALYZE) {name}") #needs autocommit, not inside atomic()
+            FrozenPartition.objects.using(using).update_or_create(name=name, defaults={
+                'tablespace': tablespace or (record.tablespace if record else ''),
+                'changes': _changes([name], using).get(name, 0),
+            })
+            cooled.append(name)
+    return cooled
+
+
+def detach(before, using='default'):
+    """Detach the partitions of the months before `before`. Their rows stay in the database as standalone
+    tables but are no longer found by the fallback reads; ATTACH PARTITION brings them back."""
+    if not supported(using):
+        return []
+    detached = []
+    with connections[using].cursor() as cursor:
+        for table, partitions in attached(using).items():
+            for month, name in sorted(partitions.items()):
+                if month < before:
+                    cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                    detached.append(name)
+    FrozenPartition.objects.using(using).filter(name__in=detached).delete()
+    return detached
@@ -0,0 +1,105 @@
+"""The API representation of archived posts and comments, for the fallback lookups of PostViewSet and
+CommentViewSet when a public_id is not in the hot tables anymore. The archive of a shard is on the shard, the
+lookups try each of databases()."""
+
+import uuid
+
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from core.archive.models import ArchivedComment, ArchivedPost, unpack
+from core.shard.router import databases
+from core.user.models import User
+from core.user.serializers import UserSerializer
+
+_datetime = serializers.DateTimeField()
+
+
+def _uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _archived(queryset):
+    # (alias, the first row of `queryset`) on the first of databases() that has one
+    for alias in databases():
+        row = queryset.using(alias).first()
+        if row is not None:
+            return alias, row
+    return None, None
+
+
+def _authors(rows, context):
+    users = User.objects.in_bulk({row.author_id for row in rows})
+    return {pk: UserSerializer(user, context=context).data for pk, user in users.items()}
+
+
+def post(public_id, context):
+    """The archived post `public_id` as PostSerializer would show it, None if it's not archived."""
+    public_id = _uuid(public_id)
+    archived = _archived(ArchivedPost.objects.filter(public_id=public_id))[1] if public_id else None
+    if archived is None:
+        return None
+    data = unpack(archived.data)
+    return {
+        'id': archived.public_id.hex,
+        'author': _authors([archived], context).get(archived.author_id), #None once the author was reaped
+        'body': data['body'],
+        'edited': data['edited'],
+        'liked': False,
+        'likes_count': data['likes_count'],
+        'views': data.get('views', 0), #not in the posts archived before the views were counted
+        'unique_viewers': data.get('unique_viewers', 0),
+        'created': _datetime.to_representation(archived.created),
+        'updated': _datetime.to_representation(parse_datetime(data['updated'])),
+        'archived': True,
+    }
+
+
+def _comment(archived, authors):
+    data = unpack(archived.data)
+    return {
+        'id': archived.public_id.hex,
+        'post': archived.post_public_id.hex,
+        'author': authors.get(archived.author_id),
+        'body': data['body'],
+        'edited': data['edited'],
+        'created': _datetime.to_representation(archived.created),
+        'updated': _datetime.to_representation(parse_datetime(data['updated'])),
+        'archived': True,
+    }
+
+
+def document(model, public_id):
+    """The archived document of the ArchivedPost or ArchivedComment `public_id` (body, revisions, ...), None if
+    it's not archived."""
+    public_id = _uuid(public_id)
+    data = _archived(model.objects.filter(public_id=public_id).values_list('data', flat=True))[1] if public_id else None
+    return unpack(data) if data is not None else None
+
+
+def comments(post_public_id):
+    """The archived comments of the archived post `post_public_id`, newest first (from the archived_comment_post
+    index), for the paginator. None when the post is not archived."""
+    post_public_id = _uuid(post_public_id)
+    alias = _archived(ArchivedPost.objects.filter(public_id=post_public_id).values_list('pk'))[0] if post_public_id else None
+    if alias is None:
+        return None
+    return ArchivedComment.objects.using(alias).filter(post_public_id=post_public_id).order_by('-created')
+
+
+def represent_comments(rows, context):
+    """A page of comments() as CommentSerializer would show it."""
+    rows = list(rows)
+    authors = _authors(rows, context)
+    return [_comment(row, authors) for row in rows]
+
+
+def comment(public_id, context):
+    public_id = _uuid(public_id)
+    archived = _archived(ArchivedComment.objects.filter(public_id=public_id))[1] if public_id else None
+    if archived is None:
+        return None
+    return _comment(archived, _authors([archived], context))
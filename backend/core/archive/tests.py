@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.archive import partitions
+from core.archive.archiver import Archiver
+from core.archive.models import ArchivedComment, ArchivedPost, FrozenPartition
+from core.comment.models import Comment
+from core.fixtures.user import user
+from core.post.models import Post
+from core.tag.links import link
+from core.tag.models import PostTag
+from core.user.models import User
+
+
+def _old_post(user, days, body="Old #news"):
+    post = Post.objects.create(author=user, body=body)
+    Comment.objects.create(author=user, post=post, body="Old comment")
+    link([post])
+    Post.objects.filter(pk=post.pk).update(created=timezone.now() - timedelta(days=days))
+    Comment.objects.filter(post=post).update(created=timezone.now() - timedelta(days=days - 1))
+    post.refresh_from_db()
+    return post
+
+
+@pytest.mark.django_db
+def test_archive_moves_old_posts(client, user):
+    old = _old_post(user, 400)
+    user.like(old)
+    recent = _old_post(user, 10, body="Recent")
+
+    counts = Archiver(timezone.now() - timedelta(days=180), chunk_size=1, pause=0).run()
+
+    assert counts == {"posts": 1, "comments": 1}
+    assert list(Post.objects.values_list("pk", flat=True)) == [recent.pk]
+    assert not Comment.objects.filter(post_id=old.pk).exists()
+    assert not PostTag.objects.filter(post_id=old.pk).exists()
+    assert not User.posts_liked.through.objects.filter(post_id=old.pk).exists()
+    if partitions.supported():
+        assert partitions.month_of(old.created) in partitions.attached()["core_archive_archivedpost"]
+
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+    data = client.get(f"/api/post/{old.public_id.hex}/", **headers).json()
+    assert data["body"] == "Old #news" and data["likes_count"] == 1 and data["archived"]
+    assert data["author"]["username"] == user.username
+
+    comments = client.get(f"/api/post/{old.public_id.hex}/comment/", **headers).json()
+    assert [comment["body"] for comment in comments["results"]] == ["Old comment"]
+    comment = ArchivedComment.objects.get()
+    assert client.get(f"/api/post/{old.public_id.hex}/comment/{comment.public_id.hex}/", **headers).json()["body"] == "Old comment"
+
+    # archived posts are read-only, and unknown ones are still 404
+    assert client.patch(f"/api/post/{old.public_id.hex}/", {"body": "x"}, content_type="application/json", **headers).status_code == 404
+    assert client.get(f"/api/post/{'0' * 32}/", **headers).status_code == 404
+    assert client.get(f"/api/post/{recent.public_id.hex}/comment/", **headers).json()["results"][0]["body"] == "Old comment"
+
+
+@pytest.mark.django_db
+def test_archived_comments_paginated(client, user):
+    old = _old_post(user, 400)
+    for number in range(2):
+        comment = Comment.objects.create(author=user, post=old, body=f"Later {number}")
+        Comment.objects.filter(pk=comment.pk).update(created=old.created + timedelta(days=2 + number))
+    Archiver(timezone.now() - timedelta(days=180), pause=0).run()
+
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+    first = client.get(f"/api/post/{old.public_id.hex}/comment/?limit=2", **headers).json()
+    assert first["count"] == 3
+    assert [comment["body"] for comment in first["results"]] == ["Later 1", "Later 0"]
+    second = client.get(f"/api/post/{old.public_id.hex}/comment/?limit=2&offset=2", **headers).json()
+    assert [comment["body"] for comment in second["results"]] == ["Old comment"]
+
+
+@pytest.mark.django_db(transaction=True) # VACUUM can't run in a transaction
+def test_archive_command(user):
+    _old_post(user, 400)
+
+    call_command("archive", days=180, pause=0, cool_after=1, stdout=open("/dev/null", "w"))
+
+    assert ArchivedPost.objects.count() == 1
+    assert not Post.objects.exists()
+    if partitions.supported(): # frozen once, nothing was written to them since
+        assert FrozenPartition.objects.exists()
+        assert partitions.cool(timezone.now().date()) == []
@@ -0,0 +1,16 @@
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from core.auth.revocation import revocations
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """Simple JWT's authentication that also rejects the access tokens issued before a "log out all
+    sessions". The check goes through the in-memory filter of core/auth/revocation.py, no query for the
+    users who never did it."""
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if revocations.is_revoked(token):
+            raise InvalidToken({"detail": "Token is revoked", "code": "token_not_valid"})
+        return token
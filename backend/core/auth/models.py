@@ -0,0 +1,35 @@
+from django.db import models
+
+
+class RevokedToken(models.Model):
+    """A refresh token that can't be used anymore, identified by its jti claim.
+
+    ROTATED rows are written by every refresh for the token it replaces: the unique jti makes a second use
+    of the same refresh token fail on insert, which is how a stolen token is detected (see
+    core.auth.serializers.RefreshSerializer). LOGOUT rows come from the logout endpoint and go into the
+    in-memory filter of core.auth.revocation."""
+
+    ROTATED = 'rotated'
+    LOGOUT = 'logout'
+
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey("core_user.User", on_delete=models.CASCADE, related_name="+")
+    reason = models.CharField(max_length=16, choices=[(ROTATED, 'Rotated'), (LOGOUT, 'Logout')])
+    expires = models.DateTimeField() # the exp of the token, the row is useless after it
+
+    class Meta:
+        indexes = [models.Index(fields=['reason', 'expires'])]
+
+    def __str__(self):
+        return f"{self.jti} ({self.reason})"
+
+
+class TokenCutoff(models.Model):
+    """Every token of `user` issued at or before `revoked_before` is revoked ("log out all sessions")."""
+
+    user = models.OneToOneField("core_user.User", on_delete=models.CASCADE, related_name="+")
+    revoked_before = models.DateTimeField()
+    expires = models.DateTimeField() # the last refresh token issued before the cutoff expires at this time
+
+    def __str__(self):
+        return f"{self.user_id} before {self.revoked_before}"
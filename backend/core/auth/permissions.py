@@ -22,7 +22,7 @@ class UserPermission(BasePermission):
             return request.method in SAFE_METHODS #It represents the currently authenticated user making 
         #the request.If the user is not authenticated, request.user is set to an AnonymousUser object.
         
-        if view.basename in ["post"]: #view.basename refers to the base name given to a viewset when 
+        if view.basename in ["post", "post-comment"]: #view.basename refers to the base name given to a viewset when 
             #registering it with a router. This checks if the current view (i.e., the one handling the request) has a base name of "post"
            
             return bool (request.user and request.user.is_authenticated) #This line checks if the request.user
@@ -45,7 +45,7 @@ class UserPermission(BasePermission):
 #Used for Checking if a user can access the view at all (e.g., listing posts, creating a new one). 
 # Unlike has_object_permission, this runs before the object is retrieved.
         
-        if view.basename in ['post']: #Writing ['post'] as a list allows you to easily check multiple values 
+        if view.basename in ['post', 'post-comment']: #Writing ['post'] as a list allows you to easily check multiple values 
             #using the in keyword:
             if request.user.is_anonymous:
                 return request.method in SAFE_METHODS
@@ -0,0 +1,188 @@
+"""Revoked tokens, checked without a query in the common case.
+
+The jtis revoked by a logout and the users who logged out of all their sessions are loaded in a Bloom filter
+kept in memory by each process. A token whose jti (or "user:<id>") is not in the filter is not revoked, which
+is the answer for nearly every request; only a filter hit is confirmed with the database, since a Bloom filter
+can answer "maybe" for a key it never saw (at most FALSE_POSITIVE_RATE of the time).
+
+revoke() and revoke_all() increment a generation counter in the cache. A process that sees it change adds the
+rows written since its last look (RevokedToken and TokenCutoff ids past the last ones it has) to its filter,
+one indexed query, so a logout is seen by every process on its next check without reloading the tables.
+
+Every REBUILD_SECONDS the filter is built again from the rows that haven't expired, in a thread, while the
+requests keep using the current one. It drops the expired keys, and picks up a row that committed after a
+row with a higher id had been read. The reaper (manage.py reap, see core/reaper.py) deletes the expired rows.
+Rotated refresh tokens are not in the filter, there are as many of them as refreshes and the unique jti of
+RevokedToken already rejects their reuse."""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from core.auth.models import RevokedToken, TokenCutoff
+
+REBUILD_SECONDS = 60
+FALSE_POSITIVE_RATE = 0.001
+GENERATION_KEY = 'auth:revocation-generation'
+HEADROOM = 10000 # keys a filter takes after it was built before its false positive rate goes up
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)) # bits
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # double hashing: the k positions are h1 + i * h2, both taken from one blake2b digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _user_key(user_id):
+    return f"user:{user_id}"
+
+
+class RevocationList:
+    def __init__(self, rebuild_seconds=REBUILD_SECONDS):
+        self.rebuild_seconds = rebuild_seconds
+        self._filter = None
+        self._generation = None
+        self._seen = (0, 0) # the last RevokedToken and TokenCutoff ids in the filter
+        self._built = 0.0
+        self._rebuilding = False
+        self._lock = threading.Lock()
+
+    def _current_filter(self):
+        generation = cache.get(GENERATION_KEY, 0)
+        if self._filter is None or generation != self._generation:
+            with self._lock:
+                if self._filter is None:
+                    self._install(self._build(generation)) # the first check of the process waits for the filter
+                elif generation != self._generation:
+                    self._catch_up(generation)
+        if time.monotonic() - self._built > self.rebuild_seconds and not self._rebuilding:
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild_thread, daemon=True).start()
+        return self._filter
+
+    def _catch_up(self, generation):
+        # called with the lock held: the rows revoked since the filter was built or last caught up
+        last_jti, last_cutoff = self._seen
+        for pk, jti in RevokedToken.objects.filter(pk__gt=last_jti, reason=RevokedToken.LOGOUT).values_list('pk', 'jti'):
+            self._filter.add(jti)
+            last_jti = max(last_jti, pk)
+        for pk, user_id in TokenCutoff.objects.filter(pk__gt=last_cutoff).values_list('pk', 'user_id'):
+            self._filter.add(_user_key(user_id))
+            last_cutoff = max(last_cutoff, pk)
+        self._seen = (last_jti, last_cutoff)
+        self._generation = generation
+
+    def _build(self, generation):
+        # the generation is read before the rows: a revocation written meanwhile is caught up afterwards
+        now = timezone.now()
+        jtis = list(RevokedToken.objects.filter(reason=RevokedToken.LOGOUT, expires__gt=now).values_list('pk', 'jti'))
+        users = list(TokenCutoff.objects.filter(expires__gt=now).values_list('pk', 'user_id'))
+        bloom = BloomFilter(len(jtis) + len(users) + HEADROOM)
+        for _, jti in jtis:
+            bloom.add(jti)
+        for _, user_id in users:
+            bloom.add(_user_key(user_id))
+        seen = (max((pk for pk, _ in jtis), default=0), max((pk for pk, _ in users), default=0))
+        return bloom, generation, seen
+
+    def _install(self, built):
+        self._filter, self._generation, self._seen = built
+        self._built = time.monotonic()
+
+    def rebuild(self):
+        built = self._build(cache.get(GENERATION_KEY, 0))
+        with self._lock:
+            self._install(built)
+
+    def _rebuild_thread(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Rebuilding the revocation filter failed, the current one is kept")
+        finally:
+            self._rebuilding = False
+            connections.close_all() #the connection of this thread
+
+    def is_revoked(self, token):
+        """True when `token` (a validated simplejwt token) was revoked by a logout or by a logout of all
+        the sessions of its user."""
+        bloom = self._current_filter()
+        jti = token.get(jwt_settings.JTI_CLAIM)
+        user_id = token.get(jwt_settings.USER_ID_CLAIM)
+        if jti is not None and jti in bloom and RevokedToken.objects.filter(jti=jti).exists():
+            return True
+        if user_id is not None and _user_key(user_id) in bloom:
+            cutoff = TokenCutoff.objects.filter(user_id=user_id).values_list('revoked_before', flat=True).first()
+            # tokens of core/auth/tokens.py have an iat to the microsecond, a whole second one issued in the
+            # second of the cutoff counts as issued before it
+            if cutoff is not None and token.get('iat', 0) <= cutoff.timestamp():
+                return True
+        return False
+
+
+revocations = RevocationList()
+
+
+def expired():
+    """The revocations that don't matter anymore, their tokens expired. Deleted by core/reaper.py."""
+    now = timezone.now()
+    return RevokedToken.objects.filter(expires__lte=now), TokenCutoff.objects.filter(expires__lte=now)
+
+
+def _new_generation():
+    # every process catches up on its next check
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        if not cache.add(GENERATION_KEY, 1, timeout=None):
+            cache.incr(GENERATION_KEY)
+
+
+def revoke(token, user_id, reason=RevokedToken.LOGOUT):
+    """Revoke the refresh token `token`. Raises IntegrityError if it was already revoked."""
+    RevokedToken.objects.create(
+        jti=token[jwt_settings.JTI_CLAIM], user_id=user_id, reason=reason, expires=datetime_from_epoch(token['exp'])
+    )
+    if reason == RevokedToken.LOGOUT:
+        transaction.on_commit(_new_generation)
+
+
+def revoke_all(user_id):
+    """Revoke every token of the user issued until now."""
+    now = timezone.now()
+    with transaction.atomic():
+        # a new row rather than an update: the processes catch up on the ids they haven't seen
+        TokenCutoff.objects.filter(user_id=user_id).delete()
+        try:
+            with transaction.atomic():
+                TokenCutoff.objects.create(user_id=user_id, revoked_before=now, expires=now + jwt_settings.REFRESH_TOKEN_LIFETIME)
+        except IntegrityError:
+            pass # a concurrent revoke_all() of the user wrote its cutoff at the same time
+    transaction.on_commit(_new_generation)
@@ -8,11 +8,13 @@ from django.contrib.auth.models import update_last_login
 #update_last_login function, which updates the last_login field on the user model — commonly used after 
 # successful login to track when the user last authenticated.
 
+from core.auth.tokens import RefreshToken
 from core.user.serializers import UserSerializer
 
 class LoginSerializer(TokenObtainPairSerializer): # defines a custom login serializer by extending Simple JWT's 
 #TokenObtainPairSerializer, allowing you to customize the login behavior (e.g. modify the token response or 
 # add extra validations) while still leveraging JWT token generation.
+    token_class = RefreshToken #iat to the microsecond, see core/auth/tokens.py
     def validate(self, attrs):
         data = super().validate(attrs) #overrides the validate method to customize login behavior.It first 
 #calls the parent (super()) method to perform standard validation (like checking username/email and password), 
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from core.auth.models import RevokedToken
+from core.auth.revocation import revocations, revoke, revoke_all
+from core.auth.tokens import RefreshToken
+
+
+class RefreshSerializer(TokenRefreshSerializer):
+    """Simple JWT's refresh serializer with revocation. With ROTATE_REFRESH_TOKENS every refresh returns a new
+    refresh token and revokes the old one. Simple JWT's own rotation needs its token_blacklist app, which
+    would cost a query on every refresh, so the rotation is done here."""
+
+    token_class = RefreshToken #iat to the microsecond, see core/auth/tokens.py
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh']) #checks the signature and the expiry, raises TokenError otherwise
+        if revocations.is_revoked(refresh): #no query unless the token is in the revocation filter, see core/auth/revocation.py
+            raise InvalidToken("Token is revoked")
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            try:
+                with transaction.atomic():
+                    revoke(refresh, user.pk, reason=RevokedToken.ROTATED)
+            except IntegrityError:
+                # This refresh token was already used: either the client or someone who stole it holds the
+                # newer token. Nobody can tell which, so every session of the user is ended.
+                revoke_all(user.pk)
+                raise InvalidToken("Token has already been used")
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+        return data
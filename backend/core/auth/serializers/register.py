@@ -15,6 +15,7 @@ class RegisterSerializer(UserSerializer):
          # List of all the fields that can be included in a request or a response
         fields= ['id', 'bio', 'avatar', 'email',
                  'username', 'first_name', 'last_name','password']
+        extra_kwargs = UserSerializer.Meta.extra_kwargs #unique among the soft-deleted users too
     
     def create(self, validated_data):#validated_data is a dictionary of cleaned, validated input data 
         #provided by the serializer after calling .is_valid()
@@ -1,3 +1,162 @@
-from django.test import TestCase
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from core.auth.throttling import SlidingWindowThrottle
+from core.fixtures.user import user
+
+
+def _rates(**rates):
+    return override_settings(REST_FRAMEWORK={
+        **api_settings.user_settings,
+        'DEFAULT_THROTTLE_RATES': {scope.replace('_', '-'): rate for scope, rate in rates.items()},
+    })
+
+
+def test_sliding_window_reopens_over_the_period():
+    cache.clear()
+    throttle = SlidingWindowThrottle()
+    throttle.timer = lambda: 600.0 # start of a period
+
+    assert all(throttle.take("test", 3, 60) for _ in range(3))
+    assert not throttle.take("test", 3, 60)
+    assert throttle.wait() == 60
+
+    throttle.timer = lambda: 690.0 # half of the next period, 4 * 0.5 taken in the last minute
+    assert throttle.take("test", 3, 60)
+    assert not throttle.take("test", 3, 60)
+
+
+@pytest.mark.django_db
+def test_login_throttled_per_email_without_queries(client, user, django_assert_num_queries):
+    cache.clear()
+    with _rates(auth_ip=None, auth_email="2/min"):
+        for _ in range(2):
+            response = client.post("/api/auth/login/", {"email": user.email, "password": "wrong"})
+            assert response.status_code == 403 # wrong password
+
+        with django_assert_num_queries(0):
+            response = client.post("/api/auth/login/", {"email": user.email.upper(), "password": "wrong"})
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+
+        other = client.post("/api/auth/login/", {"email": "someone@else.com", "password": "wrong"})
+        assert other.status_code != 429
+
+        # someone else hammering the login with this email doesn't lock its owner out
+        victim = client.post("/api/auth/login/", {"email": user.email, "password": "wrong"}, REMOTE_ADDR="10.0.0.2")
+        assert victim.status_code == 403
+
+
+@pytest.mark.django_db
+def test_post_create_throttled_per_user(client, user):
+    cache.clear()
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+    body = {"author": user.public_id.hex, "body": "Throttled"}
+    with _rates(post_create_user="1/min"):
+        assert client.post("/api/post/", body, **headers).status_code == 201
+        assert client.post("/api/post/", body, **headers).status_code == 429
+
+
+def test_bloom_filter():
+    from core.auth.revocation import BloomFilter
+
+    bloom = BloomFilter(1000)
+    for i in range(1000):
+        bloom.add(f"revoked-{i}")
+
+    assert all(f"revoked-{i}" in bloom for i in range(1000))
+    assert sum(f"other-{i}" in bloom for i in range(10000)) < 50 # ~0.1% false positives
+
+
+def _refresh(client, token):
+    return client.post("/api/auth/refresh/", {"refresh": token}, content_type="application/json")
+
+
+@pytest.mark.django_db
+def test_refresh_rotation_without_revocation_queries(client, user, django_capture_on_commit_callbacks):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from core.auth.revocation import revocations
+
+    cache.clear()
+    first = str(RefreshToken.for_user(user))
+    revocations.rebuild()
+
+    with CaptureQueriesContext(connection) as queries:
+        response = _refresh(client, first)
+    assert response.status_code == 200
+    assert response.json()["refresh"] != first
+    assert not [q for q in queries if q["sql"].startswith("SELECT") and "core_auth" in q["sql"]]
+
+    # the old token was rotated, using it again ends every session, the new token too
+    with django_capture_on_commit_callbacks(execute=True):
+        assert _refresh(client, first).status_code == 401
+    assert _refresh(client, response.json()["refresh"]).status_code == 401
+
+
+@pytest.mark.django_db
+def test_logout(client, user, django_capture_on_commit_callbacks):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    cache.clear()
+    refresh = RefreshToken.for_user(user)
+    other_session = RefreshToken.for_user(user)
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {refresh.access_token}"}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post("/api/auth/logout/", {"refresh": str(refresh)}, **headers)
+    assert response.status_code == 204
+    assert _refresh(client, str(refresh)).status_code == 401
+    assert client.get("/api/user/", **headers).status_code == 200 # the access token lives until it expires
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post("/api/auth/logout/all/", **headers)
+    assert response.status_code == 204
+    assert _refresh(client, str(other_session)).status_code == 401
+    assert client.get("/api/user/", **headers).status_code == 401
+
+
+
+@pytest.mark.django_db
+def test_revocations_caught_up_without_a_rebuild(user, django_capture_on_commit_callbacks):
+    from django.utils import timezone
+    from core.auth.models import TokenCutoff
+    from core.auth.revocation import RevocationList, revoke, revoke_all
+    from core.auth.tokens import RefreshToken
+
+    cache.clear()
+    revocations = RevocationList()
+    first = RefreshToken.for_user(user)
+    assert not revocations.is_revoked(first)
+    built = revocations._built
+
+    with django_capture_on_commit_callbacks(execute=True):
+        revoke(first, user.pk)
+    assert revocations.is_revoked(first)
+    assert revocations._built == built # added to the filter, not rebuilt
+
+    # an expired cutoff left for the reaper is replaced by a new row, the filter catches up with its id
+    TokenCutoff.objects.create(user=user, revoked_before=timezone.now(), expires=timezone.now())
+    revocations.rebuild()
+    second = RefreshToken.for_user(user)
+    with django_capture_on_commit_callbacks(execute=True):
+        revoke_all(user.pk)
+    third = RefreshToken.for_user(user) # most likely in the same second as the cutoff
+    assert revocations.is_revoked(second.access_token)
+    assert not revocations.is_revoked(third)
+    assert not revocations.is_revoked(third.access_token)
+
+
+@pytest.mark.django_db
+def test_register_with_the_email_of_a_soft_deleted_user(client, user):
+    user.soft_delete() # kept until the reaper deletes it
+    data = {"username": "newcomer", "email": user.email, "password": "test_password", "first_name": "New", "last_name": "Comer"}
+
+    response = client.post("/api/auth/register/", data)
+
+    assert response.status_code == 400
+    assert "email" in response.json()
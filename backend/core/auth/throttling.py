@@ -0,0 +1,137 @@
+"""Sliding window throttling of the auth endpoints and of the write actions.
+
+A view lists the scopes of each action in `throttle_scopes`, e.g. {"create": ("auth-ip", "auth-email")}, and
+REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] gives each scope a rate like "10/min": at most 10 requests in any
+minute. The last part of the scope name says who owns the window:
+
+  * ip    - the client address (X-Forwarded-For handled by DRF's NUM_PROXIES setting),
+  * email - the email of a login/register request body together with the client address, so a tighter limit
+            applies to the guesses on one account, and a client sending someone else's email can't lock them out,
+  * user  - the user_id claim of the access token, anonymous requests fall back to their IP.
+
+The counters live in the cache (local memory in development and tests, a shared cache like Redis in
+production), updated with atomic add()/incr() only. A window is estimated from two fixed-period counters, the
+requests of the current period and of the previous one, the previous one weighted by how much of it is still
+inside the last `period` seconds. ThrottleFirstMixin checks the throttles before authentication, so a rejected
+request never runs a query or a password hash."""
+
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """"10/min" -> (10, 60), the requests allowed and the length of the window in seconds."""
+    if rate is None:
+        return None
+    tokens, period = rate.split('/')
+    return int(tokens), _PERIODS[period[0]]
+
+
+def _email_ident(request):
+    email = request.data.get('email') if hasattr(request.data, 'get') else None
+    if not isinstance(email, str) or not email.strip():
+        return None
+    return email.strip().lower()
+
+
+def _user_ident(request):
+    forced = getattr(getattr(request, '_request', request), '_force_auth_user', None)
+    if forced is not None: #a sub-request of /api/batch/, the batch already authenticated its user
+        return str(forced.pk)
+    # The access token is only verified (signature and expiry), the user isn't loaded from the database.
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return str(authentication.get_validated_token(raw_token)[jwt_settings.USER_ID_CLAIM])
+    except (InvalidToken, TokenError, KeyError):
+        return None
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    cache = default_cache
+    timer = time.time
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_scopes(self, view):
+        return getattr(view, 'throttle_scopes', {}).get(getattr(view, 'action', None), ())
+
+    def get_ident_for(self, kind, request):
+        if kind == 'email':
+            email = _email_ident(request)
+            return f"{email}:{self.get_ident(request)}" if email is not None else None
+        if kind == 'user':
+            user = _user_ident(request)
+            return f"user:{user}" if user is not None else f"ip:{self.get_ident(request)}"
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        rates = api_settings.DEFAULT_THROTTLE_RATES # read on each request so override_settings() applies
+        for scope in self.get_scopes(view):
+            rate = parse_rate(rates.get(scope))
+            if rate is None:
+                continue
+            ident = self.get_ident_for(scope.rsplit('-', 1)[-1], request)
+            if ident is None:
+                continue
+            if not self.take(f"throttle:{scope}:{ident}", *rate):
+                return False
+        return True
+
+    def take(self, key, capacity, period):
+        """Count a request in the window `key`, False if it already had `capacity` requests in the last `period`
+        seconds. Rejected requests are counted too, so a client hammering a closed window keeps it closed; the
+        scopes are all keyed on the client, so that only ever locks out the client itself."""
+        now = self.timer()
+        window, elapsed = divmod(now, period)
+        current_key = f"{key}:{int(window)}"
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError: # first request of this period
+            if self.cache.add(current_key, 1, timeout=2 * period):
+                current = 1
+            else:
+                current = self.cache.incr(current_key)
+        previous = self.cache.get(f"{key}:{int(window) - 1}", 0)
+
+        weight = 1 - elapsed / period # share of the previous period still inside the last `period` seconds
+        if previous * weight + current <= capacity:
+            return True
+        if current > capacity:
+            self.wait_seconds = period - elapsed
+        else:
+            # previous * weight decreases linearly until there is room for one more request
+            self.wait_seconds = max(0.0, (1 - (capacity - current) / previous) * period - elapsed)
+        return False
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class ThrottleFirstMixin:
+    """APIView.initial() with the throttles checked before the authentication and the permissions."""
+
+    def initial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        self.check_throttles(request)
+        self.perform_authentication(request)
+        self.check_permissions(request)
@@ -0,0 +1,23 @@
+"""Simple JWT's tokens, with an `iat` to the microsecond.
+
+The "log out all sessions" cutoff (TokenCutoff, see core/auth/revocation.py) revokes the tokens issued before
+it. Simple JWT writes `iat` in whole seconds: a token issued in the same second as the cutoff, before or after
+it, would have the same `iat`. A JWT NumericDate may have a fraction, PyJWT and Simple JWT read it as a number.
+The access token of a refresh token copies its `iat`, the session started then."""
+
+from rest_framework_simplejwt import tokens
+
+
+class PreciseIatMixin:
+    def set_iat(self, claim="iat", at_time=None):
+        if at_time is None:
+            at_time = self.current_time
+        self.payload[claim] = round(at_time.timestamp(), 6)
+
+
+class AccessToken(PreciseIatMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(PreciseIatMixin, tokens.RefreshToken):
+    access_token_class = AccessToken
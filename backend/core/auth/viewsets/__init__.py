@@ -1,3 +1,4 @@
 from .register import RegisterViewSet
 from .login import LoginViewSet
-from .refresh import RefreshViewSet
\ No newline at end of file
+from .refresh import RefreshViewSet
+from .logout import LogoutViewSet
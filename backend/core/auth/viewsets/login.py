@@ -3,6 +3,7 @@ from rest_framework.response import Response #This imports DRF's Response class,
 from rest_framework.viewsets import ViewSet
 from rest_framework.permissions import AllowAny
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
+from core.auth.throttling import ThrottleFirstMixin
 from rest_framework import status
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken #TokenError: A general error for problems
 #with JWTs (e.g., malformed, expired, blacklisted). InvalidToken: A specific subclass of TokenError raised when 
@@ -10,11 +11,12 @@ from rest_framework_simplejwt.exceptions import TokenError, InvalidToken #TokenE
 # authentication flows or handling token-related errors in views or serializers.
 from core.auth.serializers import LoginSerializer
 
-class LoginViewSet(ViewSet):
+class LoginViewSet(ThrottleFirstMixin, ViewSet):
     serializer_class = LoginSerializer #r tells the view or viewset which serializer to use for processing input 
     #and formatting output
     permission_classes = (AllowAny,)
     http_method_names = ['post']
+    throttle_scopes = {'create': ("auth-ip", "auth-email")} #sliding windows per client IP and per email+IP, see core/auth/throttling.py
     authentication_classes = [SessionAuthentication, BasicAuthentication] #This line tells Django REST Framework 
     #to use Session and Basic authentication for the view or viewset — allowing login via Django sessions 
     # (for browsers) or basic HTTP credentials (for tools like Postman).
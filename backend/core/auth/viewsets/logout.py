@@ -0,0 +1,39 @@
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from core.auth.authentication import JWTAuthentication
+from core.auth.revocation import revoke, revoke_all
+from core.auth.tokens import RefreshToken
+from core.auth.throttling import ThrottleFirstMixin
+
+
+class LogoutViewSet(ThrottleFirstMixin, ViewSet):
+    permission_classes = (IsAuthenticated,)
+    authentication_classes = [JWTAuthentication]
+    http_method_names = ['post']
+    
+    def create(self, request, *args, **kwargs): #POST /api/auth/logout/ {"refresh": "..."} revokes this refresh token
+        try:
+            refresh = RefreshToken(request.data.get('refresh', ''))
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        if str(refresh[api_settings.USER_ID_CLAIM]) != str(getattr(request.user, api_settings.USER_ID_FIELD)):
+            raise InvalidToken("Token belongs to another user")
+        
+        try:
+            with transaction.atomic():
+                revoke(refresh, request.user.pk)
+        except IntegrityError:
+            pass #already revoked, by an earlier logout or by a rotation
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(methods=['post'], detail=False) #POST /api/auth/logout/all/ revokes every token of the user
+    def all(self, request, *args, **kwargs):
+        revoke_all(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -6,11 +6,15 @@ from rest_framework import viewsets #This imports DRF's viewsets module, which p
 #ModelViewSet that bundle common logic for CRUD operations (create, retrieve, update, delete) into a single view.
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
+from core.auth.throttling import ThrottleFirstMixin
+from core.auth.serializers import RefreshSerializer
 
-class RefreshViewSet(viewsets.ViewSet, TokenRefreshView): #viewsets.ViewSet is used to make it compatible 
+class RefreshViewSet(ThrottleFirstMixin, viewsets.ViewSet, TokenRefreshView): #viewsets.ViewSet is used to make it compatible 
     #with DRF's router system and organize token-refresh functionality inside a class-based view structure.
     permission_classes =(AllowAny,)
     http_method_names = ['post']
+    serializer_class = RefreshSerializer #rotates the refresh token and checks the revocations, see core/auth/serializers/refresh.py
+    throttle_scopes = {'create': ("auth-ip",)} #sliding windows per client IP, see core/auth/throttling.py
     authentication_classes = [SessionAuthentication, BasicAuthentication]
     
     def create(self, request, *args, **kwargs):
@@ -3,16 +3,18 @@ from rest_framework.response import Response #This imports DRF's Response class,
 from rest_framework.viewsets import ViewSet
 from rest_framework.permissions import AllowAny
 from rest_framework import status #This imports HTTP status codes 
-from rest_framework_simplejwt.tokens import RefreshToken # allows you to manually generate access and 
+from core.auth.tokens import RefreshToken # Simple JWT's RefreshToken with a precise iat, allows you to manually generate access and 
 #refresh tokens for a user — typically used after login or account creation.
 from core.auth.serializers import RegisterSerializer
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
+from core.auth.throttling import ThrottleFirstMixin
 
 
-class RegisterViewSet(ViewSet):
+class RegisterViewSet(ThrottleFirstMixin, ViewSet):
     serializer_class = RegisterSerializer
     permission_classes = (AllowAny,)
     http_method_names = ['post']
+    throttle_scopes = {'create': ("auth-ip", "auth-email")} #sliding windows per client IP and per email+IP, see core/auth/throttling.py
     authentication_classes = [SessionAuthentication, BasicAuthentication]
     
     def create(self, request, *args, **kwargs):
@@ -0,0 +1,142 @@
+"""POST /api/batch/: several API requests in one.
+
+    {"requests": [{"method": "GET", "path": "/api/post/<id>/"},
+                  {"method": "POST", "path": "/api/post/<id>/like/"},
+                  {"method": "PATCH", "path": "/api/user/<id>/", "body": {"bio": "..."}}]}
+
+answers {"responses": [{"status": 200, "body": {...}}, ...]} in the same order. The sub-requests are resolved
+against the API urls and call the viewsets directly, without the middleware: the JWT of the batch is checked
+once and its user is given to every sub-request, and get_object_by_public_id() shares one object cache
+(core/abstract/objectcache.py). Permissions and throttling still apply to each sub-request.
+
+Sub-requests run in order. Under ASGI, consecutive GETs run concurrently in up to WORKERS threads; a write
+waits for the GETs before it, and the GETs after it wait for the write."""
+
+import contextvars
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIRequest
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from core.abstract.objectcache import clear, object_cache
+from core.auth.throttling import ThrottleFirstMixin
+
+MAX_REQUESTS = 20
+WORKERS = 4
+METHODS = {'GET', 'POST', 'PUT', 'PATCH', 'DELETE'}
+PREFIX = '/api/'
+
+# the request headers a sub-request inherits from the batch; the body headers are its own
+INHERITED = ('HTTP_HOST', 'HTTP_ACCEPT_LANGUAGE', 'HTTP_USER_AGENT', 'REMOTE_ADDR', 'SERVER_NAME', 'SERVER_PORT', 'wsgi.url_scheme')
+
+
+def _error(code, detail):
+    return {'status': code, 'body': {'detail': detail}}
+
+
+def _is_get(item):
+    return isinstance(item, dict) and str(item.get('method', 'GET')).upper() == 'GET'
+
+
+def groups(items):
+    """Split the sub-requests in runs that can run concurrently: consecutive GETs, or a single write."""
+    runs = []
+    for index, item in enumerate(items):
+        if _is_get(item) and runs and _is_get(runs[-1][0][1]):
+            runs[-1].append((index, item))
+        else:
+            runs.append([(index, item)])
+    return runs
+
+
+class BatchViewSet(ThrottleFirstMixin, viewsets.ViewSet):
+    permission_classes = (AllowAny,) #each sub-request checks its own permissions
+    http_method_names = ['post']
+
+    def create(self, request, *args, **kwargs):
+        items = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'requests': 'A non-empty list of {"method", "path", "body"} is required.'})
+        if len(items) > MAX_REQUESTS:
+            raise ValidationError({'requests': f'At most {MAX_REQUESTS} requests per batch.'})
+
+        user = request.user #authenticates the batch, once
+        responses = [None] * len(items)
+        concurrent = isinstance(request._request, ASGIRequest)
+        with object_cache():
+            for run in groups(items):
+                if concurrent and len(run) > 1:
+                    with ThreadPoolExecutor(max_workers=min(WORKERS, len(run))) as executor:
+                        # a copy of the context per thread, they all see the same object cache
+                        futures = [
+                            (index, executor.submit(contextvars.copy_context().run, self._threaded, request, user, item))
+                            for index, item in run
+                        ]
+                        for index, future in futures:
+                            responses[index] = future.result()
+                else:
+                    for index, item in run:
+                        responses[index] = self.dispatch_one(request, user, item)
+        return Response({'responses': responses})
+
+    def _threaded(self, request, user, item):
+        try:
+            return self.dispatch_one(request, user, item)
+        finally:
+            connections.close_all() #the connections of this worker thread
+
+    def dispatch_one(self, request, user, item):
+        if not isinstance(item, dict):
+            return _error(status.HTTP_400_BAD_REQUEST, 'Each request must be an object.')
+        method = str(item.get('method', 'GET')).upper()
+        url = urlsplit(str(item.get('path', '')))
+        if method not in METHODS:
+            return _error(status.HTTP_400_BAD_REQUEST, f'Unsupported method "{method}".')
+        if not url.path.startswith(PREFIX) or url.path.rstrip('/') == '/api/batch':
+            return _error(status.HTTP_400_BAD_REQUEST, f'The path must be an API path, other than {PREFIX}batch/.')
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return _error(status.HTTP_404_NOT_FOUND, 'Not found.')
+
+        body = b''
+        if 'body' in item:
+            body = json.dumps(item['body']).encode()
+        environ = {key: request.META[key] for key in INHERITED if key in request.META}
+        environ.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': url.path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': url.query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+        })
+        environ.setdefault('wsgi.url_scheme', request.scheme)
+        sub = WSGIRequest(environ)
+        if user.is_authenticated:
+            sub._force_auth_user = user #read by rest_framework.request.Request, no second JWT check
+            sub._force_auth_token = request.auth
+
+        if method != 'GET':
+            clear() #the objects loaded before may change
+        try:
+            response = match.func(sub, *match.args, **match.kwargs)
+        except Http404:
+            return _error(status.HTTP_404_NOT_FOUND, 'Not found.')
+        if method != 'GET':
+            clear()
+
+        if isinstance(response, Response): #the data before rendering, the batch response renders it once
+            return {'status': response.status_code, 'body': response.data}
+        return {'status': response.status_code, 'body': response.content.decode(errors='replace') or None}
@@ -0,0 +1,88 @@
+"""Bytes sent and CPU spent per post list response, uncompressed and with each encoding of
+core/abstract/compression.py. Used by `manage.py bench --suite compression`.
+
+Each encoding runs twice: `cold` empties the `compressed` cache before every request, so every body is
+compressed (what GZipMiddleware does), `cached` serves the same pages again and takes the compressed bodies
+from the cache. `cpu_ms_per_request` is the whole request, from the URL conf to the compressed body, in which
+the compression is a small part: `middleware_ms_per_request` times CompressionMiddleware alone on the same
+bodies."""
+
+import time
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.abstract.compression import CACHE_ALIAS, CODERS, CompressionMiddleware
+from core.post.models import Post
+
+
+def _variants():
+    yield "identity", None, False
+    for encoding in CODERS:
+        yield encoding, encoding, False
+        yield encoding, encoding, True
+
+
+def _middleware_ms(bodies, encoding, cached, iterations):
+    middleware = CompressionMiddleware(lambda request: None)
+    request = RequestFactory().get("/api/post/", HTTP_ACCEPT_ENCODING=encoding or "identity")
+    cache = caches[CACHE_ALIAS]
+    cache.clear()
+    if cached:
+        for body in bodies:
+            middleware.process_response(request, HttpResponse(body, content_type="application/json"))
+    elapsed = 0.0
+    for _ in range(iterations):
+        for body in bodies:
+            if not cached:
+                cache.clear()
+            response = HttpResponse(body, content_type="application/json")
+            start = time.process_time()
+            middleware.process_response(request, response)
+            elapsed += time.process_time() - start
+    return elapsed * 1000 / (iterations * len(bodies))
+
+
+def run(dataset, page_size=100, pages=10, iterations=20):
+    user = dataset.users[0]
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+    pages = min(pages, -(-Post.objects.count() // page_size)) # full pages, an empty one is too small to compress
+    paths = [f"/api/post/?limit={page_size}&offset={number * page_size}" for number in range(pages)]
+    cache = caches[CACHE_ALIAS]
+    bodies = [client.get(path).content for path in paths]
+    results = []
+    for name, encoding, cached in _variants():
+        cache.clear()
+        for path in paths: # warms up the process the same way for every variant, and the cache when `cached`
+            client.get(path, HTTP_ACCEPT_ENCODING=encoding or "identity")
+        sizes = []
+        start = time.process_time()
+        for _ in range(iterations):
+            for path in paths:
+                if not cached:
+                    cache.clear()
+                response = client.get(path, HTTP_ACCEPT_ENCODING=encoding or "identity")
+                if response.status_code != 200 or response.get("Content-Encoding") != encoding:
+                    raise RuntimeError(f"{path} answered {response.status_code} {response.get('Content-Encoding')}")
+                sizes.append(len(response.content))
+        cpu_ms = (time.process_time() - start) * 1000 / len(sizes)
+        results.append({
+            "encoding": name,
+            "cache": "cached" if cached else "cold",
+            "requests": len(sizes),
+            "page_size": page_size,
+            "bytes_per_request": round(sum(sizes) / len(sizes)),
+            "cpu_ms_per_request": round(cpu_ms, 4),
+            "middleware_ms_per_request": round(_middleware_ms(bodies, encoding, cached, iterations), 4),
+        })
+
+    baseline = results[0]
+    for row in results:
+        row["bytes_saved"] = round(1 - row["bytes_per_request"] / baseline["bytes_per_request"], 3)
+        row["extra_cpu_ms"] = round(row["cpu_ms_per_request"] - baseline["cpu_ms_per_request"], 4)
+    return {
+        "meta": {"dataset": dataset.summary(), "iterations": iterations, "encodings": list(CODERS)},
+        "results": results,
+    }
@@ -0,0 +1,407 @@
+"""Synthetic social graph used by `manage.py seed` and by the API benchmarks.
+
+Every value is drawn from a seeded random.Random, so two runs with the same arguments produce the same users,
+posts, comments and likes. The timestamps are spread over the days before `now`, REFERENCE_TIME unless given. Activity follows a Zipf (power-law) distribution: a few authors write most of the
+posts and a few posts receive most of the comments and likes.
+
+Rows are written in batches, with bulk_create on every backend or with COPY on PostgreSQL. The password is
+hashed once and shared by every user, and foreign keys are resolved from the primary keys read back once per
+table, never with a query per row.
+
+With SHARDS set (core/shard/router.py) everything is still written to one database, `default`: the ids of the
+posts and comments come from IdSequence, the users are copied to the shards and the posts and comments are
+recorded in AuthorShard and ObjectShard where they are. `manage.py reshard` then moves the authors to the
+shards of the ring."""
+
+import contextlib
+import datetime
+import io
+import itertools
+import queue
+import random
+import time
+import threading
+import uuid
+from array import array
+from bisect import bisect
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from core.comment.models import Comment
+from core.post.models import Post
+from core.shard import router
+from core.shard.models import AuthorShard, ObjectShard
+from core.user.models import User
+
+BENCH_PASSWORD = "bench_password"
+REFERENCE_TIME = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)  # `now` of the seeded graph
+
+
+@dataclass
+class Dataset:
+    users: list = field(default_factory=list)  # the most active users, the first one authenticates requests
+    posts: list = field(default_factory=list)  # public_id (hex) of the posts requests are sent to
+    counts: dict = field(default_factory=dict)  # rows inserted per table
+    timings: dict = field(default_factory=dict)  # seconds spent per table
+    now: datetime.datetime = REFERENCE_TIME  # the timestamps are spread over the days before it
+
+    def summary(self):
+        return dict(self.counts)
+
+
+class ZipfSampler:
+    """Draws indexes in range(n) with P(i) proportional to 1 / (rank(i) + 1) ** exponent.
+
+    Ranks are shuffled, so the most popular index is not simply 0."""
+
+    def __init__(self, n, exponent, rng):
+        self.rng = rng
+        self.ranked = list(range(n))
+        rng.shuffle(self.ranked)
+        self.cum_weights = list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(n)))
+        self.total = self.cum_weights[-1] if n else 0.0
+
+    def sample(self, k):
+        # Inlined random.choices(cum_weights=...), the locals keep the per-sample cost at one bisect.
+        random_, cum_weights, total, ranked = self.rng.random, self.cum_weights, self.total, self.ranked
+        hi = len(ranked) - 1
+        return [ranked[bisect(cum_weights, random_() * total, 0, hi)] for _ in range(k)]
+
+    def top(self, k):
+        return self.ranked[:k]
+
+
+@contextlib.contextmanager
+def explicit_timestamps(*models):
+    """bulk_create runs pre_save, which would overwrite generated created/updated values with now()."""
+    fields = [
+        f
+        for model in models
+        for f in model._meta.concrete_fields
+        if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False)
+    ]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+class BulkCreateWriter:
+    """Portable writer. Primary keys come from the database and are read back once per table."""
+
+    method = "bulk"
+    explicit_ids = False
+
+    def __init__(self, using, batch_size, workers=1):
+        self.using = using
+        self.batch_size = batch_size
+
+    def write(self, model, columns, rows):
+        # columns are attnames, e.g. author_id, so instances are built without touching related objects
+        objs = [model(**dict(zip(columns, row))) for row in rows]
+        model._default_manager.db_manager(self.using).bulk_create(
+            objs, batch_size=self.batch_size, ignore_conflicts=bool(model._meta.auto_created)
+        )
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_encoder(field):
+    """Text-format COPY encoder of one column, picked once per column instead of once per value."""
+    internal_type = field.get_internal_type()
+    if internal_type == "BooleanField":
+        return lambda value: "t" if value else "f"
+    if internal_type == "DateTimeField":
+        return datetime.datetime.isoformat
+    if internal_type in ("CharField", "TextField", "EmailField"):
+        return lambda value: "\\N" if value is None else value.translate(_COPY_ESCAPES)
+    return str  # integers and UUIDs
+
+
+class CopyWriter:
+    """COPY ... FROM STDIN on PostgreSQL, with batches streamed by `workers` connections in parallel.
+
+    Primary keys are reserved from the table sequence up front and written explicitly, so the ids of the
+    generated rows are known without reading them back and do not depend on which worker finished first."""
+
+    method = "copy"
+    explicit_ids = True
+
+    def __init__(self, using, batch_size, workers=4):
+        self.using = using
+        self.batch_size = batch_size
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = []
+        self.in_flight = threading.BoundedSemaphore(workers * 2)  # bounds the batches held in memory
+        # Raw DB-API connections, Django's wrappers are bound to the thread that opened them.
+        wrapper = connections[using]
+        self.idle = queue.SimpleQueue()
+        for _ in range(workers):
+            self.idle.put(wrapper.get_new_connection(wrapper.get_connection_params()))
+
+    def reserve_ids(self, model, count):
+        table = connections[self.using].ops.quote_name(model._meta.db_table)
+        column = model._meta.pk.column
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, %s), nextval(pg_get_serial_sequence(%s, %s)) + %s)",
+                [table, column, table, column, max(count - 1, 0)],
+            )
+            last = cursor.fetchone()[0]
+        return range(last - count + 1, last + 1)
+
+    def _copy(self, sql, buffer):
+        connection = self.idle.get()
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(sql, buffer)
+            connection.commit()
+        finally:
+            self.idle.put(connection)
+            self.in_flight.release()
+
+    def write(self, model, columns, rows):
+        fields = {f.attname: f for f in model._meta.concrete_fields}
+        encoders = [_copy_encoder(fields[column]) for column in columns]
+        buffer = io.StringIO()
+        buffer.writelines("\t".join([encode(value) for encode, value in zip(encoders, row)]) + "\n" for row in rows)
+        buffer.seek(0)
+        quote = connections[self.using].ops.quote_name
+        sql = "COPY %s (%s) FROM STDIN" % (quote(model._meta.db_table), ", ".join(map(quote, columns)))
+        self.in_flight.acquire()
+        self.pending.append(self.pool.submit(self._copy, sql, buffer))
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.result()
+
+    def close(self):
+        self.flush()
+        self.pool.shutdown()
+        while not self.idle.empty():
+            self.idle.get().close()
+
+
+def get_writer(method, using, batch_size, workers=4):
+    if method == "auto":
+        method = "copy" if connections[using].vendor == "postgresql" else "bulk"
+    if method == "copy" and connections[using].vendor != "postgresql":
+        raise ValueError("COPY is only available on PostgreSQL.")
+    return (CopyWriter if method == "copy" else BulkCreateWriter)(using, batch_size, workers)
+
+
+class SocialGraphSeeder:
+    def __init__(
+        self,
+        users=1000,
+        posts=10000,
+        comments=20000,
+        likes=50000,
+        seed=0,
+        exponent=1.1,
+        days=90,
+        batch_size=10000,
+        method="auto",
+        workers=4,
+        prefix="seed",
+        using="default",
+        now=None,
+    ):
+        self.sizes = {"users": users, "posts": posts, "comments": comments, "likes": likes}
+        if router.enabled() and using != DEFAULT_DB_ALIAS:
+            raise ValueError("With SHARDS set, seed the default database, manage.py reshard moves the authors.")
+        self.rng = random.Random(seed)
+        # public_ids are unique columns, drawing them from their own stream lets a second run with another
+        # prefix reuse the seed without colliding while the graph itself stays identical.
+        self.uuid_rng = random.Random(f"{seed}:{prefix}")
+        self.exponent = exponent
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.using = using
+        self.writer = get_writer(method, using, batch_size, workers)
+        now = now or REFERENCE_TIME
+        self.now = (timezone.make_aware(now) if timezone.is_naive(now) else now).replace(microsecond=0)
+        self.window = datetime.timedelta(days=days).total_seconds()
+
+    def _uuid(self):
+        return uuid.UUID(int=self.uuid_rng.getrandbits(128), version=4)
+
+    def _timestamp(self):
+        return self.now - datetime.timedelta(seconds=int(self.rng.random() * self.window))
+
+    def _batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    def _new_ids(self, model, last_id):
+        """Primary keys inserted after `last_id`, in insertion order, read with a single query."""
+        self.writer.flush()
+        ids = array("q")
+        qs = model._default_manager.db_manager(self.using).filter(pk__gt=last_id).order_by("pk")
+        ids.extend(qs.values_list("pk", flat=True).iterator(chunk_size=self.batch_size))
+        return ids
+
+    def _last_id(self, model):
+        last = model._default_manager.db_manager(self.using).order_by("-pk").values_list("pk", flat=True).first()
+        return last or 0
+
+    def _insert(self, model, columns, total, make_rows):
+        """Write `total` rows built by make_rows(start, size) in batches and return their primary keys."""
+        sharded = router.enabled() and router.is_sharded(model)
+        if self.writer.explicit_ids or sharded:
+            if sharded:  # unique across the shards, like the ids assign_id() gives
+                ids = router.reserve_ids(model, total)
+            else:
+                ids = self.writer.reserve_ids(model, total) if total else range(0)
+            columns = (model._meta.pk.attname, *columns)
+            for start, size in self._batches(total):
+                rows = make_rows(start, size)
+                self.writer.write(model, columns, [(ids[start + i], *row) for i, row in enumerate(rows)])
+            self.writer.flush()
+            return array("q", ids)
+        last_id = self._last_id(model)
+        for start, size in self._batches(total):
+            self.writer.write(model, columns, make_rows(start, size))
+        return self._new_ids(model, last_id)
+
+    def seed_users(self):
+        password = make_password(BENCH_PASSWORD)  # one PBKDF2 run shared by every user
+        prefix = self.prefix
+
+        def make_rows(start, size):
+            rows = []
+            for i in range(start, start + size):
+                created = self._timestamp()
+                rows.append((self._uuid(), f"{prefix}_{i}", f"{prefix}_{i}@example.com", "Seed", f"User {i}",
+                             password, True, False, False, created, created))
+            return rows
+
+        columns = ("public_id", "username", "email", "first_name", "last_name", "password", "is_active",
+                   "is_superuser", "is_staff", "created", "updated")
+        return self._insert(User, columns, self.sizes["users"], make_rows)
+
+    def seed_posts(self, user_ids, authors):
+        def make_rows(start, size):
+            rows = []
+            for i, author in zip(range(start, start + size), authors.sample(size)):
+                created = self._timestamp()
+                rows.append((self._uuid(), user_ids[author], f"Seeded post {i}", False, 0, 0, created, created))
+            return rows
+
+        columns = ("public_id", "author_id", "body", "edited", "views", "unique_viewers", "created", "updated")
+        return self._insert(Post, columns, self.sizes["posts"], make_rows)
+
+    def seed_comments(self, user_ids, post_ids, authors, posts):
+        def make_rows(start, size):
+            rows = []
+            for i, post, author in zip(range(start, start + size), posts.sample(size), authors.sample(size)):
+                created = self._timestamp()
+                rows.append((self._uuid(), post_ids[post], user_ids[author], f"Seeded comment {i}", False,
+                             created, created))
+            return rows
+
+        columns = ("public_id", "post_id", "author_id", "body", "edited", "created", "updated")
+        return self._insert(Comment, columns, self.sizes["comments"], make_rows)
+
+    def seed_likes(self, user_ids, post_ids, posts):
+        """Likes per post follow the post popularity, likers of one post are distinct users."""
+        Like = User.posts_liked.through
+        per_post = Counter()
+        for _, size in self._batches(self.sizes["likes"]):
+            per_post.update(posts.sample(size))
+        rows, inserted = [], 0
+        for post in sorted(per_post):
+            for user in self.rng.sample(range(len(user_ids)), min(per_post[post], len(user_ids))):
+                rows.append((user_ids[user], post_ids[post]))
+            if len(rows) >= self.batch_size:
+                self.writer.write(Like, ("user_id", "post_id"), rows)
+                inserted += len(rows)
+                rows = []
+        if rows:
+            self.writer.write(Like, ("user_id", "post_id"), rows)
+            inserted += len(rows)
+        self.writer.flush()
+        return inserted
+
+    def record_shards(self, user_ids, post_ids, comment_ids):
+        """With SHARDS set: the users copied to the shards, the posts and comments recorded where they are."""
+        for start in range(0, len(user_ids), self.batch_size):
+            router.replicate_users(list(User._base_manager.filter(pk__in=user_ids[start:start + self.batch_size])))
+        for model, ids, author in ((Post, post_ids, "author_id"), (Comment, comment_ids, "post__author_id")):
+            if not ids:
+                continue
+            rows = model._base_manager.filter(pk__gte=ids[0], pk__lte=ids[-1]).values_list("public_id", author)
+            rows = rows.iterator(chunk_size=self.batch_size)
+            while batch := list(itertools.islice(rows, self.batch_size)):
+                AuthorShard.objects.bulk_create(
+                    [AuthorShard(author_id=author_id, alias=self.using) for author_id in {row[1] for row in batch}],
+                    ignore_conflicts=True,
+                )
+                ObjectShard.objects.bulk_create(
+                    [ObjectShard(public_id=public_id, author_id=author_id) for public_id, author_id in batch]
+                )
+
+    def run(self, progress=None):
+        dataset = Dataset(now=self.now)
+
+        def step(name, count, started):
+            dataset.counts[name] = count
+            dataset.timings[name] = time.perf_counter() - started
+            if progress:
+                progress(name, count, dataset.timings[name])
+
+        with explicit_timestamps(User, Post, Comment), contextlib.closing(self.writer):
+            started = time.perf_counter()
+            user_ids = self.seed_users()
+            step("users", len(user_ids), started)
+            authors = ZipfSampler(len(user_ids), self.exponent, self.rng)
+
+            started = time.perf_counter()
+            post_ids = self.seed_posts(user_ids, authors) if user_ids else array("q")
+            step("posts", len(post_ids), started)
+            posts = ZipfSampler(len(post_ids), self.exponent, self.rng)
+
+            started = time.perf_counter()
+            comment_ids = self.seed_comments(user_ids, post_ids, authors, posts) if post_ids else array("q")
+            step("comments", len(comment_ids), started)
+
+            started = time.perf_counter()
+            step("likes", self.seed_likes(user_ids, post_ids, posts) if post_ids else 0, started)
+
+            if router.enabled():
+                self.record_shards(user_ids, post_ids, comment_ids)
+
+        # Hand the most active users and the most popular posts to the benchmark scenarios.
+        top_users = [user_ids[i] for i in authors.top(min(len(user_ids), 100))]
+        by_pk = User.objects.db_manager(self.using).in_bulk(top_users)
+        dataset.users = [by_pk[pk] for pk in top_users]
+        top_posts = [post_ids[i] for i in posts.top(min(len(post_ids), 1000))]
+        dataset.posts = [
+            public_id.hex
+            for public_id in Post.objects.db_manager(self.using)
+            .filter(pk__in=top_posts)
+            .order_by("pk")
+            .values_list("public_id", flat=True)
+        ]
+        return dataset
+
+
+def seed_dataset(users=50, posts=500, comments=1000, likes=2000, seed=0, **kwargs):
+    return SocialGraphSeeder(users=users, posts=posts, comments=comments, likes=likes, seed=seed, **kwargs).run()
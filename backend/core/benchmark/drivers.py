@@ -0,0 +1,132 @@
+"""Drivers send one request and report (status_code, latency). The in-process driver goes through
+django.test.Client, so the full middleware stack and the real URL conf are exercised without sockets. The
+HTTP driver talks to a threaded WSGI server started on a free local port.
+
+Both drivers count the SQL statements issued while serving requests in `queries`, the runner reads it before
+and after a run to get the queries per request."""
+
+import http.client
+import json
+import socket
+import threading
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.test import Client
+
+
+class QueryCounter:
+    """execute_wrapper counting the statements issued on the connection of the current thread."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class BaseDriver:
+    mode = None
+
+    def __init__(self):
+        self.queries = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()  # per worker thread client state
+
+    def add_queries(self, count):
+        with self._lock:
+            self.queries += count
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def request(self, method, path, body=None, token=None):
+        raise NotImplementedError
+
+
+class InProcessDriver(BaseDriver):
+    mode = "in-process"
+
+    def request(self, method, path, body=None, token=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = Client()
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            response = client.generic(
+                method,
+                path,
+                data=json.dumps(body) if body is not None else "",
+                content_type="application/json",
+                **headers,
+            )
+            latency = time.perf_counter() - start
+        self.add_queries(counter.count)
+        return response.status_code, latency
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    disable_nagle_algorithm = True  # headers and body are separate writes, Nagle would delay the body
+
+    def log_message(self, format, *args):  # one line per request would dominate the measurement
+        pass
+
+
+class HTTPDriver(BaseDriver):
+    mode = "http"
+
+    def __init__(self):
+        super().__init__()
+        self.handler = WSGIHandler()
+        self.server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietRequestHandler, allow_reuse_address=False)
+        self.server.set_app(self.application)
+        self.host, self.port = self.server.server_address[:2]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def application(self, environ, start_response):
+        # Runs in the server thread serving the request, so the wrapper sees that thread's connection.
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.handler(environ, start_response)
+            body = b"".join(response)  # render inside the wrapper, lazy bodies may still query
+        response.close()
+        self.add_queries(counter.count)
+        return [body]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def request(self, method, path, body=None, token=None):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port)
+            conn.connect()
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        headers = {"Content-Type": "application/json", "Host": "localhost"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        start = time.perf_counter()
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latency = time.perf_counter() - start
+        if response.will_close:
+            conn.close()
+            self._local.conn = None
+        return response.status, latency
+
+
+DRIVERS = {driver.mode: driver for driver in (InProcessDriver, HTTPDriver)}
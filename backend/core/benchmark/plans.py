@@ -0,0 +1,138 @@
+"""Query plans of the read endpoints, used by `manage.py bench --suite plans` and by the tests.
+
+Every SELECT an endpoint issues against the seeded dataset is captured and explained, with EXPLAIN (FORMAT
+JSON) on PostgreSQL and EXPLAIN QUERY PLAN on SQLite. A plan fails when it reads one of LARGE_TABLES with a
+sequential scan, or sorts rows read from one of them: both grow with the table, whatever the page size.
+
+A seeded dataset is small, the PostgreSQL planner would rightly scan it. The plans are taken with
+enable_seqscan and enable_sort off, which makes the planner use any index that can serve the query: a
+sequential scan or a sort left in the plan means there is no such index. Both databases are ANALYZEd first:
+without statistics SQLite guesses that `deleted IS NULL` picks a few rows, and sorts them.
+
+The COUNT(*) of the paginator reads every row it counts whatever the indexes, the .count() queries are left
+out; the page query that follows has the same filters and is checked."""
+
+import json
+import random
+import re
+
+from django.db import connection
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.benchmark.drivers import InProcessDriver
+from core.benchmark.runner import Context
+from core.benchmark.scenarios import ENDPOINTS
+from core.comment.models import Comment
+from core.post.models import Post
+from core.user.models import User
+
+PLAN_ENDPOINTS = ["post-list", "post-detail", "post-comment-list", "user-list", "sync"]
+REQUESTS = 5 # per endpoint, each query is explained once
+LARGE_TABLES = {model._meta.db_table for model in (Post, Comment, User, User.posts_liked.through)}
+
+_COUNT = re.compile(r'\s*SELECT COUNT\(\*\) AS "__count"')
+_SQLITE_SCAN = re.compile(r'^SCAN (\S+)')
+_SQLITE_SORT = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)')
+
+
+class QueryRecorder:
+    """execute_wrapper keeping the SELECT statements and their parameters."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT') and not _COUNT.match(sql):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def _postgresql_problems(node, large_tables):
+    """(problems, tables read) of a PostgreSQL plan node and its children."""
+    problems, read = [], set()
+    for child in node.get('Plans', ()):
+        child_problems, child_tables = _postgresql_problems(child, large_tables)
+        problems += child_problems
+        read |= child_tables
+    table = node.get('Relation Name')
+    if table in large_tables:
+        read.add(table)
+        if node['Node Type'] == 'Seq Scan':
+            problems.append(f'Seq Scan on {table}')
+    if node['Node Type'] in ('Sort', 'Incremental Sort') and read:
+        problems.append(f"Sort of {', '.join(sorted(read))} rows")
+    return problems, read
+
+
+def explain(sql, params, large_tables=LARGE_TABLES):
+    """The plan of one query, as text, and its problems."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET enable_seqscan = off; SET enable_sort = off')
+            try:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+            finally:
+                cursor.execute('RESET enable_seqscan; RESET enable_sort')
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            return json.dumps(plan, indent=1), _postgresql_problems(plan[0]['Plan'], large_tables)[0]
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            details = [row[3] for row in cursor.fetchall()]
+            problems = []
+            for detail in details:
+                scan = _SQLITE_SCAN.match(detail)
+                table = scan.group(1).strip('"') if scan else None
+                if table in large_tables and ' USING ' not in detail: # SCAN ... USING INDEX reads in index order
+                    problems.append(f'Seq Scan on {table}')
+                sort = _SQLITE_SORT.search(detail)
+                if sort and any(re.search(rf'\b{re.escape(table)}\b', sql) for table in large_tables):
+                    problems.append(f'Sort ({sort.group(1)})')
+            return '\n'.join(details), problems
+    raise NotImplementedError(f'No plan checks for {connection.vendor}')
+
+
+def capture(driver, endpoint, context, rng):
+    """The SELECT statements of one request to `endpoint`, sent as the dataset user."""
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        status, _ = driver.request(
+            endpoint.method,
+            endpoint.path(context, rng),
+            body=endpoint.body(context, rng) if endpoint.body else None,
+            token=context.token,
+        )
+    return status, recorder.queries
+
+
+def run(dataset, endpoints=PLAN_ENDPOINTS, requests=REQUESTS, seed=0, large_tables=LARGE_TABLES):
+    user = dataset.users[0]
+    context = Context(dataset=dataset, user=user, token=str(RefreshToken.for_user(user).access_token))
+    driver = InProcessDriver()
+    rng = random.Random(seed)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE') # statistics of the freshly seeded tables
+    results = []
+    for name in endpoints:
+        seen = set()
+        for _ in range(requests): # other posts, e.g. one with comments, run other queries
+            status, queries = capture(driver, ENDPOINTS[name], context, rng)
+            for sql, params in queries:
+                if sql in seen:
+                    continue
+                seen.add(sql)
+                plan, problems = explain(sql, params, large_tables)
+                results.append({'endpoint': name, 'status': status, 'sql': sql, 'plan': plan, 'problems': problems})
+    return {
+        'meta': {'database': connection.vendor, 'dataset': dataset.summary(), 'large_tables': sorted(large_tables)},
+        'results': results,
+    }
+
+
+def problems(results):
+    """One line per problem of a run()."""
+    return [
+        f"{row['endpoint']}: {problem}\n    {row['sql']}"
+        for row in results['results']
+        for problem in row['problems']
+    ]
@@ -0,0 +1,76 @@
+"""CPU cost of turning large post pages into JSON and back, with DRF's stdlib renderer/parser and with
+core.abstract's FastJSONRenderer/FastJSONParser. Used by `manage.py bench --suite render`."""
+
+import io
+import time
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.abstract.parsers import FastJSONParser
+from core.abstract.renderers import FastJSONRenderer, msgspec
+from core.post.models import Post
+from core.post.serializers import PostSerializer
+
+RENDERERS = {
+    "stdlib": (JSONRenderer, JSONParser),
+    "fast": (FastJSONRenderer, FastJSONParser),
+}
+
+
+def build_pages(user, page_size, pages):
+    """Paginated post list responses as the post-list endpoint builds them, seen by `user`."""
+    django_request = APIRequestFactory().get("/api/post/")
+    force_authenticate(django_request, user=user)
+    request = Request(django_request)
+    queryset = Post.objects.select_related("author").order_by("-created")
+    count = queryset.count()
+    documents = []
+    for number in range(pages):
+        offset = number * page_size
+        data = PostSerializer(queryset[offset:offset + page_size], many=True, context={"request": request}).data
+        if not data:
+            break
+        documents.append({
+            "count": count,
+            "next": f"http://testserver/api/post/?limit={page_size}&offset={offset + page_size}",
+            "previous": None,
+            "results": data,
+        })
+    return documents
+
+
+def _cpu_ms(func, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - start) * 1000 / iterations
+
+
+def run(dataset, page_size=100, pages=10, iterations=20):
+    documents = build_pages(dataset.users[0], page_size, pages)
+    results = []
+    for name, (renderer_class, parser_class) in RENDERERS.items():
+        renderer, parser = renderer_class(), parser_class()
+        bodies = [renderer.render(document, "application/json") for document in documents]
+        render_ms = _cpu_ms(lambda: [renderer.render(document, "application/json") for document in documents], iterations)
+        parse_ms = _cpu_ms(lambda: [parser.parse(io.BytesIO(body)) for body in bodies], iterations)
+        results.append({
+            "renderer": name,
+            "pages": len(documents),
+            "page_size": page_size,
+            "bytes_per_page": round(sum(map(len, bodies)) / len(bodies)),
+            "render_ms_per_page": round(render_ms / len(documents), 4),
+            "parse_ms_per_page": round(parse_ms / len(documents), 4),
+        })
+
+    baseline = results[0]
+    for row in results:
+        row["render_cpu_saved"] = round(1 - row["render_ms_per_page"] / baseline["render_ms_per_page"], 3)
+        row["parse_cpu_saved"] = round(1 - row["parse_ms_per_page"] / baseline["parse_ms_per_page"], 3)
+    return {
+        "meta": {"dataset": dataset.summary(), "iterations": iterations, "msgspec": getattr(msgspec, "__version__", None)},
+        "results": results,
+    }
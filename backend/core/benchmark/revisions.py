@@ -0,0 +1,94 @@
+"""Storage of the edit history (core/revision/history.py) against keeping a whole copy of every version, and
+the time to rebuild any version. Used by `manage.py bench --suite revisions`.
+
+Posts of the dataset are edited the way people edit: a typo fixed, a word swapped, a sentence added or taken
+out, now and then a rewrite of a paragraph. Every version is then rebuilt and checked against the text it had."""
+
+import random
+import statistics
+import time
+
+from core.post.models import Post
+from core.revision import history
+from core.revision.models import PostRevision
+
+WORDS = (
+    "the a of and to in is was for on that with as at by this from it an be are or have not but had his they "
+    "you were which one all we can her has there been if more when will would who so no out up into do than "
+    "time only new some could these two may first then any like other see now people how make our over"
+).split()
+
+
+def _sentence(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+    return " ".join(words).capitalize() + rng.choice(".!?")
+
+
+def _paragraph(rng, sentences=6):
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+
+def edit(body, rng):
+    """`body` after one edit."""
+    words = body.split(" ")
+    kind = rng.random()
+    index = rng.randrange(len(words))
+    if kind < 0.35: # a typo fixed
+        word = words[index]
+        words[index] = word[:-1] + rng.choice("aeiou") if len(word) > 2 else word + "s"
+    elif kind < 0.6: # a word swapped
+        words[index] = rng.choice(WORDS)
+    elif kind < 0.8: # a sentence added
+        words[index:index] = _sentence(rng).split(" ")
+    elif kind < 0.95: # a few words taken out
+        del words[index:index + rng.randint(1, 8)]
+    else: # a rewrite
+        return _paragraph(rng, sentences=rng.randint(3, 8))
+    return " ".join(words) or _sentence(rng)
+
+
+def run(dataset, posts=50, edits=40, seed=0):
+    rng = random.Random(seed)
+    edited = list(Post.objects.order_by("pk")[:posts])
+    full_copy_bytes = 0
+    expected = {}
+    for post in edited:
+        post.body = _paragraph(rng)
+        post.save()
+        bodies = []
+        for _ in range(edits):
+            bodies.append(post.body)
+            full_copy_bytes += len(post.body.encode())
+            body = post.body
+            while body == post.body: # an unchanged body keeps no revision
+                body = edit(post.body, rng)
+            with history.editing(post):
+                post.body = body
+                post.save()
+        expected[post.pk] = bodies
+
+    revisions = PostRevision.objects.filter(post__in=edited)
+    stored_bytes = sum(len(data.encode()) for data in revisions.values_list("data", flat=True))
+    timings, mismatches = [], 0
+    for post in edited:
+        for number, body in enumerate(expected[post.pk], start=1):
+            start = time.perf_counter()
+            _, rebuilt = history.version(post, number)
+            timings.append((time.perf_counter() - start) * 1000)
+            mismatches += rebuilt != body
+    count = revisions.count()
+    return {
+        "meta": {"dataset": dataset.summary(), "posts": len(edited), "edits": edits, "snapshot_every": history.SNAPSHOT_EVERY},
+        "results": [{
+            "revisions": count,
+            "snapshots": revisions.filter(full=True).count(),
+            "stored_bytes": stored_bytes,
+            "full_copy_bytes": full_copy_bytes,
+            "bytes_per_revision": round(stored_bytes / count, 1) if count else 0,
+            "full_copy_bytes_per_revision": round(full_copy_bytes / count, 1) if count else 0,
+            "saved": round(1 - stored_bytes / full_copy_bytes, 3) if full_copy_bytes else 0,
+            "rebuild_p50_ms": round(statistics.median(timings), 3) if timings else 0,
+            "rebuild_max_ms": round(max(timings), 3) if timings else 0,
+            "mismatches": mismatches,
+        }],
+    }
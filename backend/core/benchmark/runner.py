@@ -0,0 +1,118 @@
+"""Runs every (endpoint, mode, concurrency) combination against a seeded dataset and collects the results in
+one JSON-serializable document. See `manage.py bench --help` for the knobs."""
+
+import datetime
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import django
+from django.db import connection, connections
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.benchmark.drivers import DRIVERS
+from core.benchmark.scenarios import ENDPOINTS
+from core.benchmark.stats import summarize
+
+
+@dataclass
+class Context:
+    dataset: object
+    user: object  # the user the authenticated endpoints run as
+    token: str
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_endpoint(driver, endpoint, context, concurrency, requests, warmup=0, seed=0):
+    """Send `requests` requests to `endpoint` from `concurrency` worker threads and summarize them."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(index, count, last):
+        nonlocal errors
+        rng = random.Random(f"{seed}:{endpoint.name}:{index}")
+        local_latencies, local_errors = [], 0
+        try:
+            for _ in range(count):
+                status, latency = driver.request(
+                    endpoint.method,
+                    endpoint.path(context, rng),
+                    body=endpoint.body(context, rng) if endpoint.body else None,
+                    token=context.token if endpoint.authenticated else None,
+                )
+                local_latencies.append(latency)
+                if status >= 400:
+                    local_errors += 1
+        finally:
+            if last:
+                connections.close_all()  # the in-process driver opened them in this worker thread
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    def fan_out(pool, total, last):
+        share, rest = divmod(total, concurrency)
+        futures = [pool.submit(worker, i, share + (1 if i < rest else 0), last) for i in range(concurrency)]
+        for future in futures:
+            future.result()
+
+    # The same worker threads, and so the same connections, serve the warmup and the measured requests.
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if warmup:
+            fan_out(pool, warmup, last=False)
+            latencies.clear()
+            errors = 0
+
+        queries_before = driver.queries
+        start = time.perf_counter()
+        fan_out(pool, requests, last=True)
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, elapsed, driver.queries - queries_before, errors)
+
+
+def run(dataset, endpoints, modes, concurrency_levels, requests, warmup=0, seed=0, progress=None):
+    user = dataset.users[0]
+    context = Context(dataset=dataset, user=user, token=str(RefreshToken.for_user(user).access_token))
+    results = []
+    for mode in modes:
+        driver = DRIVERS[mode]().start()
+        try:
+            for name in endpoints:
+                for concurrency in concurrency_levels:
+                    row = {"endpoint": name, "mode": mode, "concurrency": concurrency}
+                    row.update(
+                        run_endpoint(driver, ENDPOINTS[name], context, concurrency, requests, warmup, seed)
+                    )
+                    results.append(row)
+                    if progress:
+                        progress(row)
+        finally:
+            driver.stop()
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "dataset": dataset.summary(),
+            "requests": requests,
+            "warmup": warmup,
+            "seed": seed,
+        },
+        "results": results,
+    }
@@ -0,0 +1,71 @@
+"""The endpoints driven by the benchmark. Each endpoint builds its request from the seeded dataset and a
+per-worker random.Random, so the same run arguments always produce the same request sequence."""
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.benchmark.dataset import BENCH_PASSWORD
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    method: str
+    path: Callable  # (context, rng) -> str
+    body: Optional[Callable] = None  # (context, rng) -> dict
+    authenticated: bool = False
+
+
+def _post_path(suffix=""):
+    return lambda ctx, rng: f"/api/post/{rng.choice(ctx.dataset.posts)}/{suffix}"
+
+
+def _sync_path(ctx, rng):
+    # a client that last synced a few minutes before the last rows of the dataset
+    from django.utils import timezone
+    from core.sync import delta
+
+    now = timezone.now()
+    cursor = delta.start(now)
+    since = (ctx.dataset.now - timedelta(minutes=rng.randint(1, 10)), 0)
+    cursor.update(posts=since, comments=since)
+    return f"/api/sync/?since={delta.dumps(cursor)}"
+
+
+ENDPOINTS = {
+    endpoint.name: endpoint
+    for endpoint in (
+        Endpoint("post-list", "GET", lambda ctx, rng: "/api/post/"),
+        Endpoint("post-detail", "GET", _post_path()),
+        Endpoint("post-comment-list", "GET", _post_path("comment/")),
+        Endpoint("user-list", "GET", lambda ctx, rng: "/api/user/", authenticated=True),
+        Endpoint(
+            "auth-login",
+            "POST",
+            lambda ctx, rng: "/api/auth/login/",
+            body=lambda ctx, rng: {"email": rng.choice(ctx.dataset.users).email, "password": BENCH_PASSWORD},
+        ),
+        Endpoint(
+            # refresh tokens are single use with rotation, every request sends a new one
+            "auth-refresh",
+            "POST",
+            lambda ctx, rng: "/api/auth/refresh/",
+            body=lambda ctx, rng: {"refresh": str(RefreshToken.for_user(rng.choice(ctx.dataset.users)))},
+        ),
+        Endpoint(
+            "post-create",
+            "POST",
+            lambda ctx, rng: "/api/post/",
+            body=lambda ctx, rng: {"author": ctx.user.public_id.hex, "body": f"Bench post {rng.random()}"},
+            authenticated=True,
+        ),
+        Endpoint("post-like", "POST", _post_path("like/"), authenticated=True),
+        Endpoint("trending", "GET", lambda ctx, rng: "/api/trending/"),
+        Endpoint("sync", "GET", _sync_path, authenticated=True),
+    )
+}
+
+DEFAULT_ENDPOINTS = ["post-list", "post-detail", "post-comment-list", "user-list", "auth-login", "auth-refresh", "post-like"]
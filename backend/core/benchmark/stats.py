@@ -0,0 +1,52 @@
+"""Small helpers turning raw latency samples into the numbers written to the result file."""
+
+import math
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list of samples."""
+    if not samples:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(samples))
+    return samples[min(max(rank, 1), len(samples)) - 1]
+
+
+def summarize(latencies, elapsed, queries, errors):
+    """latencies are in seconds, elapsed is the wall-clock time of the whole run."""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "queries_per_request": round(queries / count, 2) if count else 0.0,
+    }
+
+
+def compare(baseline, current, tolerance=0.1):
+    """Return a list of human readable regressions of `current` against `baseline`.
+
+    Both arguments are result documents as written by the runner. A run regresses when its throughput drops
+    or its p95 latency grows by more than `tolerance`, or when it issues more queries per request.
+    """
+    previous = {(row["endpoint"], row["mode"], row["concurrency"]): row for row in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        key = (row["endpoint"], row["mode"], row["concurrency"])
+        before = previous.get(key)
+        if before is None:
+            continue
+        label = "%s [%s, c=%s]" % key
+        if before["rps"] and row["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{label}: rps {before['rps']} -> {row['rps']}")
+        if before["p95_ms"] and row["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {before['p95_ms']}ms -> {row['p95_ms']}ms")
+        if row["queries_per_request"] > before["queries_per_request"]:
+            regressions.append(
+                f"{label}: queries/request {before['queries_per_request']} -> {row['queries_per_request']}"
+            )
+    return regressions
@@ -0,0 +1,106 @@
+from collections import Counter
+
+import pytest
+
+from core.benchmark import plans, runner
+from core.benchmark.dataset import SocialGraphSeeder, seed_dataset
+from core.benchmark.stats import compare, percentile
+from core.post.models import Post
+
+
+def test_percentile():
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile(samples, 99) == 99
+    assert percentile([], 99) == 0.0
+
+
+def test_compare_flags_regressions():
+    row = {"endpoint": "post-list", "mode": "http", "concurrency": 1}
+    baseline = {"results": [{**row, "rps": 100.0, "p95_ms": 10.0, "queries_per_request": 3.0}]}
+    current = {"results": [{**row, "rps": 50.0, "p95_ms": 10.5, "queries_per_request": 4.0}]}
+
+    regressions = compare(baseline, current, tolerance=0.1)
+
+    assert len(regressions) == 2  # throughput and queries, p95 is within tolerance
+
+
+@pytest.mark.django_db(transaction=True)  # the workers run in their own threads with their own connections
+def test_run_in_process():
+    dataset = seed_dataset(users=3, posts=5, comments=5, likes=5)
+
+    results = runner.run(dataset, ["post-list", "post-detail"], ["in-process"], [2], requests=6)
+
+    assert [row["endpoint"] for row in results["results"]] == ["post-list", "post-detail"]
+    for row in results["results"]:
+        assert row["requests"] == 6
+        assert row["errors"] == 0
+        assert row["queries_per_request"] > 0
+    assert results["meta"]["dataset"]["posts"] == 5
+
+
+@pytest.mark.django_db(transaction=True)  # COPY batches are committed by their own connections
+def test_seed_is_deterministic_and_skewed():
+    def authorship(prefix):
+        SocialGraphSeeder(users=20, posts=200, comments=50, likes=100, seed=7, prefix=prefix).run()
+        return [
+            (body, username.split("_")[1], created)
+            for body, username, created in Post.objects.filter(author__username__startswith=f"{prefix}_")
+            .order_by("body")
+            .values_list("body", "author__username", "created")
+        ]
+
+    first, second = authorship("first"), authorship("second")
+
+    assert first == second
+    posts_per_author = sorted(Counter(author for _, author, _ in first).values(), reverse=True)
+    assert posts_per_author[0] > 4 * posts_per_author[len(posts_per_author) // 2]
+
+
+@pytest.mark.django_db(transaction=True)  # COPY batches are committed by their own connections
+def test_read_endpoint_plans_use_indexes():
+    dataset = seed_dataset(users=20, posts=200, comments=400, likes=400)
+
+    results = plans.run(dataset)
+
+    assert {row["endpoint"] for row in results["results"]} == set(plans.PLAN_ENDPOINTS)
+    assert all(row["status"] == 200 for row in results["results"])
+    assert any("core_comment_comment" in row["sql"] for row in results["results"])  # a post with comments was read
+    assert plans.problems(results) == []
+
+
+@pytest.mark.django_db
+def test_plan_problems_are_reported():
+    sql = f'SELECT "id" FROM "{Post._meta.db_table}" ORDER BY "body"'  # no index on body
+
+    _, problems = plans.explain(sql, [])
+
+    assert problems
+
+
+@pytest.mark.django_db(transaction=True)  # COPY batches are committed by their own connections
+def test_revision_history_is_smaller_than_copies():
+    from core.benchmark import revisions
+
+    dataset = seed_dataset(users=5, posts=20, comments=0, likes=0, seed=3)
+    row = revisions.run(dataset, posts=5, edits=20)["results"][0]
+
+    assert row["revisions"] == 100
+    assert row["mismatches"] == 0
+    assert row["stored_bytes"] < row["full_copy_bytes"] / 2
+
+
+@pytest.mark.django_db(transaction=True)  # COPY batches are committed by their own connections
+def test_compression_saves_bytes():
+    from core.benchmark import compression
+
+    dataset = seed_dataset(users=5, posts=40, comments=0, likes=0, seed=3)
+    results = compression.run(dataset, page_size=20, pages=2, iterations=2)["results"]
+
+    assert results[0]["encoding"] == "identity"
+    for row in results[1:]:
+        assert row["requests"] == 4
+        assert row["bytes_saved"] > 0.5
+    cold, cached = (row for row in results if row["encoding"] == "gzip")
+    assert cached["bytes_per_request"] == cold["bytes_per_request"]
@@ -1,10 +1,30 @@
 from django.contrib import admin
+from core.abstract.admin import LargeTableAdminMixin, LookupFilter, SoftDeleteAdminMixin
 from .models import Comment
 
+
+class AuthorFilter(LookupFilter):
+    title = 'author'
+    parameter_name = 'author'
+    lookup = 'author__username'
+    placeholder = 'username'
+
+
+class PostFilter(LookupFilter):
+    title = 'post'
+    parameter_name = 'post'
+    lookup = 'post__public_id'
+    placeholder = 'post id'
+
+
 @admin.register(Comment)
-class PostAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdminMixin, SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ('post', 'author','body', 'edited', 'created', 'updated')
-    list_filter = ('edited', 'created', 'author', 'post')
-    search_fields = ('body', 'author__email', 'author__username',)
-    ordering = ('-created',)
-    readonly_fields = ('created', 'updated')
\ No newline at end of file
+    list_select_related = ('author', 'post__author') #str(post) is the name of its author
+    list_filter = ('edited', 'created', AuthorFilter, PostFilter)
+    search_fields = ('body', '=author__username') #body: trigram index of migration 0004 on PostgreSQL
+    search_help_text = 'Words of the body, or the exact username of the author.'
+    ordering = ('-created',) #comment_created_idx
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',) #a select of every post otherwise
+    readonly_fields = ('created', 'updated')
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_comment', '0005_comment_comment_post_updated_idx'),
+        ('core_post', '0008_remove_post_post_live_updated_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('deleted__isnull', True)), fields=['-updated', '-id'], name='comment_live_updated_idx'),
+        ),
+    ]
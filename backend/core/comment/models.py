@@ -1,8 +1,9 @@
 from django.db import models
 from core.abstract.models import AbstractModel, AbstractManager
+from core.shard.router import ShardedManagerMixin
 
-class CommentManager(AbstractManager):
-    pass
+class CommentManager(ShardedManagerMixin, AbstractManager): #create() saves next to the post when SHARDS is set
+    hidden_with = ("post", "author") #the comments of a soft-deleted post or user are hidden too
 
 class Comment(AbstractModel):
     post = models.ForeignKey("core_post.Post", on_delete=models.PROTECT) ## Creates a foreign key relationship to the Post model; PROTECT prevents deletion of a Post if any related object (like a comment) exists.
@@ -13,4 +14,11 @@ class Comment(AbstractModel):
     objects= CommentManager() # Replaces the default model manager with a custom one (CommentManager) that can include extra query methods 
     
     def __str__(self):
-        return self.author.name
\ No newline at end of file
+        return self.author.name
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created'], name='comment_created_idx'), #the range read by each analytics rollup
+            models.Index(fields=['post', '-updated'], name='comment_post_updated_idx', condition=models.Q(deleted__isnull=True)), #the comments of a post, newest first
+            models.Index(fields=['-updated', '-id'], name='comment_live_updated_idx', condition=models.Q(deleted__isnull=True)), #the (updated, id) positions of /api/sync/
+        ]
\ No newline at end of file
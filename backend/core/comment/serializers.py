@@ -6,6 +6,12 @@ from core.user.models import User
 from core.user.serializers import UserSerializer
 from core.comment.models import Comment
 from core.post.models import Post
+from core.shard.fields import ShardedSlugRelatedField
+from core.tag.links import link, relink
+from core.moderation.duplicates import screen
+from core.moderation.filter import check_terms
+from core.revision import history as revisions
+from core.moderation.models import COMMENT
 
 class CommentSerializer(AbstractSerializer):
     author = serializers.SlugRelatedField(queryset= User.objects.all(), slug_field= 'public_id',)
@@ -15,7 +21,7 @@ class CommentSerializer(AbstractSerializer):
 # list of valid User instances this field can accept #(for validation during deserialization).
 # slug_field= 'public_id' Uses the 'public_id' field of the User model to represent the user instead of the 
 # default primary key (id).
-    post = serializers.SlugRelatedField(queryset = Post.objects.all(), slug_field ='public_id')
+    post = ShardedSlugRelatedField(queryset = Post.objects.all(), slug_field ='public_id') #a SlugRelatedField reading from the post's shard
 #A DRF field that represents the related `Post` model using its `public_id` instead of the default PK.
 #`queryset`: allows validation by fetching from Post model.
 #`slug_field='public_id'`: uses the `public_id` field as the lookup key in input/output.
@@ -33,17 +39,30 @@ class CommentSerializer(AbstractSerializer):
 #value is the new value provided by the user (typically through the API request) for the field you're validating.
 #It's passed automatically to the validate_<field_name> method by DRF.
         if self.instance:
-            return self.instance.value
+            return self.instance.post
         # If creating a new instance, use the provided value
         return value
     
     
+    def create(self, validated_data):
+        check_terms(validated_data['body']) #banned terms, see core/moderation/filter.py
+        screening = screen(COMMENT, validated_data['body']) #near-duplicate spam, see core/moderation/duplicates.py
+        instance = super().create(validated_data)
+        link([instance]) #indexes the #hashtags and @mentions of the body, see core/tag/links.py
+        screening.remember(instance)
+        return instance
+
     def update(self, instance, validated_data):
+        if 'body' in validated_data:
+            check_terms(validated_data['body'])
         if not instance.edited:
         # If the object hasn't been marked as edited yet  Mark it as edited before updating
             validated_data['edited']= True
         # Call the default update method to apply the changes
-        instance = super().update(instance, validated_data)
+        with revisions.editing(instance): #keeps the previous body, see core/revision/history.py
+            instance = super().update(instance, validated_data)
+        if 'body' in validated_data:
+            relink(instance)
         return instance
 # '''update method: This is part of a Django REST Framework serializer. It's called when you use the serializer 
 # to update an existing object (e.g., via a PUT or PATCH request). validated_data: A dictionary of cleaned and 
@@ -51,15 +70,8 @@ class CommentSerializer(AbstractSerializer):
 # to save changes to the database.'''
 
     
-    def to_representation(self, instance):
-        rep = super().to_representation(instance) #Gets the default serialized representation of the model instance
-#using the parent class. Often used as a base to modify or enrich the output before returning the final response.
-        author = User.objects.get_object_by_public_id(rep["author"])#Retrieves the User instance using a custom 
-#manager method `get_object_by_public_id()`  Looks up the user based on the public_id present in the serialized
-# `author` field.
-        rep["author"] = UserSerializer(author).data #Replaces the default author field (e.g., just an ID or 
-#public_id) with full serialized user data. Useful for embedding detailed author info directly into the response.
-        return rep
+    expandable_fields = {"author": UserSerializer} #The author is rendered with UserSerializer unless the client sent ?fields=/?expand=
+    default_expand = ("author",)                   #without author in ?expand=, see AbstractSerializer.
     
     
     class Meta:
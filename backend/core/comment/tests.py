@@ -11,3 +11,23 @@ def test_create_comment(user, post):
     assert comment.post == post
     assert comment.body == "Test Comment"
     
+@pytest.mark.django_db
+def test_list_comments_author_not_expanded(client, user, post):
+    comment = Comment.objects.create(author=user, post=post, body="Test Comment")
+    
+    response = client.get(f"/api/post/{post.public_id.hex}/comment/?fields=id,author")
+    
+    assert response.json()["results"] == [{"id": comment.public_id.hex, "author": user.public_id.hex}]
+
+@pytest.mark.django_db
+def test_list_comments_compiled_matches_serializer(client, user, post, monkeypatch):
+    from core.abstract import viewsets
+
+    Comment.objects.create(author=user, post=post, body="First")
+    Comment.objects.create(author=user, post=post, body="Second")
+    url = f"/api/post/{post.public_id.hex}/comment/"
+
+    compiled = client.get(url).content
+    monkeypatch.setattr(viewsets, "compile_serializer", lambda serializer: None)
+
+    assert compiled == client.get(url).content
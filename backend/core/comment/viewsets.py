@@ -1,16 +1,24 @@
+from django.db.models import Subquery
 from django.http.response import Http404
 from rest_framework.response import Response
 from rest_framework import status
 
 from core.abstract.viewsets import AbstractViewSet
+from core.archive import reads as archive
+from core.archive.models import ArchivedComment
 from core.comment.models import Comment
 from core.comment.serializers import CommentSerializer
+from core.revision.viewsets import RevisionsMixin
+from core.post.models import Post
+from core.shard.router import db_for_public_id
 from core.auth.permissions import UserPermission
 
-class CommentViewSet(AbstractViewSet):
+class CommentViewSet(RevisionsMixin, AbstractViewSet): #/post/{post_id}/comment/{id}/revisions/, see core/revision/history.py
     http_method_names = ('post', 'get', 'put', 'delete')
-    permission_classes = UserPermission
+    permission_classes = (UserPermission,)
     serializer_class = CommentSerializer
+    archived_model = ArchivedComment #the revisions of the archived comments, see RevisionsMixin
+    throttle_scopes = {'create': ('comment-create-user',)} #sliding windows per user, see core/auth/throttling.py
     
     
     def get_queryset(self):
@@ -27,7 +35,9 @@ class CommentViewSet(AbstractViewSet):
 # into your view functions or classes.
         if post_pk is None:
             return Http404
-        queryset = Comment.objects.filter (post__public_id = post_pk)
+        post_id = Post._base_manager.filter(public_id=post_pk).values('pk')[:1] #a subquery: with the post id the comments are read
+        #in order from comment_post_updated_idx, a join on post__public_id sorts all the comments of the post
+        queryset = Comment.objects.using(db_for_public_id(Post, post_pk)).filter(post_id=Subquery(post_id)) #on the post's shard, see core/shard/router.py
         
         return queryset
     
@@ -43,6 +53,28 @@ class CommentViewSet(AbstractViewSet):
         #If the user does not have permission, it raises: PermissionDenied (HTTP 403)
         # Here, pk is represented by comment_pk. /api/post/post_pk/comment/comment_pk/
         return obj
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if response.data.get('results') or self.request.user.is_superuser: #only an empty page can be an archived post
+            return response
+        post_pk = self.kwargs['post_pk']
+        if Post._base_manager.using(db_for_public_id(Post, post_pk)).filter(public_id=post_pk).exists():
+            return response #a hot post, its comments are all in the hot table
+        archived = archive.comments(post_pk) #paginated in SQL, see core/archive/reads.py
+        if archived is None:
+            return response
+        page = self.paginate_queryset(archived)
+        return self.get_paginated_response(archive.represent_comments(page, self.get_serializer_context()))
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            data = archive.comment(kwargs['pk'], self.get_serializer_context()) #comments of posts moved out by manage.py archive
+            if data is None:
+                raise
+            return Response(data)
 # In Django REST Framework (DRF), the `create(self, request, *args, **kwargs)` method includes `request` as a
 # parameter because DRF calls this method automatically when a POST request is made to the API. Since DRF is 
 # handling the request, it passes the `request` object directly to `create()`, so you use it as a function argument.
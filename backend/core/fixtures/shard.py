@@ -0,0 +1,33 @@
+import pytest
+from django.core.management import call_command
+from django.db import connections
+
+from core.shard import router
+
+SHARD_ALIASES = ["shard_a", "shard_b"]
+
+
+def _reset_router():
+    # the ring and the id blocks of the process belong to the previous SHARDS
+    router._ring.update(ring=None, loaded=0.0)
+    router._blocks.clear()
+
+
+# Two SQLite databases, migrated, and SHARDS set to them; the users created afterwards are copied to them
+@pytest.fixture
+def shards(db, settings, tmp_path):
+    for alias in SHARD_ALIASES:
+        connections.settings[alias] = connections.configure_settings(
+            {"default": connections.settings["default"], alias: {"ENGINE": "django.db.backends.sqlite3", "NAME": str(tmp_path / f"{alias}.sqlite3")}}
+        )[alias] # the defaults of the missing keys (ATOMIC_REQUESTS, TEST, ...)
+        connections[alias].connect() # opened here: the test case only lets the databases it declares connect
+        call_command("migrate", database=alias, verbosity=0)
+    settings.SHARDS = SHARD_ALIASES
+    _reset_router()
+    yield SHARD_ALIASES
+    settings.SHARDS = []
+    _reset_router()
+    for alias in SHARD_ALIASES:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
@@ -0,0 +1,74 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.archive import partitions
+from core.archive.archiver import Archiver
+from core.shard.router import databases
+
+
+def _months_back(month, count):
+    for _ in range(count):
+        month = partitions.month_of(month.replace(day=1) - timedelta(days=1))
+    return month
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the posts older than --days, with their comments, to the archive tables (partitioned by month "
+        "on PostgreSQL), create the partitions of the coming months, and freeze or detach the old ones. "
+        "Archived posts stay readable by public_id."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=180, help="Archive the posts older than this.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Posts moved per transaction.")
+        parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between chunks.")
+        parser.add_argument("--ahead", type=int, default=2, help="Create the partitions of the next N months to archive.")
+        parser.add_argument("--cool-after", type=int, default=0, help="Freeze the partitions older than N months, 0 skips it.")
+        parser.add_argument("--tablespace", help="Also move the frozen partitions to this tablespace.")
+        parser.add_argument(
+            "--detach-after", type=int, default=0,
+            help="Detach the partitions older than N months, their posts are no longer readable. 0 skips it.",
+        )
+        parser.add_argument("--interval", type=float, default=0, help="Run again every N seconds, 0 runs once.")
+        parser.add_argument("--database", help="Archive this database only, by default each of the shards (SHARDS) or default.")
+
+    def handle(self, *args, **options):
+        aliases = [options["database"]] if options["database"] else databases()
+        while True:
+            now = timezone.now()
+            for using in aliases: #the posts are archived on their shard
+                self._archive(now, using, options)
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def _archive(self, now, using, options):
+        cutoff = now - timedelta(days=options["days"])
+        month = partitions.month_of(cutoff)
+        months = [month]
+        for _ in range(options["ahead"]):
+            months.append(partitions.next_month(months[-1]))
+        for name in partitions.ensure(months, using):
+            self.stdout.write(f"created partition {name}")
+
+        counts = Archiver(
+            cutoff, chunk_size=options["chunk_size"], pause=options["pause"], using=using,
+            progress=self._progress if options["verbosity"] > 1 else None,
+        ).run()
+        if any(counts.values()) or options["verbosity"] > 1:
+            self.stdout.write(f"{counts['posts']} posts and {counts['comments']} comments archived")
+
+        this_month = partitions.month_of(now)
+        if options["cool_after"]:
+            for name in partitions.cool(_months_back(this_month, options["cool_after"]), options["tablespace"], using):
+                self.stdout.write(f"froze partition {name}")
+        if options["detach_after"]:
+            for name in partitions.detach(_months_back(this_month, options["detach_after"]), using):
+                self.stdout.write(f"detached partition {name}")
+
+    def _progress(self, posts, comments):
+        self.stdout.write(f"{posts:>10} posts {comments:>10} comments archived")
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.comment.models import Comment
+from core.post.models import Post
+from core.shard.router import databases
+from core.tag.links import link
+
+MODELS = {"post": Post, "comment": Comment}
+
+
+class Command(BaseCommand):
+    help = (
+        "Index the #hashtags and @mentions of the existing posts and comments. Rows are read in primary key "
+        "order in chunks, each chunk written in its own transaction; running it again only adds what is missing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--models", default="post,comment", help="Any of: post, comment.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--start", type=int, default=0, help="Resume after this primary key.")
+
+    def handle(self, *args, **options):
+        names = [item.strip() for item in options["models"].split(",") if item.strip()]
+        unknown = set(names) - set(MODELS)
+        if unknown:
+            raise CommandError(f"Unknown model: {', '.join(sorted(unknown))}")
+        for name in names:
+            model = MODELS[name]
+            total = 0
+            for alias in databases(): #the links are written on the shard of their post
+                last = options["start"]
+                while True:
+                    # keyset pagination: each chunk is an index range scan whatever the progress
+                    chunk = list(
+                        model.objects.using(alias).filter(pk__gt=last).order_by("pk")
+                        .only("pk", "body", "created")[:options["chunk_size"]]
+                    )
+                    if not chunk:
+                        break
+                    with transaction.atomic(using=alias):
+                        link(chunk, trend=False) #old posts are not trending news
+                    last, total = chunk[-1].pk, total + len(chunk)
+                    self.stdout.write(f"{name}: {total} rows, last pk {last} on {alias}")
+            self.stdout.write(self.style.SUCCESS(f"{name}: {total} rows indexed"))
@@ -0,0 +1,172 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+
+from core.benchmark import compression, plans, rendering, revisions, runner
+from core.benchmark.dataset import seed_dataset
+from core.benchmark.drivers import DRIVERS
+from core.benchmark.scenarios import DEFAULT_ENDPOINTS, ENDPOINTS
+from core.benchmark.stats import compare
+from core.shard.router import databases
+
+
+def _csv(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load benchmark of the API endpoints. Seeds a synthetic dataset in a throwaway test database, drives "
+        "the real URL conf in-process and over a local HTTP server at fixed concurrency levels and reports "
+        "requests/s, p50/p95/p99 latency and queries per request. --suite render instead measures the CPU "
+        "spent rendering and parsing large post pages with each JSON renderer. --suite plans explains every "
+        "query of the read endpoints and fails on a sequential scan or a sort of a large table. --suite revisions "
+        "edits posts many times and compares the bytes of their edit history with whole copies of each version. "
+        "--suite compression measures the bytes and CPU per post page, uncompressed and with each encoding."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--suite", choices=["api", "render", "plans", "revisions", "compression"], default="api")
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--posts", type=int, default=500)
+        parser.add_argument("--comments", type=int, default=1000)
+        parser.add_argument("--likes", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the dataset and of the request sequence.")
+        parser.add_argument(
+            "--endpoints", type=_csv, default=DEFAULT_ENDPOINTS, help=f"Any of: {', '.join(ENDPOINTS)}."
+        )
+        parser.add_argument("--modes", type=_csv, default=list(DRIVERS), help=f"Any of: {', '.join(DRIVERS)}.")
+        parser.add_argument("--concurrency", type=lambda v: [int(c) for c in _csv(v)], default=[1, 4, 16])
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per combination.")
+        parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests sent first.")
+        parser.add_argument("--page-size", type=int, default=100, help="Posts per page of the render and compression suites.")
+        parser.add_argument("--pages", type=int, default=10, help="Pages rendered by the render and compression suites.")
+        parser.add_argument("--iterations", type=int, default=20, help="Repetitions of the render and compression suites.")
+        parser.add_argument("--edits", type=int, default=40, help="Edits per post of the revisions suite.")
+        parser.add_argument("--output", help="Write the JSON results to this file.")
+        parser.add_argument("--baseline", help="Results of a previous run to compare against.")
+        parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative slowdown.")
+        parser.add_argument(
+            "--throttle", action="store_true", help="Keep the throttle rates, by default they are turned off."
+        )
+        parser.add_argument(
+            "--no-test-db",
+            action="store_true",
+            help="Seed and run against the configured databases instead of throwaway test databases.",
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options["endpoints"]) - set(ENDPOINTS) or set(options["modes"]) - set(DRIVERS)
+        if unknown:
+            raise CommandError(f"Unknown endpoint or mode: {', '.join(sorted(unknown))}")
+
+        old_names = {}
+        if not options["no_test_db"]:
+            # the shards too: the seeded users are copied to them (replicate_users) and would overwrite the
+            # copies of the real users with the same ids
+            for alias in dict.fromkeys([DEFAULT_DB_ALIAS, *databases()]):
+                old_names[alias] = connections[alias].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # DEBUG would keep every query in memory, the test client and the local server use these hosts.
+            overrides = {"DEBUG": False, "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver", "localhost"]}
+            if not options["throttle"]:  # all the requests come from one client and one user
+                overrides["REST_FRAMEWORK"] = {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}
+            with override_settings(**overrides):
+                dataset = seed_dataset(
+                    users=options["users"],
+                    posts=options["posts"],
+                    comments=options["comments"],
+                    likes=options["likes"],
+                    seed=options["seed"],
+                )
+                if options["suite"] == "render":
+                    results = rendering.run(
+                        dataset, page_size=options["page_size"], pages=options["pages"], iterations=options["iterations"]
+                    )
+                    for row in results["results"]:
+                        self._render_progress(row)
+                elif options["suite"] == "compression":
+                    results = compression.run(
+                        dataset, page_size=options["page_size"], pages=options["pages"], iterations=options["iterations"]
+                    )
+                    for row in results["results"]:
+                        self._compression_progress(row)
+                elif options["suite"] == "revisions":
+                    results = revisions.run(dataset, edits=options["edits"], seed=options["seed"])
+                    for row in results["results"]:
+                        self._revision_progress(row)
+                elif options["suite"] == "plans":
+                    results = plans.run(dataset, seed=options["seed"])
+                    for row in results["results"]:
+                        self._plan_progress(row)
+                else:
+                    results = runner.run(
+                        dataset,
+                        options["endpoints"],
+                        options["modes"],
+                        options["concurrency"],
+                        options["requests"],
+                        warmup=options["warmup"],
+                        seed=options["seed"],
+                        progress=self._progress,
+                    )
+        finally:
+            for alias, old_name in old_names.items():
+                connections[alias].creation.destroy_test_db(old_name, verbosity=0)
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options["suite"] == "plans":
+            problems = plans.problems(results)
+            if problems:
+                raise CommandError("Query plans without a usable index:\n  " + "\n  ".join(problems))
+            self.stdout.write(self.style.SUCCESS("Every query plan uses an index."))
+
+        if options["suite"] == "revisions" and results["results"][0]["mismatches"]:
+            raise CommandError(f"{results['results'][0]['mismatches']} versions were not rebuilt as written.")
+
+        if options["baseline"] and options["suite"] == "api":
+            with open(options["baseline"]) as fh:
+                regressions = compare(json.load(fh), results, options["tolerance"])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regression against the baseline."))
+
+    def _progress(self, row):
+        self.stdout.write(
+            "{endpoint:<20} {mode:<10} c={concurrency:<3} {rps:>9.1f} req/s  p50 {p50_ms:>8.2f}ms  "
+            "p95 {p95_ms:>8.2f}ms  p99 {p99_ms:>8.2f}ms  {queries_per_request:>6.2f} q/req  "
+            "{errors} errors".format(**row)
+        )
+
+    def _plan_progress(self, row):
+        self.stdout.write(
+            f"{row['endpoint']:<20} {'; '.join(row['problems']) or 'ok':<40} {' '.join(row['sql'].split())[:100]}"
+        )
+
+    def _revision_progress(self, row):
+        self.stdout.write(
+            "{revisions} revisions ({snapshots} snapshots): {bytes_per_revision} bytes/revision against "
+            "{full_copy_bytes_per_revision} for whole copies ({saved:+.1%} saved), rebuilt in "
+            "p50 {rebuild_p50_ms:.3f}ms, max {rebuild_max_ms:.3f}ms".format(**row)
+        )
+
+    def _compression_progress(self, row):
+        self.stdout.write(
+            "{encoding:<8} {cache:<6} {bytes_per_request:>9} bytes/request ({bytes_saved:+.1%} saved)  "
+            "cpu {cpu_ms_per_request:>8.3f}ms/request ({extra_cpu_ms:+.3f}ms), in the middleware "
+            "{middleware_ms_per_request:.3f}ms".format(**row)
+        )
+
+    def _render_progress(self, row):
+        self.stdout.write(
+            "{renderer:<8} {bytes_per_page:>9} bytes/page  render {render_ms_per_page:>8.3f}ms/page "
+            "({render_cpu_saved:+.1%} saved)  parse {parse_ms_per_page:>8.3f}ms/page "
+            "({parse_cpu_saved:+.1%} saved)".format(**row)
+        )
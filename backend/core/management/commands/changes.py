@@ -0,0 +1,52 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from core.outbox.feed import BATCH_SIZE, acknowledge, compact, load_cursor, read
+
+
+class Command(BaseCommand):
+    help = (
+        "Hand the new change events (core/outbox/feed.py) to a consumer, in batches, and acknowledge each batch "
+        "once it is handled: a batch interrupted before is handed again. The events are written as JSON lines "
+        "to the standard output, or passed to --handler, a dotted path to a function taking a list of events. "
+        "--compact deletes the superseded and expired events instead. Run it from cron, or keep it running "
+        "with --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--consumer", help="Name of the consumer, its cursor is kept in ChangeCursor.")
+        parser.add_argument("--handler", help="Dotted path of a function called with each batch of events.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--compact", action="store_true")
+        parser.add_argument("--interval", type=float, default=0, help="Run again every N seconds, 0 runs once.")
+
+    def handle(self, *args, **options):
+        if not options["compact"] and not options["consumer"]:
+            raise CommandError("--consumer is required, or --compact.")
+        handler = import_string(options["handler"]) if options["handler"] else self.write
+        while True:
+            if options["compact"]:
+                deleted = compact()
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"{deleted} events compacted")
+            else:
+                self.consume(options["consumer"], handler, options["batch_size"])
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def write(self, events):
+        for event in events:
+            self.stdout.write(json.dumps(event))
+
+    def consume(self, consumer, handler, batch_size):
+        while True:
+            events, positions = read(load_cursor(consumer), batch_size)
+            if events:
+                handler(events)
+                acknowledge(consumer, positions)
+            if len(events) < batch_size: #caught up, until the next interval
+                return
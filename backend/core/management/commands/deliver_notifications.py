@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notification.delivery import deliver
+
+
+class Command(BaseCommand):
+    help = (
+        "Group the queued likes and comments into notifications. Run it from cron, or keep it running with "
+        "--interval; several workers can run side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Events delivered per transaction.")
+        parser.add_argument("--interval", type=float, default=0, help="Look for new events every N seconds, 0 runs once.")
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                delivered = deliver(options["batch_size"])
+                total += delivered
+                if delivered < options["batch_size"]: #the queue is empty, until the next interval
+                    break
+            if total and options["verbosity"] > 1:
+                self.stdout.write(f"{total} events delivered")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.reaper import Reaper
+from core.shard.router import databases
+
+
+class Command(BaseCommand):
+    help = (
+        "Hard-delete the soft-deleted users, posts and comments with what depends on them (comments, likes) "
+        "in small chunks, one short transaction each. Run it from cron, or keep it running with --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Rows deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between chunks.")
+        parser.add_argument("--grace", type=int, default=0, help="Keep soft-deleted rows this many minutes.")
+        parser.add_argument("--interval", type=float, default=0, help="Run again every N seconds, 0 runs once.")
+        parser.add_argument("--database", help="Reap this database only, by default each of the shards (SHARDS) then default.")
+
+    def handle(self, *args, **options):
+        if options["database"]:
+            aliases = [options["database"]]
+        else: #the posts on the shards go before their authors on default
+            aliases = [alias for alias in databases() if alias != "default"] + ["default"]
+        reapers = [
+            Reaper(
+                chunk_size=options["chunk_size"],
+                pause=options["pause"],
+                grace=timedelta(minutes=options["grace"]),
+                using=alias,
+                progress=self._progress if options["verbosity"] > 1 else None,
+            )
+            for alias in aliases
+        ]
+        while True:
+            counts = {}
+            for reaper in reapers:
+                for table, count in reaper.run().items():
+                    counts[table] = counts.get(table, 0) + count
+            if any(counts.values()) or options["verbosity"] > 1:
+                self.stdout.write(", ".join(f"{count} {table}" for table, count in counts.items()) + " deleted")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def _progress(self, table, count):
+        self.stdout.write(f"{table:<9} {count:>10} rows deleted")
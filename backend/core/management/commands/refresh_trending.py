@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.trending.engine import TOP_K, refresh
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply the likes, comments and tag uses recorded since the last run to the trending scores and "
+        "rewrite the top posts and tags served by /api/trending/. Run it from cron, or keep it running with --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=TOP_K, help="Posts and tags kept of each.")
+        parser.add_argument("--interval", type=float, default=0, help="Run again every N seconds, 0 runs once.")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            buckets = refresh(top_k=options["top"])
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{buckets} buckets applied in {time.monotonic() - started:.3f}s")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
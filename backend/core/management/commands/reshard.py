@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.comment.models import Comment
+from core.post.models import Post
+from core.shard import router
+from core.shard.models import AuthorShard, ObjectShard
+from core.shard.mover import CHUNK_SIZE, move_author
+from core.user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the shards in line with the SHARDS setting (core/shard/router.py): update the hash ring, then "
+        "move the authors whose placement differs from the ring to their new shard, one author at a time. "
+        "--adopt first records the rows written before sharding was turned on (or on a database just added to "
+        "SHARDS): every user is copied to the shards, every post and comment gets its ObjectShard row and "
+        "every author its AuthorShard row, where the rows are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--adopt", action="store_true")
+        parser.add_argument("--limit", type=int, default=0, help="Move at most this many authors.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Only list the moves.")
+
+    def handle(self, *args, **options):
+        if not router.enabled():
+            raise CommandError("The SHARDS setting is empty.")
+        ring = router.sync_ring()
+        if options["adopt"]:
+            self.adopt(options["chunk_size"])
+
+        moves = 0
+        for author_id, alias in AuthorShard.objects.order_by("pk").values_list("author_id", "alias").iterator():
+            target = ring.lookup(author_id)
+            if target == alias:
+                continue
+            if options["limit"] and moves >= options["limit"]:
+                break
+            moves += 1
+            if options["dry_run"]:
+                self.stdout.write(f"author {author_id}: {alias} -> {target}")
+                continue
+            posts, comments, likes = move_author(author_id, alias, target, options["chunk_size"])
+            self.stdout.write(f"author {author_id}: {alias} -> {target}, {posts} posts, {comments} comments, {likes} likes")
+        self.stdout.write(self.style.SUCCESS(f"{moves} authors {'to move' if options['dry_run'] else 'moved'}"))
+
+    def _pages(self, queryset, fields, chunk_size):
+        last = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last).order_by("pk").values_list("pk", *fields)[:chunk_size])
+            if not rows:
+                return
+            yield rows
+            last = rows[-1][0]
+
+    def adopt(self, chunk_size):
+        users = 0
+        for rows in self._pages(User._base_manager.all(), [], chunk_size):
+            router.replicate_users(list(User._base_manager.filter(pk__in=[pk for pk, in rows])))
+            users += len(rows)
+        self.stdout.write(f"{users} users copied to the shards")
+        for alias in router.databases():
+            for model, author in ((Post, "author_id"), (Comment, "post__author_id")):
+                total = 0
+                for rows in self._pages(model._base_manager.using(alias), ["public_id", author], chunk_size):
+                    AuthorShard.objects.bulk_create(
+                        [AuthorShard(author_id=author_id, alias=alias) for author_id in {row[2] for row in rows}],
+                        ignore_conflicts=True, #an author already placed keeps its placement
+                    )
+                    ObjectShard.objects.bulk_create(
+                        [ObjectShard(public_id=public_id, author_id=author_id) for _, public_id, author_id in rows],
+                        ignore_conflicts=True,
+                    )
+                    total += len(rows)
+                self.stdout.write(f"{alias}: {total} {model._meta.model_name}s recorded")
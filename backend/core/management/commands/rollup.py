@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.analytics.rollup import backfill, rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Add the posts, comments, likes and signups created since the last run to the daily analytics rollups "
+        "read by /api/analytics/ and the admin. Run it from cron, or keep it running with --interval; "
+        "--backfill rebuilds the rollups from the whole history first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backfill", action="store_true", help="Empty the rollups and roll up the whole history.")
+        parser.add_argument("--interval", type=float, default=0, help="Run again every N seconds, 0 runs once.")
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            backfill(progress=lambda runs: self.stdout.write(f"{runs} weeks of history rolled up"))
+            self.stdout.write(self.style.SUCCESS("Backfill done"))
+        while True:
+            started = time.monotonic()
+            while not rollup(): # behind by more than one step of history
+                pass
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Rolled up in {time.monotonic() - started:.3f}s")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
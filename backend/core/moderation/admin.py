@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import BannedTerm
+
+@admin.register(BannedTerm)
+class BannedTermAdmin(admin.ModelAdmin):
+    list_display = ('term', 'whole_word', 'updated')
+    list_filter = ('whole_word',)
+    search_fields = ('term',)
+    ordering = ('term',)
+    readonly_fields = ('updated',)
@@ -0,0 +1,207 @@
+"""Near-duplicate posts and comments: the same text with trivial variations, posted over and over.
+
+A body is reduced to its MinHash signature: the words (lowercase, digits folded) are cut in SHINGLE-word
+shingles, each shingle hashed PERMUTATIONS times (one SHAKE-256 digest cut in 32-bit values), and the signature
+keeps the smallest value of each of the PERMUTATIONS hashes. The share of equal values of two signatures is an
+estimate of the Jaccard similarity of their shingle sets, whatever the changes in case, punctuation, numbers
+or a word here and there.
+
+Comparing a new body with every recent one would be a scan, so the signature is cut in BANDS bands of ROWS
+values (locality-sensitive hashing): only the fingerprints with a whole band in common are compared, which
+finds 99% of the pairs at 0.7 similarity and few of the pairs below 0.3. LSHIndex keeps the bands of the last
+WINDOW of fingerprints in memory, loaded on the first check of the process and synced from the Fingerprint
+table every SYNC_SECONDS for the ones of other processes; a check is a hash of the body and BANDS dict lookups.
+Every REBUILD_SECONDS the buckets are built again in a thread, without the ones older than WINDOW, and swapped
+in (like the automaton of filter.py); the checks meanwhile use the previous buckets.
+
+screen() runs in the create() of PostSerializer and CommentSerializer. With DUPLICATE_ACTION = 'reject' a
+copy is refused with a 400, with 'flag' (the default) it is created and its Fingerprint points to the one it
+copies, for the moderators. `manage.py fingerprint --bench` measures the checks per second."""
+
+import hashlib
+import re
+import sys
+import threading
+import time
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core.moderation.models import Fingerprint
+
+SHINGLE = 2
+MIN_WORDS = 6 # shorter bodies ("Thanks!", "Great post") are left alone
+PERMUTATIONS = 64
+BANDS = 16
+ROWS = PERMUTATIONS // BANDS
+THRESHOLD = 0.7 # estimated similarity from which a body is a copy
+WINDOW = timedelta(days=2)
+SYNC_SECONDS = 5
+REBUILD_SECONDS = 3600 # drops the fingerprints older than WINDOW
+
+REJECT = 'reject'
+FLAG = 'flag'
+
+_WORD = re.compile(r'\w+')
+_DIGITS = re.compile(r'\d+')
+
+
+def words(body):
+    return [_DIGITS.sub('0', word) for word in _WORD.findall(body.lower())]
+
+
+def signature(body):
+    """The MinHash signature of `body`, a tuple of PERMUTATIONS ints, None when it has less than MIN_WORDS words."""
+    tokens = words(body)
+    if len(tokens) < MIN_WORDS:
+        return None
+    hashes = []
+    for shingle in {' '.join(tokens[i:i + SHINGLE]) for i in range(len(tokens) - SHINGLE + 1)}:
+        values = array('I', hashlib.shake_256(shingle.encode()).digest(4 * PERMUTATIONS))
+        if sys.byteorder == 'big': # the same signatures on every machine
+            values.byteswap()
+        hashes.append(values)
+    return tuple(map(min, zip(*hashes))) # the min of each permutation, in C
+
+
+def similarity(a, b):
+    return sum(x == y for x, y in zip(a, b)) / PERMUTATIONS
+
+
+def bands(value):
+    return [(band, value[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+def dumps(value):
+    values = array('I', value)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def loads(data):
+    values = array('I', bytes(data))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return tuple(values)
+
+
+def _insert(buckets, known, pk, value, created):
+    if pk in known:
+        return
+    known.add(pk)
+    for key in bands(value):
+        buckets.setdefault(key, []).append((pk, value, created))
+
+
+class LSHIndex:
+    def __init__(self, window=WINDOW, sync_seconds=SYNC_SECONDS, rebuild_seconds=REBUILD_SECONDS):
+        self.window = window
+        self.sync_seconds = sync_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._buckets = None # (band, its values) -> [(fingerprint pk, signature, created)]
+        self._known = set() # pks in the buckets
+        self._built = 0.0
+        self._synced = None
+        self._rebuilding = False
+        self._lock = threading.RLock()
+
+    def add(self, pk, value, created):
+        with self._lock:
+            if self._buckets is not None:
+                _insert(self._buckets, self._known, pk, value, created)
+
+    def _load(self, since):
+        return Fingerprint.objects.filter(created__gte=since).values_list('pk', 'signature', 'created').iterator(chunk_size=5000)
+
+    def rebuild(self):
+        """Load the fingerprints of the last `window` in new buckets and swap them in, only the swap holds the lock."""
+        try:
+            now = timezone.now()
+            buckets, known = {}, set()
+            for pk, value, created in self._load(now - self.window):
+                _insert(buckets, known, pk, loads(value), created)
+            with self._lock:
+                self._buckets, self._known = buckets, known
+                self._built = time.monotonic()
+                self._synced = now # the next sync adds the fingerprints created during the build
+        finally:
+            self._rebuilding = False
+
+    def _rebuild_thread(self):
+        try:
+            self.rebuild()
+        finally:
+            connections.close_all() #the connection of this thread
+
+    def sync(self):
+        """Add the fingerprints created by other processes since the last sync."""
+        now = timezone.now()
+        with self._lock:
+            for pk, value, created in self._load(self._synced - timedelta(seconds=2)): # transactions that committed late
+                _insert(self._buckets, self._known, pk, loads(value), created)
+            self._synced = now
+
+    def _ready(self):
+        with self._lock:
+            if self._buckets is None:
+                self.rebuild() # the first check of the process waits for the buckets
+                return
+            stale = not self._rebuilding and time.monotonic() - self._built > self.rebuild_seconds
+            if stale:
+                self._rebuilding = True
+            elif (timezone.now() - self._synced).total_seconds() > self.sync_seconds:
+                self.sync()
+        if stale:
+            threading.Thread(target=self._rebuild_thread, daemon=True).start()
+
+    def match(self, value):
+        """pk of the most similar recent fingerprint, at least THRESHOLD similar to `value`, or None."""
+        self._ready()
+        oldest = timezone.now() - self.window
+        best, best_similarity, seen = None, THRESHOLD, set()
+        with self._lock:
+            for key in bands(value):
+                for pk, other, created in self._buckets.get(key, ()):
+                    if pk in seen or created < oldest:
+                        continue
+                    seen.add(pk)
+                    s = similarity(value, other)
+                    if s >= best_similarity:
+                        best, best_similarity = pk, s
+        return best
+
+
+lsh_index = LSHIndex()
+
+
+class Screening:
+    def __init__(self, kind, value, duplicate_of):
+        self.kind = kind
+        self.value = value
+        self.duplicate_of = duplicate_of
+
+    def remember(self, instance):
+        """Store the fingerprint of the created post or comment."""
+        if self.value is None:
+            return None
+        fingerprint = Fingerprint.objects.create(
+            kind=self.kind, object_id=instance.pk, author_id=instance.author_id,
+            signature=dumps(self.value), duplicate_of=self.duplicate_of, created=instance.created,
+        )
+        lsh_index.add(fingerprint.pk, self.value, fingerprint.created)
+        return fingerprint
+
+
+def screen(kind, body):
+    """Check `body` before it is created, raises a ValidationError for a copy when DUPLICATE_ACTION is
+    'reject'. Call remember() on the result once created."""
+    value = signature(body)
+    duplicate_of = lsh_index.match(value) if value is not None else None
+    if duplicate_of is not None and getattr(settings, 'DUPLICATE_ACTION', FLAG) == REJECT:
+        raise ValidationError({'body': 'This looks like a copy of a recent post or comment.'})
+    return Screening(kind, value, duplicate_of)
@@ -0,0 +1,199 @@
+"""Banned words, phrases and URL parts in the bodies of posts and comments.
+
+The terms (the BannedTerm table, plus one term per line of the BANNED_TERMS_FILE setting when it is set) are
+compiled into one Aho-Corasick automaton: a trie of the terms where every node also links to the longest
+suffix of its path that is a prefix of some term, and lists the terms ending there. A body is scanned once,
+character by character, following the trie and the suffix links, so the cost depends on the length of the
+body (and the matches), not on the number of terms.
+
+An Automaton is never changed once built. ContentFilter holds the current one and checks every RELOAD_SECONDS
+(one aggregate query and a stat() of the file) whether the terms changed; a new automaton is then built in a
+thread and swapped in, the requests meanwhile use the previous one. Threads read it without locks. A build
+that fails is logged and the previous automaton stays; while the file can't be read (missing, being replaced),
+the terms last read from it are kept.
+
+check_terms() runs in the create() and update() of PostSerializer and CommentSerializer and answers 400 with the
+spans of the matches, for the client to highlight them."""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max
+from rest_framework.exceptions import ValidationError
+
+from core.moderation.models import BannedTerm
+
+RELOAD_SECONDS = 5
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Match:
+    start: int
+    end: int # exclusive, body[start:end] is the match
+    term: str
+
+
+def _lower(text):
+    # str.lower() of a few characters (e.g. 'İ') is 2 characters long, the spans have to stay those of `text`
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def _is_word(text, index):
+    return 0 <= index < len(text) and (text[index].isalnum() or text[index] == '_')
+
+
+class Automaton:
+    def __init__(self, terms):
+        """`terms`: (term, whole_word) pairs; whole words only match between non-word characters."""
+        self.terms = []
+        self._goto = [{}] # state -> {character: next state}, state 0 is the root
+        self._fail = [0]
+        self._out = [()] # state -> indexes of the terms ending at this state
+        for term, whole_word in dict((_lower(term.strip()), whole_word) for term, whole_word in terms).items():
+            if term:
+                self._insert(term)
+                self.terms.append((term, whole_word))
+        self._link()
+
+    def _insert(self, term):
+        state = 0
+        for c in term:
+            following = self._goto[state].get(c)
+            if following is None:
+                following = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[state][c] = following
+            state = following
+        self._out[state] += (len(self.terms),)
+
+    def _link(self):
+        # breadth first: the suffix link of a node is set from the link of its parent
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for c, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and c not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(c, 0)
+                self._fail[following] = target if target != following else 0
+                self._out[following] += self._out[self._fail[following]]
+
+    def scan(self, text):
+        """The matches in `text`, by end then start."""
+        lowered = _lower(text)
+        goto, fail, out, terms = self._goto, self._fail, self._out, self.terms
+        matches = []
+        state = 0
+        for end, c in enumerate(lowered, start=1):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for index in out[state]:
+                term, whole_word = terms[index]
+                start = end - len(term)
+                if whole_word and (_is_word(lowered, start - 1) and _is_word(lowered, start) or _is_word(lowered, end) and _is_word(lowered, end - 1)):
+                    continue
+                matches.append(Match(start, end, term))
+        return matches
+
+
+def _file_terms(path):
+    with open(path, encoding='utf-8') as lines:
+        return [(line.strip(), True) for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError: # missing, being replaced
+        return None
+
+
+class ContentFilter:
+    def __init__(self, reload_seconds=RELOAD_SECONDS):
+        self.reload_seconds = reload_seconds
+        self._automaton = None
+        self._version = None
+        self._file_terms = [] # the terms last read from BANNED_TERMS_FILE
+        self._checked = 0.0
+        self._building = False
+        self._lock = threading.Lock()
+
+    def _path(self):
+        return getattr(settings, 'BANNED_TERMS_FILE', '') or None
+
+    def version(self):
+        """Changes whenever a term is added, changed or removed."""
+        path = self._path()
+        table = BannedTerm.objects.aggregate(count=Count('pk'), updated=Max('updated'))
+        return table['count'], table['updated'], path, _mtime(path) if path else None
+
+    def rebuild(self, version=None):
+        try:
+            version = version or self.version()
+            terms = list(BannedTerm.objects.values_list('term', 'whole_word'))
+            if version[2]:
+                try:
+                    self._file_terms = _file_terms(version[2])
+                except (OSError, UnicodeDecodeError):
+                    logger.warning("can't read BANNED_TERMS_FILE %s, keeping the %d terms last read from it", version[2], len(self._file_terms), exc_info=True)
+            automaton = Automaton(terms + (self._file_terms if version[2] else []))
+            with self._lock:
+                self._automaton, self._version = automaton, version
+        finally:
+            self._building = False
+
+    def _rebuild_thread(self, version):
+        try:
+            self.rebuild(version)
+        except Exception: # the previous automaton stays, the next check retries
+            logger.exception("building the banned terms automaton failed")
+        finally:
+            connections.close_all() #the connection of this thread
+
+    def _current(self):
+        with self._lock:
+            automaton, due = self._automaton, time.monotonic() - self._checked >= self.reload_seconds
+            if due:
+                self._checked = time.monotonic()
+        if automaton is None:
+            self.rebuild() # the first scan of the process waits for the automaton
+            return self._automaton
+        if due and not self._building:
+            version = self.version()
+            if version != self._version:
+                with self._lock:
+                    self._building = True
+                threading.Thread(target=self._rebuild_thread, args=(version,), daemon=True).start()
+        return automaton
+
+    def scan(self, text):
+        return self._current().scan(text)
+
+    def check(self, text, field='body'):
+        """Raise a ValidationError listing the matches of `text`, if any."""
+        matches = self.scan(text)
+        if matches:
+            error = ValidationError({field: [f'"{text[m.start:m.end]}" is not allowed.' for m in matches]})
+            error.detail['spans'] = [{'start': m.start, 'end': m.end, 'term': m.term} for m in matches] #kept as numbers
+            raise error
+
+
+content_filter = ContentFilter()
+
+
+def check_terms(text, field='body'):
+    content_filter.check(text, field)
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('comment', 'Comment')], max_length=8)),
+                ('object_id', models.BigIntegerField()),
+                ('signature', models.BinaryField()),
+                ('duplicate_of', models.BigIntegerField(blank=True, null=True)),
+                ('created', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('duplicate_of__isnull', False)), fields=['-created'], name='fingerprint_flagged_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_fingerprint')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+POST = 'post'
+COMMENT = 'comment'
+KINDS = [(POST, 'Post'), (COMMENT, 'Comment')]
+
+
+class Fingerprint(models.Model):
+    """The MinHash signature of the body of a post or comment, see core/moderation/duplicates.py. A body too
+    similar to a recent one is flagged with the fingerprint it copies."""
+    kind = models.CharField(max_length=8, choices=KINDS)
+    object_id = models.BigIntegerField()
+    author = models.ForeignKey("core_user.User", on_delete=models.CASCADE, related_name="+")
+    signature = models.BinaryField() #PERMUTATIONS 32-bit values, little-endian
+    duplicate_of = models.BigIntegerField(null=True, blank=True) #pk of the fingerprint it copies, which may be gone since
+    created = models.DateTimeField(default=timezone.now, db_index=True) #the index the LSH index loads and syncs with
+
+    @property
+    def flagged(self):
+        return self.duplicate_of is not None
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_fingerprint')]
+        indexes = [models.Index(fields=['-created'], condition=Q(duplicate_of__isnull=False), name='fingerprint_flagged_idx')]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class BannedTerm(models.Model):
+    """A word, phrase or URL part that posts and comments can't contain, see core/moderation/filter.py. The
+    filter rebuilds its automaton within RELOAD_SECONDS of a change, no restart needed."""
+    term = models.CharField(max_length=200, unique=True)
+    whole_word = models.BooleanField(default=True) #False to match inside words too, e.g. a domain in any URL
+    updated = models.DateTimeField(auto_now=True, db_index=True) #the filter reloads when max(updated) or the count change
+
+    def save(self, *args, **kwargs):
+        self.term = self.term.strip().lower() #the filter is case-insensitive
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.term
@@ -0,0 +1,158 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from core.fixtures.user import user
+from core.fixtures.post import post
+from core.moderation import duplicates
+from core.moderation.models import POST, Fingerprint
+from core.post.models import Post
+
+SPAM = (
+    "Huge discount on designer watches this week only, visit our shop today and get two watches for the price "
+    "of one, free shipping to every country in the world, limited stock so hurry up"
+)
+
+
+@pytest.fixture
+def lsh_index(monkeypatch):
+    index = duplicates.LSHIndex()
+    monkeypatch.setattr(duplicates, "lsh_index", index)
+    return index
+
+
+def test_signature_similarity():
+    variant = SPAM.replace("this week", "THIS week!!").replace("two watches", "2 watches").replace("hurry up", "hurry")
+    other = "I went hiking in the mountains with my family last weekend and the view from the top was stunning"
+
+    assert duplicates.similarity(duplicates.signature(SPAM), duplicates.signature(variant)) >= duplicates.THRESHOLD
+    assert duplicates.similarity(duplicates.signature(SPAM), duplicates.signature(other)) < 0.3
+    assert duplicates.signature("Great post, thanks!") is None # too short to tell
+    assert duplicates.loads(duplicates.dumps(duplicates.signature(SPAM))) == duplicates.signature(SPAM)
+
+
+@pytest.mark.django_db
+def test_copies_are_flagged(user, lsh_index):
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    first = client.post("/api/post/", {"author": user.public_id.hex, "body": SPAM}, format="json")
+    second = client.post("/api/post/", {"author": user.public_id.hex, "body": SPAM.upper() + " 123"}, format="json")
+    third = client.post("/api/post/", {"author": user.public_id.hex, "body": "A completely different story about a long walk on the beach"}, format="json")
+
+    assert first.status_code == second.status_code == third.status_code == 201
+    fingerprints = {f.object_id: f for f in Fingerprint.objects.all()}
+    original = fingerprints[Post.objects.get(public_id=first.json()["id"]).pk]
+    assert fingerprints[Post.objects.get(public_id=second.json()["id"]).pk].duplicate_of == original.pk
+    assert not original.flagged and not fingerprints[Post.objects.get(public_id=third.json()["id"]).pk].flagged
+
+
+@pytest.mark.django_db
+def test_copies_are_rejected(user, post, lsh_index, settings):
+    settings.DUPLICATE_ACTION = "reject"
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = f"/api/post/{post.public_id.hex}/comment/"
+    data = {"author": user.public_id.hex, "post": post.public_id.hex, "body": SPAM}
+
+    assert client.post(url, data, format="json").status_code == 201
+    response = client.post(url, {**data, "body": SPAM.replace("designer", "luxury")}, format="json")
+
+    assert response.status_code == 400 and "body" in response.json()
+    assert Fingerprint.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True) # the rebuild thread reads the fingerprints on its own connection
+def test_lsh_index_rebuilt_in_the_background(user):
+    import time
+
+    index = duplicates.LSHIndex(rebuild_seconds=0)
+    assert index.match(duplicates.signature(SPAM)) is None # built inline, the first check waits for it
+    post = Post.objects.create(author=user, body=SPAM)
+    fingerprint = Fingerprint.objects.create(kind=POST, object_id=post.pk, author_id=user.pk, signature=duplicates.dumps(duplicates.signature(SPAM)), created=post.created)
+
+    old = index._buckets
+    assert index.match(duplicates.signature(SPAM)) is None # starts the rebuild, answers from the old buckets
+    for _ in range(100):
+        if not index._rebuilding:
+            break
+        time.sleep(0.05)
+    assert index._buckets is not old
+    assert fingerprint.pk in index._known
+
+
+@pytest.mark.django_db
+def test_fingerprint_command(user, lsh_index):
+    old = Post.objects.create(author=user, body=SPAM)
+    Post.objects.create(author=user, body="Short one")
+
+    call_command("fingerprint", "--chunk-size", "1")
+    call_command("fingerprint") # nothing missing anymore
+
+    assert list(Fingerprint.objects.values_list("object_id", flat=True)) == [old.pk]
+    assert duplicates.screen(POST, SPAM + " now").duplicate_of == Fingerprint.objects.get().pk
+
+
+def test_automaton_matches():
+    from core.moderation.filter import Automaton, Match
+
+    automaton = Automaton([("he", False), ("she", False), ("hers", False), ("casino", True), ("spam.example", True)])
+
+    assert automaton.scan("USHERS") == [Match(1, 4, "she"), Match(2, 4, "he"), Match(2, 6, "hers")]
+    assert automaton.scan("Casino night, not casinos") == [Match(0, 6, "casino")] # whole words only
+    assert automaton.scan("İ go to http://spam.example/x") == [Match(15, 27, "spam.example")] # spans of the original text
+    assert Automaton([]).scan("anything") == []
+
+
+@pytest.mark.django_db
+def test_banned_terms_are_rejected(user, post, monkeypatch):
+    from core.moderation import filter
+    from core.moderation.models import BannedTerm
+
+    BannedTerm.objects.create(term="Cheap Pills")
+    monkeypatch.setattr(filter, "content_filter", filter.ContentFilter())
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post("/api/post/", {"author": user.public_id.hex, "body": "Buy CHEAP pills here"}, format="json")
+    assert response.status_code == 400
+    assert response.json()["spans"] == [{"start": 4, "end": 15, "term": "cheap pills"}]
+
+    response = client.patch(f"/api/post/{post.public_id.hex}/", {"author": user.public_id.hex, "body": "cheap pills"}, format="json")
+    assert response.status_code == 400
+    assert client.patch(f"/api/post/{post.public_id.hex}/", {"author": user.public_id.hex, "body": "fine"}, format="json").status_code == 200
+
+
+@pytest.mark.django_db
+def test_banned_terms_file_is_reloaded(tmp_path, settings):
+    import os
+    import time
+    from core.moderation.filter import ContentFilter
+
+    path = tmp_path / "terms.txt"
+    path.write_text("# one term per line\nscam\n")
+    settings.BANNED_TERMS_FILE = str(path)
+    content_filter = ContentFilter(reload_seconds=0)
+    assert [m.term for m in content_filter.scan("a scam, a fraud")] == ["scam"]
+
+    path.write_text("scam\nfraud\n")
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    content_filter.scan("") # notices the change, builds the new automaton in a thread
+    for _ in range(100):
+        if not content_filter._building:
+            break
+        time.sleep(0.05)
+    assert [m.term for m in content_filter.scan("a scam, a fraud")] == ["scam", "fraud"]
+
+    # a missing file keeps the terms last read from it
+    path.unlink()
+    content_filter.scan("")
+    for _ in range(100):
+        if not content_filter._building:
+            break
+        time.sleep(0.05)
+    assert content_filter._version[3] is None
+    assert [m.term for m in content_filter.scan("a scam, a fraud")] == ["scam", "fraud"]
+
+    settings.BANNED_TERMS_FILE = str(tmp_path / "missing.txt")
+    assert ContentFilter().scan("a scam") == []
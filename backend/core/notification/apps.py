@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class NotificationConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core.notification'
+    label = 'core_notification'
+
+    def ready(self):
+        from core.notification import signals  # noqa: F401 queues the likes and comments
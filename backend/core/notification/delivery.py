@@ -0,0 +1,139 @@
+"""Delivery of the queued NotificationEvent rows into Notification groups, off the request path.
+
+deliver() takes the oldest `batch_size` events (FOR UPDATE SKIP LOCKED on PostgreSQL, so several workers
+can run), adds them up per (recipient, post, kind), and then, in a fixed number of queries whatever the
+number of events:
+
+  * adds the new actors and the latest one to the unread groups that already exist,
+  * creates the missing groups and adds them to the UnreadCounter of their recipients,
+  * deletes the events.
+
+A thousand likes of a viral post in one batch are one UPDATE of one group. The count of a group is the number
+of distinct actors: NotificationActor keeps the ones already counted, so liking, unliking and liking again
+(two like events) counts once.
+
+With SHARDS set the events, groups and counters are on the shard of the post (its author, the recipient), and
+deliver() runs a batch on each of databases().
+
+The groups of a post leave the list when it is soft-deleted and are deleted with it when it is archived:
+discount() takes them off the UnreadCounter of their recipients then (see signals.py and
+core/archive/archiver.py). The reaper only hard deletes posts that were soft-deleted first."""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.notification.models import Notification, NotificationActor, NotificationEvent, UnreadCounter
+from core.post.models import Post
+from core.shard.router import databases, moving_authors
+
+
+def _groups(events, authors):
+    groups = {} # (recipient, post, kind) -> [actors, latest actor, latest time]
+    for _, post_id, actor_id, kind, created in events:
+        recipient_id = authors.get(post_id)
+        if recipient_id is None or recipient_id == actor_id: #deleted post, or the author liking their own post
+            continue
+        group = groups.setdefault((recipient_id, post_id, kind), [set(), actor_id, created])
+        group[0].add(actor_id)
+        if created >= group[2]:
+            group[1], group[2] = actor_id, created
+    return groups
+
+
+def _apply(groups, using):
+    keys = Q()
+    for recipient_id, post_id, kind in groups:
+        keys |= Q(recipient_id=recipient_id, post_id=post_id, kind=kind)
+    existing = {
+        (n.recipient_id, n.post_id, n.kind): n
+        for n in Notification.objects.db_manager(using).with_deleted().select_for_update().filter(keys, read=False).only(
+            'pk', 'recipient_id', 'post_id', 'kind', 'count'
+        )
+    }
+    counted = defaultdict(set) # the actors already in the existing groups
+    actors = {actor_id for group in groups.values() for actor_id in group[0]}
+    for notification_id, actor_id in NotificationActor.objects.using(using).filter(
+        notification_id__in=[n.pk for n in existing.values()], actor_id__in=actors
+    ).values_list('notification_id', 'actor_id'):
+        counted[notification_id].add(actor_id)
+    now = timezone.now() #groups are listed by their last delivery, like the new ones (auto_now)
+    for key, notification in existing.items():
+        group_actors, actor_id, _ = groups[key]
+        notification.count += len(group_actors - counted[notification.pk])
+        notification.actor_id = actor_id
+        notification.updated = now
+    Notification.objects.using(using).bulk_update(existing.values(), ['count', 'actor', 'updated'], batch_size=500)
+
+    created = [
+        Notification(recipient_id=key[0], post_id=key[1], kind=key[2], count=len(group_actors), actor_id=actor_id)
+        for key, (group_actors, actor_id, _) in groups.items()
+        if key not in existing
+    ]
+    Notification.objects.using(using).bulk_create(created, batch_size=500) #IntegrityError if another worker created one first
+    NotificationActor.objects.using(using).bulk_create(
+        [
+            NotificationActor(notification_id=notification.pk, actor_id=actor_id)
+            for notification in (*existing.values(), *created)
+            for actor_id in groups[notification.recipient_id, notification.post_id, notification.kind][0] - counted[notification.pk]
+        ],
+        batch_size=500,
+    )
+
+    new_groups = defaultdict(int)
+    for notification in created:
+        new_groups[notification.recipient_id] += 1
+    counters = UnreadCounter.objects.using(using).select_for_update().in_bulk(list(new_groups))
+    for user_id, counter in counters.items():
+        counter.unread += new_groups[user_id]
+    UnreadCounter.objects.using(using).bulk_update(counters.values(), ['unread'])
+    UnreadCounter.objects.using(using).bulk_create(
+        [UnreadCounter(user_id=user_id, unread=n) for user_id, n in new_groups.items() if user_id not in counters]
+    )
+    return len(created)
+
+
+def discount(post_ids, using='default'):
+    """Take the unread groups of the posts `post_ids` off the UnreadCounter of their recipients, one UPDATE
+    per distinct number of groups."""
+    unread = (
+        Notification._base_manager.using(using).filter(post_id__in=post_ids, read=False)
+        .values('recipient_id').annotate(groups=Count('pk')).values_list('recipient_id', 'groups')
+    )
+    recipients = defaultdict(list) # number of groups -> recipients
+    for recipient_id, groups in unread:
+        recipients[groups].append(recipient_id)
+    for groups, user_ids in recipients.items():
+        UnreadCounter.objects.using(using).filter(user_id__in=user_ids).update(unread=Greatest(F('unread') - groups, 0))
+
+
+def deliver(batch_size=1000, using=None):
+    """Deliver one batch of events of `using`, or of each of databases(); returns the number of events
+    delivered."""
+    return sum(_deliver(batch_size, alias) for alias in ([using] if using else databases()))
+
+
+def _deliver(batch_size, using):
+    with transaction.atomic(using=using):
+        events = list(
+            NotificationEvent.objects.using(using).select_for_update(skip_locked=True, of=('self',))
+            .exclude(post__author_id__in=moving_authors()) #delivered on the target once reshard moved them
+            .order_by('pk').values_list('pk', 'post_id', 'actor_id', 'kind', 'created')[:batch_size]
+        )
+        if not events:
+            return 0
+        authors = dict(Post._base_manager.using(using).filter(pk__in={e[1] for e in events}, deleted__isnull=True).values_list('pk', 'author_id'))
+        groups = _groups(events, authors)
+        if groups:
+            try:
+                with transaction.atomic(using=using):
+                    _apply(groups, using)
+            except IntegrityError: #a concurrent worker created one of the groups, it exists now
+                with transaction.atomic(using=using):
+                    _apply(groups, using)
+        NotificationEvent.objects.using(using).filter(pk__in=[e[0] for e in events]).delete()
+    return len(events)
+
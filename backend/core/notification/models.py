@@ -0,0 +1,55 @@
+from django.db import models
+from django.db.models import Q
+
+from core.abstract.models import AbstractManager, AbstractModel
+
+LIKE = 'like'
+COMMENT = 'comment'
+KINDS = [(LIKE, 'Like'), (COMMENT, 'Comment')]
+
+
+class NotificationManager(AbstractManager):
+    hidden_with = ("post", "post__author") #nothing about a deleted post
+
+
+class Notification(AbstractModel):
+    """The unread likes (or comments) of one post for its author, grouped: "X and 1,203 others liked your
+    post" is one row with the latest actor and a count. Once read, the next event starts a new group."""
+    recipient = models.ForeignKey("core_user.User", on_delete=models.CASCADE, related_name="+")
+    post = models.ForeignKey("core_post.Post", on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=8, choices=KINDS)
+    actor = models.ForeignKey("core_user.User", on_delete=models.SET_NULL, null=True, related_name="+") #the latest one
+    count = models.PositiveIntegerField(default=1) #distinct actors in the group, the latest one included
+    read = models.BooleanField(default=False)
+
+    objects = NotificationManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['recipient', 'post', 'kind'], condition=Q(read=False), name='unique_unread_notification'),
+        ]
+        indexes = [models.Index(fields=['recipient', '-updated', '-id'], name='notification_list_idx')]
+
+
+class NotificationActor(models.Model):
+    """The actors already counted in an unread group: liking, unliking and liking again counts once."""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name="+")
+    actor = models.ForeignKey("core_user.User", on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['notification', 'actor'], name='unique_notification_actor')]
+
+
+class NotificationEvent(models.Model):
+    """The queue between the requests and the delivery (core/notification/delivery.py): a like or a comment
+    costs the request one INSERT here, never an update of a group row that a viral post would make hot."""
+    post = models.ForeignKey("core_post.Post", on_delete=models.CASCADE, related_name="+")
+    actor = models.ForeignKey("core_user.User", on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=8, choices=KINDS)
+    created = models.DateTimeField(auto_now_add=True)
+
+
+class UnreadCounter(models.Model):
+    """Unread notification groups of a user, kept up to date by the delivery and the read actions."""
+    user = models.OneToOneField("core_user.User", on_delete=models.CASCADE, primary_key=True, related_name="+")
+    unread = models.PositiveIntegerField(default=0)
@@ -0,0 +1,18 @@
+from rest_framework import serializers
+
+from core.abstract.serializers import AbstractSerializer
+from core.notification.models import Notification
+from core.user.serializers import UserSerializer
+
+
+class NotificationSerializer(AbstractSerializer):
+    post = serializers.SlugRelatedField(read_only=True, slug_field='public_id')
+    actor = serializers.SlugRelatedField(read_only=True, slug_field='public_id')
+
+    expandable_fields = {"actor": UserSerializer} #"<actor> and <count - 1> others liked your post"
+    default_expand = ("actor",)
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'kind', 'post', 'actor', 'count', 'read', 'created', 'updated']
+        read_only_fields = fields
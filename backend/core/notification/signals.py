@@ -0,0 +1,35 @@
+"""Likes and comments are queued in NotificationEvent, in the transaction of the like or the comment (on the
+database of the post, when the posts are sharded). Soft-deleting a post takes its unread groups off the
+badge, see discount() in delivery.py."""
+
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from core.comment.models import Comment
+from core.notification.delivery import discount
+from core.notification.models import COMMENT, LIKE, NotificationEvent
+from core.post.models import Post
+from core.user.models import User
+
+
+@receiver(m2m_changed, sender=User.posts_liked.through)
+def liked(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action != 'post_add' or not pk_set: #pk_set only has the new likes, liking twice notifies once
+        return
+    if reverse: #instance is the post, pk_set the users
+        events = [NotificationEvent(post_id=instance.pk, actor_id=user_id, kind=LIKE) for user_id in pk_set]
+    else:
+        events = [NotificationEvent(post_id=post_id, actor_id=instance.pk, kind=LIKE) for post_id in pk_set]
+    NotificationEvent.objects.using(using).bulk_create(events)
+
+
+@receiver(post_save, sender=Comment)
+def commented(sender, instance, created, using, **kwargs):
+    if created:
+        NotificationEvent.objects.using(using).create(post_id=instance.post_id, actor_id=instance.author_id, kind=COMMENT)
+
+
+@receiver(post_save, sender=Post)
+def post_soft_deleted(sender, instance, raw, update_fields, using, **kwargs):
+    if not raw and update_fields and 'deleted' in update_fields and instance.deleted is not None:
+        discount([instance.pk], using)
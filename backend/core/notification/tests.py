@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.archive.archiver import Archiver
+from core.comment.models import Comment
+from core.fixtures.user import user
+from core.fixtures.post import post
+from core.notification.delivery import deliver
+from core.notification.models import COMMENT, LIKE, Notification, NotificationEvent, UnreadCounter
+from core.post.models import Post
+from core.user.models import User
+
+
+def _fans(count, start=0):
+    return [
+        User.objects.create_user(username=f"fan{i}", email=f"fan{i}@test.com", password="test_password", first_name="Fan", last_name=str(i))
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.mark.django_db
+def test_events_are_grouped(user, post, django_assert_max_num_queries):
+    fans = _fans(5)
+    for fan in fans:
+        fan.like(post)
+        fan.like(post) # liked already, no event
+    user.like(post) # the author's own like, no notification
+    Comment.objects.create(author=fans[0], post=post, body="Nice")
+    assert NotificationEvent.objects.count() == 7
+
+    with django_assert_max_num_queries(12): # the same for any number of events
+        assert deliver() == 7
+
+    assert not NotificationEvent.objects.exists()
+    like = Notification.objects.get(kind=LIKE)
+    assert (like.recipient, like.count, like.actor) == (user, 5, fans[-1])
+    assert Notification.objects.get(kind=COMMENT).count == 1
+
+    # more likes go to the same unread group
+    _fans(1, start=5)[0].like(post)
+    deliver()
+    assert Notification.objects.get(kind=LIKE).count == 6
+
+    # liking again after unliking counts the fan once, in the same batch or a later one
+    for _ in range(2):
+        fans[0].remove_like(post)
+        fans[0].like(post)
+    deliver()
+    fans[1].remove_like(post)
+    fans[1].like(post)
+    deliver()
+    like = Notification.objects.get(kind=LIKE)
+    assert (like.count, like.actor) == (6, fans[1])
+
+
+@pytest.mark.django_db
+def test_notification_endpoints(client, user, post):
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+    fans = _fans(3)
+    for fan in fans:
+        fan.like(post)
+    Comment.objects.create(author=fans[1], post=post, body="Nice")
+    deliver()
+
+    assert client.get("/api/notification/unread/", **headers).json() == {"unread": 2}
+    page = client.get("/api/notification/?page_size=1", **headers).json()
+    assert len(page["results"]) == 1 and page["next"]
+    results = page["results"] + client.get(page["next"], **headers).json()["results"]
+    like = next(result for result in results if result["kind"] == "like")
+    assert like["count"] == 3 and like["actor"]["username"] == "fan2" and like["post"] == str(post.public_id)
+
+    assert client.post(f"/api/notification/{like['id']}/read/", **headers).json() == {"read": True}
+    assert client.get("/api/notification/unread/", **headers).json() == {"unread": 1}
+
+    # a like after the read starts a new group
+    _fans(1, start=3)[0].like(post)
+    deliver()
+    assert Notification.objects.filter(kind=LIKE).count() == 2
+    assert client.get("/api/notification/unread/", **headers).json() == {"unread": 2}
+
+    client.post("/api/notification/read_all/", **headers)
+    assert client.get("/api/notification/unread/", **headers).json() == {"unread": 0}
+
+    # only the recipient sees and reads them
+    other = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(fans[0])}"}
+    assert client.get("/api/notification/", **other).json()["results"] == []
+    assert client.post(f"/api/notification/{like['id']}/read/", **other).status_code == 404
+
+
+@pytest.mark.django_db
+def test_deleted_posts_leave_the_badge(client, user, post):
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+    other = Post.objects.create(author=user, body="Another")
+    for fan in _fans(2):
+        fan.like(post)
+        fan.like(other)
+    Comment.objects.create(author=fan, post=post, body="Nice")
+    deliver()
+    assert client.get("/api/notification/unread/", **headers).json() == {"unread": 3}
+
+    post.soft_delete()
+    assert client.get("/api/notification/unread/", **headers).json() == {"unread": 1}
+    assert len(client.get("/api/notification/", **headers).json()["results"]) == 1
+    client.post("/api/notification/read_all/", **headers)
+    other.soft_delete() # read already
+    assert UnreadCounter.objects.get(user=user).unread == 0
+
+    # an archived post takes its groups with it
+    old = Post.objects.create(author=user, body="Old")
+    fan.like(old)
+    deliver()
+    Post.objects.filter(pk=old.pk).update(created=timezone.now() - timedelta(days=400))
+    Archiver(timezone.now() - timedelta(days=180), pause=0).run()
+    assert UnreadCounter.objects.get(user=user).unread == 0
@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.http import Http404
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.auth.throttling import ThrottleFirstMixin
+from core.notification.models import Notification, UnreadCounter
+from core.notification.serializers import NotificationSerializer
+from core.shard.router import check_moving, db_of_author
+
+
+class NotificationPagination(CursorPagination):
+    """Latest first over the (recipient, -updated, -id) index, a page costs the same whatever its depth."""
+    ordering = ('-updated', '-pk')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class NotificationViewSet(ThrottleFirstMixin, viewsets.GenericViewSet):
+    permission_classes = (IsAuthenticated,)
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationPagination
+    http_method_names = ['get', 'post']
+
+    def get_queryset(self):
+        return Notification.objects.using(self.database()).filter(recipient=self.request.user)
+
+    def database(self): #the notifications of a user are on their shard, see core/shard/router.py
+        return db_of_author(self.request.user.pk)
+
+    def list(self, request, *args, **kwargs): #/api/notification/
+        serializer = self.get_serializer()
+        page = self.paginate_queryset(serializer.narrow_queryset(self.get_queryset()))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(methods=['get'], detail=False) #/api/notification/unread/ the badge, one primary key lookup
+    def unread(self, request, *args, **kwargs):
+        unread = UnreadCounter.objects.using(self.database()).filter(user=request.user).values_list('unread', flat=True).first()
+        return Response({'unread': unread or 0})
+
+    @action(methods=['post'], detail=True) #/api/notification/{id}/read/
+    def read(self, request, *args, **kwargs):
+        using = self.database()
+        notification = Notification.objects.db_manager(using).get_object_by_public_id(kwargs['pk'])
+        if notification.recipient_id != request.user.pk:
+            raise Http404
+        check_moving(request.user.pk) #503 while reshard copies them, the change would be lost
+        with transaction.atomic(using=using):
+            marked = Notification.objects.using(using).filter(pk=notification.pk, read=False).update(read=True)
+            if marked:
+                UnreadCounter.objects.using(using).filter(user=request.user).update(unread=Greatest(F('unread') - marked, 0))
+        return Response({'read': bool(marked)})
+
+    @action(methods=['post'], detail=False) #/api/notification/read_all/
+    def read_all(self, request, *args, **kwargs):
+        using = self.database()
+        check_moving(request.user.pk)
+        with transaction.atomic(using=using):
+            marked = self.get_queryset().filter(read=False).update(read=True)
+            UnreadCounter.objects.using(using).filter(user=request.user).update(unread=0)
+        return Response({'read': marked})
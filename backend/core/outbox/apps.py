@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class OutboxConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core.outbox'
+    label = 'core_outbox'
+
+    def ready(self):
+        from core.outbox import signals  # noqa: F401 writes the change events
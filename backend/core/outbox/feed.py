@@ -0,0 +1,99 @@
+"""The change feed: the ChangeEvent rows of every database (one per shard, see core/shard/router.py) in the
+order of their ids, read in batches from a cursor.
+
+A cursor is the id of the last event read on each database, "default:1200,shard_a:33" in the API. Reading
+moves nothing: a consumer acknowledges a batch once it has handled it, which moves its ChangeCursor, and a
+consumer stopped before that reads the batch again (at least once delivery). Ids are handed out at INSERT and
+the rows show up at COMMIT, so an event can commit behind one already read; the feed stops at the first
+event younger than LAG, and only a transaction running longer than that could be passed over. The requests
+never wait for a consumer, they write one row per change.
+
+compact() keeps the table small: an event older than COMPACT_AFTER is deleted when a later event has the same
+key, and every event older than RETENTION goes. A consumer that fell behind still gets the latest change of
+every key, consumers treat "created" and "updated" alike, as the current state to fetch."""
+
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.outbox.models import ChangeCursor, ChangeEvent
+from core.shard.router import databases
+
+LAG = timedelta(seconds=5)
+BATCH_SIZE = 500
+COMPACT_AFTER = timedelta(hours=1)
+RETENTION = timedelta(days=7)
+DELETE_CHUNK = 1000
+
+FIELDS = ('pk', 'topic', 'key', 'action', 'data', 'created')
+
+
+def parse_cursor(text):
+    """{alias: position} of a cursor, ValueError when it isn't one."""
+    positions = {}
+    for part in filter(None, (text or '').split(',')):
+        alias, _, position = part.partition(':')
+        if alias not in databases() or not position.isdigit():
+            raise ValueError(f'Not a cursor: {part}')
+        positions[alias] = int(position)
+    return positions
+
+
+def format_cursor(positions):
+    return ','.join(f'{alias}:{position}' for alias, position in sorted(positions.items()))
+
+
+def _event(alias, row):
+    pk, topic, key, action, data, created = row
+    return {'id': f'{alias}:{pk}', 'topic': topic, 'key': key, 'action': action, 'data': data, 'created': created.isoformat()}
+
+
+def read(positions, limit=BATCH_SIZE, now=None):
+    """(events, positions after them) of the next `limit` events past `positions`."""
+    cutoff = (now or timezone.now()) - LAG
+    positions = dict(positions)
+    events = []
+    for alias in databases():
+        if len(events) >= limit:
+            break
+        rows = ChangeEvent.objects.using(alias).filter(pk__gt=positions.get(alias, 0)).order_by('pk').values_list(*FIELDS)
+        for row in rows[:limit - len(events)]:
+            if row[5] >= cutoff: #the events after it could still be committing
+                break
+            events.append(_event(alias, row))
+            positions[alias] = row[0]
+    return events, positions
+
+
+def load_cursor(consumer):
+    return dict(ChangeCursor.objects.filter(consumer=consumer).values_list('alias', 'position'))
+
+
+def acknowledge(consumer, positions):
+    """Move the cursor of `consumer` to `positions`, never backwards."""
+    for alias, position in positions.items():
+        cursor, created = ChangeCursor.objects.get_or_create(consumer=consumer, alias=alias, defaults={'position': position})
+        if not created:
+            ChangeCursor.objects.filter(pk=cursor.pk, position__lt=position).update(position=position, updated=timezone.now())
+
+
+def _delete(queryset):
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:DELETE_CHUNK])
+        if not pks:
+            return deleted
+        deleted += ChangeEvent.objects.using(queryset.db).filter(pk__in=pks).delete()[0]
+
+
+def compact(now=None):
+    """Delete the superseded and the expired events, returns how many."""
+    now = now or timezone.now()
+    deleted = 0
+    for alias in databases():
+        events = ChangeEvent.objects.using(alias)
+        later = ChangeEvent.objects.filter(topic=OuterRef('topic'), key=OuterRef('key'), pk__gt=OuterRef('pk'))
+        deleted += _delete(events.filter(created__lt=now - COMPACT_AFTER).filter(Exists(later)))
+        deleted += _delete(events.filter(created__lt=now - RETENTION))
+    return deleted
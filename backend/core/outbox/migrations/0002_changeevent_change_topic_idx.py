@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_outbox', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='changeevent',
+            index=models.Index(fields=['topic', 'id'], name='change_topic_idx'),
+        ),
+    ]
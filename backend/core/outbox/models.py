@@ -0,0 +1,39 @@
+from django.db import models
+
+POST = 'post'
+COMMENT = 'comment'
+USER = 'user'
+LIKE = 'like'
+TOPICS = [(POST, 'Post'), (COMMENT, 'Comment'), (USER, 'User'), (LIKE, 'Like')]
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+ACTIONS = [(CREATED, 'Created'), (UPDATED, 'Updated'), (DELETED, 'Deleted')]
+
+
+class ChangeEvent(models.Model):
+    """One change of a post, comment, user or like, written in the transaction of the change by
+    core/outbox/signals.py and read in order of id by the change feed (core/outbox/feed.py)."""
+    topic = models.CharField(max_length=8, choices=TOPICS)
+    key = models.CharField(max_length=65) #the public id, "<user>:<post>" for a like
+    action = models.CharField(max_length=8, choices=ACTIONS)
+    data = models.JSONField(default=dict) #the public ids of the related rows, e.g. the post of a comment
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['topic', 'key', '-id'], name='change_key_idx'), #compaction
+            models.Index(fields=['topic', 'id'], name='change_topic_idx'), #the like events of /api/sync/
+        ]
+
+
+class ChangeCursor(models.Model):
+    """How far a consumer has read the events of one database, moved forward when it acknowledges them."""
+    consumer = models.CharField(max_length=64)
+    alias = models.CharField(max_length=64) #the database, the events of each shard have their own ids
+    position = models.BigIntegerField(default=0) #the id of the last event acknowledged
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['consumer', 'alias'], name='unique_change_cursor')]
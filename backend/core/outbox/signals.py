@@ -0,0 +1,70 @@
+"""Every change of a post, comment, user or like writes a ChangeEvent, on the database and in the transaction
+of the change: AbstractModel.save_base() runs the post_save handlers in the transaction of the save, and the
+m2m_changed signals of a like are sent inside the transaction of add() and remove(). A change rolled back
+takes its event with it, a committed change always has one.
+
+soft_delete() is the deletion consumers see (action "deleted"); the reaper and the admin remove rows that
+are hidden already, and queryset.update() and bulk_create() (the views flush, the seed) write no events."""
+
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from core.comment.models import Comment
+from core.outbox.models import COMMENT, CREATED, DELETED, LIKE, POST, UPDATED, USER, ChangeEvent
+from core.post.models import Post
+from core.user.models import User
+
+SKIPPED_USER_FIELDS = {'last_login'} # a login is not a change of the user
+
+
+def _action(instance, created):
+    if created:
+        return CREATED
+    return DELETED if instance.deleted is not None else UPDATED
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw, using, **kwargs):
+    if not raw:
+        ChangeEvent.objects.using(using).create(
+            topic=POST, key=instance.public_id.hex, action=_action(instance, created),
+            data={'author': instance.author.public_id.hex},
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw, using, **kwargs):
+    if not raw:
+        ChangeEvent.objects.using(using).create(
+            topic=COMMENT, key=instance.public_id.hex, action=_action(instance, created),
+            data={'post': instance.post.public_id.hex, 'author': instance.author.public_id.hex},
+        )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw, using, update_fields, **kwargs):
+    if raw or update_fields and set(update_fields) <= SKIPPED_USER_FIELDS:
+        return
+    ChangeEvent.objects.using(using).create(topic=USER, key=instance.public_id.hex, action=_action(instance, created))
+
+
+@receiver(m2m_changed, sender=User.posts_liked.through)
+def likes_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in ('post_add', 'post_remove') or not pk_set: #pk_set of post_add only has the new likes
+        return
+    if reverse: #instance is the post, pk_set the users
+        posts = {instance.pk: instance.public_id}
+        users = dict(User._base_manager.using(using).filter(pk__in=pk_set).values_list('pk', 'public_id'))
+        pairs = [(user_id, instance.pk) for user_id in pk_set]
+    else:
+        posts = dict(Post._base_manager.using(using).filter(pk__in=pk_set).values_list('pk', 'public_id'))
+        users = {instance.pk: instance.public_id}
+        pairs = [(instance.pk, post_id) for post_id in pk_set]
+    ChangeEvent.objects.using(using).bulk_create([
+        ChangeEvent(
+            topic=LIKE, key=f'{users[user_id].hex}:{posts[post_id].hex}', action=CREATED if action == 'post_add' else DELETED,
+            data={'user': users[user_id].hex, 'post': posts[post_id].hex},
+        )
+        for user_id, post_id in pairs
+        if user_id in users and post_id in posts
+    ])
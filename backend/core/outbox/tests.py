@@ -0,0 +1,114 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.comment.models import Comment
+from core.fixtures.post import post
+from core.fixtures.user import user
+from core.outbox import feed, signals
+from core.outbox.models import ChangeCursor, ChangeEvent
+from core.post.models import Post
+
+
+@pytest.fixture
+def no_lag(monkeypatch):
+    monkeypatch.setattr(feed, "LAG", timedelta(0))
+
+
+def _changes():
+    return list(ChangeEvent.objects.order_by("pk").values_list("topic", "action"))
+
+
+@pytest.mark.django_db
+def test_changes_are_recorded(user, post):
+    user.last_login = timezone.now()
+    user.save(update_fields=["last_login"]) # not a change
+    comment = Comment.objects.create(author=user, post=post, body="First")
+    user.like(post)
+    user.remove_like(post)
+    post.body = "Edited"
+    post.save()
+    comment.soft_delete()
+
+    assert _changes() == [
+        ("user", "created"), ("post", "created"), ("comment", "created"),
+        ("like", "created"), ("like", "deleted"), ("post", "updated"), ("comment", "deleted"),
+    ]
+    like = ChangeEvent.objects.filter(topic="like").first()
+    assert like.key == f"{user.public_id.hex}:{post.public_id.hex}"
+    assert ChangeEvent.objects.filter(topic="comment").first().data == {"post": post.public_id.hex, "author": user.public_id.hex}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_change_and_event_commit_together(user, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("outbox down")
+
+    monkeypatch.setattr(signals.ChangeEvent.objects, "using", broken)
+    with pytest.raises(RuntimeError):
+        Post.objects.create(author=user, body="Lost")
+
+    assert not Post.objects.exists() # the post rolled back with its event
+
+
+@pytest.mark.django_db
+def test_feed_reads_in_batches_and_keeps_the_cursor(user, post, no_lag):
+    admin = APIClient()
+    user.is_staff = True
+    user.save()
+    admin.force_authenticate(user=user)
+    assert APIClient().get("/api/changes/").status_code == 401
+
+    first = admin.get("/api/changes/?consumer=search&limit=2").json()
+    assert [event["topic"] for event in first["results"]] == ["user", "post"]
+    assert first["more"] is True
+    again = admin.get("/api/changes/?consumer=search&limit=2").json()
+    assert again["results"] == first["results"] # not acknowledged, delivered again
+
+    assert admin.post("/api/changes/ack/", {"consumer": "search", "cursor": first["cursor"]}).status_code == 200
+    assert admin.post("/api/changes/ack/", {"consumer": 5, "cursor": first["cursor"]}, format="json").status_code == 400
+    assert admin.post("/api/changes/ack/", {"consumer": "search", "cursor": 5}, format="json").status_code == 400
+    rest = admin.get("/api/changes/?consumer=search").json()
+    assert [event["topic"] for event in rest["results"]] == ["user"] # user.save() above
+    assert rest["more"] is False
+    assert admin.get("/api/changes/?cursor=nowhere:1").status_code == 400
+    assert admin.get("/api/changes/?consumer=search&limit=0").status_code == 400
+
+
+@pytest.mark.django_db
+def test_recent_events_wait_for_the_lag(post):
+    events, positions = feed.read({})
+    assert events == [] and positions == {}
+
+    events, _ = feed.read({}, now=timezone.now() + feed.LAG + timedelta(seconds=1))
+    assert len(events) == 2
+
+
+@pytest.mark.django_db
+def test_changes_command_acknowledges_what_it_printed(post, no_lag):
+    out = StringIO()
+    call_command("changes", consumer="cache", batch_size=1, stdout=out)
+
+    assert [json.loads(line)["topic"] for line in out.getvalue().splitlines()] == ["user", "post"]
+    assert ChangeCursor.objects.get(consumer="cache").position == ChangeEvent.objects.order_by("pk").last().pk
+    out = StringIO()
+    call_command("changes", consumer="cache", stdout=out)
+    assert out.getvalue() == ""
+
+
+@pytest.mark.django_db
+def test_compaction_keeps_the_latest_change_of_a_key(user, post):
+    for index in range(3):
+        post.body = f"Edit {index}"
+        post.save()
+    ChangeEvent.objects.update(created=timezone.now() - feed.COMPACT_AFTER - timedelta(minutes=1))
+
+    assert feed.compact() == 3 # the post created and edited twice, superseded by the last edit
+    assert _changes() == [("user", "created"), ("post", "updated")]
+    ChangeEvent.objects.update(created=timezone.now() - feed.RETENTION - timedelta(minutes=1))
+    assert feed.compact() == 2
@@ -0,0 +1,43 @@
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from core.outbox.feed import BATCH_SIZE, acknowledge, format_cursor, load_cursor, parse_cursor, read
+
+MAX_LIMIT = 1000
+
+
+class ChangeViewSet(viewsets.ViewSet):
+    """Staff only (the search indexer, the cache invalidation, ...), reads the change feed of core/outbox/feed.py."""
+    permission_classes = (IsAdminUser,)
+    http_method_names = ['get', 'post']
+
+    def _cursor(self, text):
+        if text is not None and not isinstance(text, str): #a JSON body can hold any type
+            raise ValidationError({'cursor': 'A string is required.'})
+        try:
+            return parse_cursor(text)
+        except ValueError as error:
+            raise ValidationError({'cursor': str(error)})
+
+    def list(self, request, *args, **kwargs): #/api/changes/?cursor=... or ?consumer=name to start from its acknowledged cursor
+        consumer = request.query_params.get('consumer')
+        positions = load_cursor(consumer) if consumer and 'cursor' not in request.query_params else self._cursor(request.query_params.get('cursor'))
+        try:
+            limit = min(int(request.query_params.get('limit', BATCH_SIZE)), MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({'limit': 'An integer is required.'})
+        if limit < 1: #an empty page would say "more" with the same cursor forever
+            raise ValidationError({'limit': 'At least 1.'})
+        events, positions = read(positions, limit)
+        return Response({'results': events, 'cursor': format_cursor(positions), 'more': len(events) == limit})
+
+    @action(methods=['post'], detail=False) #/api/changes/ack/ {"consumer": ..., "cursor": ...} once the events are handled
+    def ack(self, request, *args, **kwargs):
+        consumer = request.data.get('consumer')
+        if not isinstance(consumer, str) or not consumer or len(consumer) > 64:
+            raise ValidationError({'consumer': 'A name of at most 64 characters is required.'})
+        acknowledge(consumer, self._cursor(request.data.get('cursor')))
+        return Response({'consumer': consumer, 'cursor': format_cursor(load_cursor(consumer))})
@@ -1,10 +1,22 @@
 from django.contrib import admin
+from core.abstract.admin import LargeTableAdminMixin, LookupFilter, SoftDeleteAdminMixin
 from .models import Post
 
+
+class AuthorFilter(LookupFilter):
+    title = 'author'
+    parameter_name = 'author'
+    lookup = 'author__username' #unique, so indexed
+    placeholder = 'username'
+
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdminMixin, SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ('author', 'body', 'edited', 'created', 'updated')
-    list_filter = ('edited', 'created', 'author')
-    search_fields = ('body', 'author__email', 'author__username')
-    ordering = ('-created',)
-    readonly_fields = ('created', 'updated')
\ No newline at end of file
+    list_select_related = ('author',) #one join instead of a query per row for author
+    list_filter = ('edited', 'created', AuthorFilter) #a dropdown of the authors would load every user
+    search_fields = ('body', '=author__username') #body: trigram index of migration 0006 on PostgreSQL
+    search_help_text = 'Words of the body, or the exact username of the author.'
+    ordering = ('-created',) #post_created_idx
+    autocomplete_fields = ('author',)
+    readonly_fields = ('created', 'updated', 'views', 'unique_viewers')
@@ -0,0 +1,212 @@
+"""Views and unique viewers of the posts, without a write per view.
+
+Each process counts in memory: GET /api/post/{id}/ is a view of the post, a page of GET /api/post/ an
+impression of each post in it. Per post it keeps the number of views and a HyperLogLog sketch of who viewed it.
+Every FLUSH_SECONDS a daemon thread (started by the first view of the process, like the rebuild of the user
+prefix index) writes them out in one transaction per database (each of the shards, SHARDS), whatever the number
+of posts:
+
+  * the sketches of PostSketch are merged with the new ones, register by register: the max of the registers
+    of two sketches is the sketch of the union of their viewers, so processes never count a viewer twice,
+  * one UPDATE adds the views to Post.views and sets Post.unique_viewers to the estimate of the merged sketch.
+
+PostSerializer reads views and unique_viewers as two columns of the post, they are behind by up to
+FLUSH_SECONDS. The estimate has a standard error of 1.04 / sqrt(2 ** PRECISION), 1.6%; it is exact in practice
+for the first few hundred viewers. The counts of the last FLUSH_SECONDS of a process that stops are lost.
+A flush that fails is logged and its counts are put back for the next one, up to MAX_PENDING posts: while
+the database is down, the counts of the posts past it are dropped rather than filling the memory. The counts
+of the posts reshard is moving (core/shard/mover.py) are put back the same way, until they are on the target."""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+import zlib
+
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+PRECISION = 12 # 2 ** PRECISION one-byte registers, 4 kB per post before compression
+REGISTERS = 2 ** PRECISION
+FLUSH_SECONDS = 10
+MAX_PENDING = 100_000 # posts with counts waiting for a flush, 30 bytes to a few kB each
+
+logger = logging.getLogger(__name__)
+
+
+class HyperLogLog:
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers) if registers is not None else bytearray(REGISTERS)
+
+    @staticmethod
+    def position(key):
+        """(register, value) of `key`: the first PRECISION bits of its hash choose the register, the value is
+        the position of the first 1 bit of the others."""
+        h = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+        rest = h & ((1 << (64 - PRECISION)) - 1)
+        return h >> (64 - PRECISION), (64 - PRECISION) - rest.bit_length() + 1
+
+    def add(self, key):
+        index, value = self.position(key)
+        if value > self.registers[index]:
+            self.registers[index] = value
+
+    def update(self, positions):
+        """Merge a sparse sketch, {register: value}."""
+        registers = self.registers
+        for index, value in positions.items():
+            if value > registers[index]:
+                registers[index] = value
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        m = REGISTERS
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -value for value in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros: # small range correction, linear counting
+            return round(m * math.log(m / zeros))
+        return round(estimate)
+
+    def dumps(self):
+        return zlib.compress(bytes(self.registers)) # the registers of a post with few viewers are mostly 0
+
+    @classmethod
+    def loads(cls, data):
+        return cls(zlib.decompress(data))
+
+
+def viewer(request):
+    """The key a viewer is counted with: the user, or the address and browser of an anonymous one."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'u{user.pk}'
+    return f"a{request.META.get('REMOTE_ADDR', '')}|{request.META.get('HTTP_USER_AGENT', '')}"
+
+
+class Impressions:
+    def __init__(self, flush_seconds=FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._views = {} # post pk -> views since the last flush
+        self._sketches = {} # post pk -> {register: value}, the sparse sketch of the viewers since the last flush
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def record(self, pks, key):
+        """Count a view of each post of `pks` by the viewer `key`, in memory."""
+        if not pks:
+            return
+        position = HyperLogLog.position(key)
+        with self._lock:
+            for pk in pks:
+                self._views[pk] = self._views.get(pk, 0) + 1
+                sketch = self._sketches.setdefault(pk, {})
+                if position[1] > sketch.get(position[0], 0):
+                    sketch[position[0]] = position[1]
+            if self._flusher is None and self.flush_seconds:
+                self._flusher = threading.Thread(target=self._run, daemon=True)
+                self._flusher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception: # the counts were put back, the next flush retries
+                logger.exception("flushing the post impressions failed")
+            finally:
+                connections.close_all()
+
+    def _take(self):
+        with self._lock:
+            views, sketches = self._views, self._sketches
+            self._views, self._sketches = {}, {}
+        return views, sketches
+
+    def _put_back(self, views, sketches):
+        """Merge the counts of a failed flush with the ones recorded since, returns the number of posts dropped
+        to stay under MAX_PENDING."""
+        dropped = 0
+        with self._lock:
+            for pk, count in views.items():
+                if pk not in self._views and len(self._views) >= MAX_PENDING:
+                    dropped += 1
+                    continue
+                self._views[pk] = self._views.get(pk, 0) + count
+                sketch = self._sketches.setdefault(pk, {})
+                for index, value in sketches[pk].items():
+                    if value > sketch.get(index, 0):
+                        sketch[index] = value
+        if dropped:
+            logger.warning("dropped the impressions of %d posts, more than %d were waiting for a flush", dropped, MAX_PENDING)
+        return dropped
+
+    def flush(self):
+        """Write the counts of this process, returns the number of posts updated."""
+        views, sketches = self._take()
+        if not views:
+            return 0
+        try:
+            written = _write(views, sketches)
+        except Exception:
+            self._put_back(views, sketches)
+            raise
+        if views: # posts of an author being moved to another shard, written by a later flush
+            self._put_back(views, sketches)
+        return written
+
+
+def _write(views, sketches):
+    # the posts written are taken out of `views`, a shard that fails puts back only its own and the ones after
+    # it; the posts of the authors reshard is moving are left in `views`
+    from core.shard.router import databases, moving_authors
+
+    written, moving, held = 0, moving_authors(), set()
+    for alias in databases():
+        if len(views) <= len(held):
+            break
+        try:
+            written += _write_on(views, sketches, alias, moving, held)
+        except IntegrityError: # another process created one of the sketches first, it exists now
+            written += _write_on(views, sketches, alias, moving, held)
+    for pk in [pk for pk in views if pk not in held]: # archived or reaped posts are dropped
+        del views[pk]
+    return written
+
+
+def _write_on(views, sketches, using, moving, held):
+    from core.post.models import Post, PostSketch
+
+    with transaction.atomic(using=using):
+        pks = []
+        for pk, author_id in Post._base_manager.using(using).filter(pk__in=list(views)).values_list('pk', 'author_id'):
+            if author_id in moving:
+                held.add(pk)
+            else:
+                pks.append(pk)
+        stored = {row.pk: row for row in PostSketch.objects.using(using).select_for_update().filter(pk__in=pks)}
+        counts, new = {}, []
+        for pk in pks:
+            hll = HyperLogLog.loads(stored[pk].registers) if pk in stored else HyperLogLog()
+            hll.update(sketches[pk])
+            counts[pk] = hll.count()
+            if pk in stored:
+                stored[pk].registers = hll.dumps()
+            else:
+                new.append(PostSketch(post_id=pk, registers=hll.dumps()))
+        PostSketch.objects.using(using).bulk_update(stored.values(), ['registers'], batch_size=500)
+        PostSketch.objects.using(using).bulk_create(new, batch_size=500)
+        if pks:
+            Post._base_manager.using(using).filter(pk__in=pks).update(
+                views=F('views') + Case(*[When(pk=pk, then=Value(views[pk])) for pk in pks], output_field=IntegerField()),
+                unique_viewers=Case(*[When(pk=pk, then=Value(counts[pk])) for pk in pks], output_field=IntegerField()),
+            )
+    for pk in pks:
+        del views[pk]
+    return len(pks)
+
+
+impressions = Impressions()
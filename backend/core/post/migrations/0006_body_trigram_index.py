@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:28
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN trigram index for the search of the post admin (search_fields). Django writes the icontains lookups
+    # UPPER("body"::text) LIKE UPPER('%q%'), the index is on the same expression.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return # the search still works, with a scan of the table
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS post_body_trgm ON "core.post" '
+        'USING gin (UPPER("body"::text) gin_trgm_ops) WHERE deleted IS NULL'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS post_body_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_post', '0005_post_post_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
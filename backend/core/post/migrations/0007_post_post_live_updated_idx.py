@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_post', '0006_body_trigram_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('deleted__isnull', True)), fields=['-updated'], name='post_live_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_post', '0007_post_post_live_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_live_updated_idx',
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('deleted__isnull', True)), fields=['-updated', '-id'], name='post_live_updated_idx'),
+        ),
+    ]
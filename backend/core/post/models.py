@@ -1,4 +1,5 @@
 from core.abstract.models import AbstractModel, AbstractManager
+from core.shard.router import ShardedManagerMixin
 from django.db import models
 from django.core.exceptions import ValidationError
 import os
@@ -19,14 +20,16 @@ def validate_file_extension(value):
 
 
 
-class PostManager(AbstractManager):
-    pass
+class PostManager(ShardedManagerMixin, AbstractManager): #create() saves on the author's shard when SHARDS is set
+    hidden_with = ("author",) #the posts of a soft-deleted user are hidden too
 
 class Post(AbstractModel):
     author = models.ForeignKey(to="core_user.User",#creates a many-to-one relationship where each record links to a user from the core_user app, meaning multiple objects can share the same author.
                                on_delete=models.CASCADE) #means that if the referenced user (author) is deleted, all related objects (e.g., posts) will also be automatically deleted from the database.
     body = models.TextField()
     edited = models.BooleanField(default=False)
+    views = models.PositiveBigIntegerField(default=0) #written by the impressions flush, see core/post/impressions.py
+    unique_viewers = models.PositiveIntegerField(default=0) #estimated from the PostSketch of the post
     
     objects= PostManager()
     
@@ -41,6 +44,10 @@ class Post(AbstractModel):
     class Meta:
         db_table= "core.post" #explicitly sets the database table name for the model to "core.post" instead of Django’s default naming convention.
         verbose_name = 'core_post' #Sets a human-readable name for the model used in the Django admin and elsewhere; 'core_post' will be displayed instead of the default 'Post'
+        indexes = [
+            models.Index(fields=['created'], name='post_created_idx'), #the range read by each analytics rollup, see core/analytics/rollup.py
+            models.Index(fields=['-updated', '-id'], name='post_live_updated_idx', condition=models.Q(deleted__isnull=True)), #the -updated page of the post list (see core/benchmark/plans.py) and the (updated, id) positions of /api/sync/
+        ]
         verbose_name_plural = 'core_posts'#Defines the plural display name for the model in the Django admin interface — instead of the default 'Posts', it will show 'core_posts'.
         """ not only can we use the Post.author syntax to access the user object but we can also access 
 posts created by a user using the User.post_set syntax. The latter syntax will return a 
@@ -51,6 +58,11 @@ relationship, which is also a one-to-many relationship."""
         
         
 
+class PostSketch(models.Model): #the HyperLogLog sketch of the viewers of a post, merged by each flush of core/post/impressions.py
+    post = models.OneToOneField(to="core_post.Post", on_delete=models.CASCADE, primary_key=True, related_name="sketch")
+    registers = models.BinaryField() #zlib compressed registers
+
+
 """Apart from CASCADE as a value for the on_delete attribute on a ForeignKey relationship, 
 you can also have the following:
  • SET_NULL: This will set the child object foreign key to null on delete. For example, if a user 
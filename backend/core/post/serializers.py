@@ -1,9 +1,16 @@
+from django.db.models import Count
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from core.abstract.serializers import AbstractSerializer
 from core.post.models import Post
 from core.user.models import User
 from core.user.serializers import UserSerializer
+from core.tag.links import link, relink
+from core.moderation.duplicates import screen
+from core.moderation.filter import check_terms
+from core.revision import history as revisions
+from core.moderation.models import POST
+from core.shard import router as sharding
 
 class PostSerializer(AbstractSerializer):
     author = serializers.SlugRelatedField(#This field links the author to a user using a human-readable field (public_id) instead of the default ID//SlugRelatedField lets you represent a related object (like author) using a specific field (the “slug”) instead of the default primary key (ID).
@@ -18,6 +25,8 @@ class PostSerializer(AbstractSerializer):
     liked = serializers.SerializerMethodField() #Declares a read-only field in the serializer whose value is computed 
                                                 #by a method named 'get_<field_name>' in the same serializer class.
     likes_count = serializers.SerializerMethodField()
+    views = serializers.IntegerField(read_only=True) #columns of the post kept by core/post/impressions.py, no query of their own
+    unique_viewers = serializers.IntegerField(read_only=True)
     
     
     def validate_author(self, value):
@@ -29,23 +38,30 @@ class PostSerializer(AbstractSerializer):
         fields = ['id', 'author', 'body', 'edited', 'created', 'updated']
         read_only_fields = ["edited"]
         
-    def to_representation(self, instance):#to_representation(self, instance) is a method provided by Django REST Framework in serializers.Serializer. It defines how a model instance is converted into a Python dict (i.e. the output format for API responses). You can override it to customize the serialized output.
-                                            #returns a dictionary
-        rep = super().to_representation(instance) #calls the parent class's implementation of to_representation() to get the default serialized data.
-        author = User.objects.get_object_by_public_id(rep["author"]) #It fetches the User object from the database using the public_id stored in rep["author"].  get_object_by_public_id is a custom method in User model's manager that returns a user based on their public_id.
-        rep["author"] = UserSerializer(author).data #replaces the author field in rep with this serialized user info (e.g., name, email, etc.) and serializes into JSON
-        
-        return rep
-    
+    expandable_fields = {"author": UserSerializer} #AbstractSerializer replaces the author public_id with UserSerializer(post.author).data
+    default_expand = ("author",)                   #when the client asks for it with ?expand=author, or by default when no ?fields=/?expand= is sent
         
 # The validate_author method checks validation for the author field. Here, we want to make 
 # sure that the user creating the post is the same user as in the author field. A context dictionary is 
 # available in every serializer. It usually contains the request object that we can use to make some checks.
 
+    def create(self, validated_data):
+        check_terms(validated_data['body']) #banned terms, see core/moderation/filter.py
+        screening = screen(POST, validated_data['body']) #near-duplicate spam, see core/moderation/duplicates.py
+        instance = super().create(validated_data)
+        link([instance]) #indexes the #hashtags and @mentions of the body, see core/tag/links.py
+        screening.remember(instance)
+        return instance
+
     def update(self, instance, validated_data):   #This update method overrides the default to automatically mark a post as edited the first time it's updated. If instance.edited is False, it sets 'edited': True in the validated_data. Then it calls the parent class’s update() method with the modified data and returns the updated instance.
+        if 'body' in validated_data:
+            check_terms(validated_data['body'])
         if not instance.edited:
             validated_data['edited']= True
-        instance = super().update(instance, validated_data)
+        with revisions.editing(instance): #keeps the previous body, see core/revision/history.py
+            instance = super().update(instance, validated_data)
+        if 'body' in validated_data:
+            relink(instance)
         return instance
     
     def get_liked(self, instance): #Custom method used by SerializerMethodField for liked field, 'instance' is the current object being serialized.
@@ -59,10 +75,29 @@ class PostSerializer(AbstractSerializer):
     def get_likes_count(self, instance): #'instance' is the current object being serialized.
         return instance.liked_by.count() #Returns the total number of users who have liked this instance by counting entries in the 'liked_by' related field
                                             #liked_by is the related field
+
+    def get_liked_batch(self, pks): #get_liked for a whole page of posts in one query, used by the compiled
+        #read path of the list endpoint (core/abstract/compiled.py). Returns {post pk: liked}.
+        request = self.context.get('request', None)
+        if request is None or request.user.is_anonymous:
+            return dict.fromkeys(pks, False)
+        liked = set()
+        for alias in sharding.databases(): #one query per shard when SHARDS is set, see core/shard/router.py
+            liked.update(request.user.posts_liked.db_manager(alias).filter(pk__in=pks).values_list('pk', flat=True))
+        return {pk: pk in liked for pk in pks}
+
+    def get_likes_count_batch(self, pks): #get_likes_count for a whole page of posts in one query.
+        counts = {}
+        for alias in sharding.databases():
+            counts.update(
+                User.posts_liked.through.objects.using(alias).filter(post_id__in=pks, user__deleted__isnull=True) #like liked_by, soft-deleted users are hidden
+                .values('post_id').annotate(count=Count('pk')).values_list('post_id', 'count')
+            )
+        return {pk: counts.get(pk, 0) for pk in pks}
     
     class Meta: #Inner class used to configure metadata for the parent class (e.g., a serializer or model); defines options like model, fields, ordering, etc.
         model = Post
-        fields = ['id', 'author', 'body', 'edited', 'liked', 'likes_count', 'created', 'updated']
+        fields = ['id', 'author', 'body', 'edited', 'liked', 'likes_count', 'views', 'unique_viewers', 'created', 'updated']
         read_only_fields = ['edited']
         
 
@@ -1,5 +1,6 @@
 import pytest
 from core.fixtures.user import user
+from core.fixtures.post import post
 from core.post.models import Post
 
 @pytest.mark.django_db
@@ -9,3 +10,143 @@ def test_create_post(user):
     assert post.body == "Test Post"
     assert post.author == user
 
+
+@pytest.mark.django_db
+def test_list_posts_sparse_fields(client, post, django_assert_num_queries):
+    with django_assert_num_queries(2): # count + one select, liked/likes_count are never computed
+        response = client.get("/api/post/?fields=id,author,body")
+    
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"id": post.public_id.hex, "author": post.author.public_id.hex, "body": post.body}
+    ]
+
+@pytest.mark.django_db
+def test_list_posts_expand_author(client, post):
+    response = client.get("/api/post/?fields=id,author&expand=author")
+    
+    author = response.json()["results"][0]["author"]
+    assert author["id"] == post.author.public_id.hex
+    assert author["username"] == post.author.username
+
+@pytest.mark.django_db
+def test_list_posts_default_representation(client, post):
+    response = client.get("/api/post/")
+    
+    result = response.json()["results"][0]
+    assert set(result) == {"id", "author", "body", "edited", "liked", "likes_count", "views", "unique_viewers", "created", "updated"}
+    assert result["author"]["username"] == post.author.username
+
+@pytest.mark.django_db
+def test_list_posts_compiled_matches_serializer(user, post, monkeypatch, django_assert_max_num_queries):
+    from rest_framework.test import APIClient
+    from core.abstract import viewsets
+
+    user.avatar = "avatars/test.png"
+    user.save()
+    other = Post.objects.create(author=user, body="Second post")
+    user.like(other)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    urls = ["/api/post/", "/api/post/?fields=id,liked,likes_count", "/api/post/?expand=author&ordering=created"]
+
+    with django_assert_max_num_queries(4 * len(urls)): # count, rows, liked and likes_count for each page
+        compiled = [client.get(url).content for url in urls]
+    monkeypatch.setattr(viewsets, "compile_serializer", lambda serializer: None)
+    regular = [client.get(url).content for url in urls]
+
+    assert compiled == regular
+    assert b'"liked":true,"likes_count":1' in compiled[0]
+
+
+@pytest.mark.django_db
+def test_likes_of_soft_deleted_users_are_hidden_in_list_and_detail(user, post):
+    from rest_framework.test import APIClient
+    from core.user.models import User
+
+    fan = User.objects.create_user(username="fan", email="fan@example.com", password="test_password", first_name="Fan", last_name="Test")
+    fan.like(post)
+    fan.soft_delete()
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    listed = client.get("/api/post/").json()["results"][0]
+    detail = client.get(f"/api/post/{post.public_id.hex}/").json()
+    assert listed["likes_count"] == detail["likes_count"] == 0
+
+@pytest.mark.django_db
+def test_delete_post_with_comments(client, user, post):
+    from rest_framework_simplejwt.tokens import AccessToken
+    from core.comment.models import Comment
+
+    Comment.objects.create(author=user, post=post, body="Comment")
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+
+    response = client.delete(f"/api/post/{post.public_id.hex}/", **headers)
+
+    assert response.status_code == 204
+    assert client.get(f"/api/post/{post.public_id.hex}/").status_code == 404
+    assert client.get("/api/post/").json()["count"] == 0
+    assert client.get(f"/api/post/{post.public_id.hex}/comment/").json()["count"] == 0
+    assert Post.objects.with_deleted().filter(pk=post.pk).exists() # removed later by the reaper
+
+
+def test_hyperloglog_estimate_and_merge():
+    from core.post.impressions import HyperLogLog
+
+    first, second, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(30000):
+        (first if i % 2 else second).add(f"u{i}")
+        both.add(f"u{i}")
+    first.merge(second)
+
+    assert first.registers == both.registers # the union of the viewers of two processes
+    assert abs(both.count() - 30000) < 30000 * 0.05
+    assert HyperLogLog.loads(both.dumps()).registers == both.registers
+
+
+@pytest.mark.django_db
+def test_post_views_are_flushed_in_batches(client, user, post, monkeypatch, django_assert_max_num_queries):
+    from rest_framework.test import APIClient
+    from core.post import impressions, viewsets
+
+    process = impressions.Impressions(flush_seconds=0) # flushed by hand, no thread
+    monkeypatch.setattr(viewsets, "impressions", process)
+    other = Post.objects.create(author=user, body="Second post")
+    reader = APIClient()
+    reader.force_authenticate(user=user)
+
+    for _ in range(3):
+        reader.get(f"/api/post/{post.public_id.hex}/")
+    client.get("/api/post/")
+    assert Post.objects.get(pk=post.pk).views == 0 # nothing written per view
+
+    with django_assert_max_num_queries(8): # the same for any number of posts and views
+        assert process.flush() == 2
+    assert Post.objects.filter(pk=post.pk).values_list("views", "unique_viewers").get() == (4, 2)
+    assert Post.objects.filter(pk=other.pk).values_list("views", "unique_viewers").get() == (1, 1)
+
+    another = impressions.Impressions(flush_seconds=0) # a second process, the same viewer is not counted again
+    another.record([post.pk], f"u{user.pk}")
+    another.flush()
+    result = reader.get(f"/api/post/{post.public_id.hex}/").json()
+    assert (result["views"], result["unique_viewers"]) == (5, 2)
+
+
+def test_failed_impression_flushes_are_put_back_up_to_a_limit(monkeypatch):
+    from core.post import impressions
+
+    def down(views, sketches):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(impressions, "_write", down)
+    monkeypatch.setattr(impressions, "MAX_PENDING", 2)
+    process = impressions.Impressions(flush_seconds=0)
+    process.record([1, 2, 3], "u1")
+    with pytest.raises(RuntimeError):
+        process.flush()
+    assert process._views == {1: 1, 2: 1} # post 3 is dropped
+    process.record([1], "u2")
+    with pytest.raises(RuntimeError):
+        process.flush()
+    assert process._views == {1: 2, 2: 1}
@@ -1,19 +1,28 @@
+from django.http import Http404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action 
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from core.auth.authentication import JWTAuthentication
 from core.abstract.viewsets import AbstractViewSet
+from core.archive import reads as archive
+from core.archive.models import ArchivedPost
+from core.post.impressions import impressions, viewer
 from core.post.models import Post
 from core.post.serializers import PostSerializer
+from core.revision.viewsets import RevisionsMixin
+from core.shard import router as sharding
+from core.shard.feed import ShardedQuerySet
 from core.auth.permissions import UserPermission
 
 #methods for deletion (destroy()), and updating  (update()) are already available by default in the ViewSet class
 
-class PostViewSet(AbstractViewSet):
+class PostViewSet(RevisionsMixin, AbstractViewSet): #/post/{id}/revisions/, see core/revision/history.py
     http_method_names = ('post', 'get', 'put', 'delete', 'patch')
     permission_classes = (UserPermission,)
     serializer_class = PostSerializer
+    archived_model = ArchivedPost #the revisions of the archived posts, see RevisionsMixin
+    throttle_scopes = {'create': ('post-create-user',), 'like': ('like-user',), 'remove_like': ('like-user',)} #sliding windows per user, see core/auth/throttling.py
     authentication_classes = [JWTAuthentication] #Your viewset uses permission_classes = (IsAuthenticated,), which requires a valid authenticated user. If authentication fails (due to the wrong authentication classes), DRF returns the "Authentication credentials were not provided." error.
     #you’re likely using a token-based authentication system like rest_framework_simplejwt or DRF’s TokenAuthentication. These require JWTAuthentication or TokenAuthentication in your authentication_classes, not SessionAuthentication or BasicAuthentication.
 
@@ -25,7 +34,26 @@ class PostViewSet(AbstractViewSet):
                             #self.kwargs['pk'] extracts that value and passes it to the custom method. kwargs helps access dynamic values from the URL.
         self.check_object_permissions(self.request,obj) #method from Django REST Framework's ViewSet that Checks if the current user has permission to interact with a specific object (obj), Uses your defined permission_classes (like IsOwner, IsAdminUser, etc.) Raises a PermissionDenied error (403) if the user isn’t allowed access
                                                         #In short: it enforces object-level permission checks.
+        if self.action == 'retrieve':
+            impressions.record([obj.pk], viewer(self.request)) #counted in memory, see core/post/impressions.py
         return obj #if the user has permission, the object is returned; otherwise, a PermissionDenied error is raised
+
+    def paginate_queryset(self, queryset):
+        if self.action == 'list' and sharding.enabled(): #the pages of every shard merged, see core/shard/feed.py
+            queryset = ShardedQuerySet(queryset)
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.action == 'list': #an impression of each post of the page
+            impressions.record([row[0] if isinstance(row, tuple) else row.pk for row in page], viewer(self.request))
+        return page
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            data = archive.post(kwargs['pk'], self.get_serializer_context()) #old posts moved out by manage.py archive
+            if data is None:
+                raise
+            return Response(data)
     
     def create(self, request, *args, **kwargs): #*args and **kwargs allow the method to accept extra positional and keyword arguments, ensuring compatibility with parent class methods
         serializer = self.get_serializer(data= request.data) # self.get_serializer method in Django REST Framework's ViewSet that returns an instance of the serializer class associated with the view, optionally populated with data, context, or arguments.
@@ -57,7 +85,7 @@ class PostViewSet(AbstractViewSet):
         #from the URL; provided by DRF's GenericViewSet or ModelViewSet.
         #self.get_object() is a built-in DRF method It uses the lookup field (e.g., pk, slug, or public_id) from
         # the URL to fetch the object from the database.
-        user = self.request.user() #request.user  Refers to the currently authenticated user making the request;
+        user = self.request.user #request.user  Refers to the currently authenticated user making the request;
         #available through Django’s authentication system.
         
         user.like(post) #calling a custom method named like() defined on the User model
@@ -68,7 +96,7 @@ class PostViewSet(AbstractViewSet):
     @action(methods=['post'], detail=True)
     def remove_like(self, request, *args, **kwargs):
         post= self.get_object()
-        user = self.request.user()
+        user = self.request.user
         user.remove_like(post)
         serializer = self.serializer_class(post)
         return Response(serializer.data, status = status.HTTP_200_OK)
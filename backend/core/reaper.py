@@ -0,0 +1,72 @@
+"""Hard deletion of the soft-deleted users, posts and comments (see AbstractModel.soft_delete()).
+
+Deleting a user or a post in one go means one transaction over every comment and like under it, holding
+row locks and growing the WAL for as long as it takes. The reaper deletes in dependency order instead,
+children first so PROTECT never fires:
+
+    comments of deleted posts/users and deleted comments -> likes -> posts -> users
+
+each step in chunks of `chunk_size` primary keys, one short transaction per chunk, with a pause between
+chunks so the rest of the traffic gets the database. The tombstones older than the sync cursors (see
+core/sync/delta.py) and the revocations of expired tokens (see core/auth/revocation.py) go last. Nothing on the read path locks rows, so readers never
+wait on the reaper; they already stopped seeing the rows when they were soft-deleted."""
+
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.auth.revocation import expired
+from core.comment.models import Comment
+from core.post.models import Post
+from core.sync.delta import RETENTION
+from core.sync.models import Tombstone
+from core.user.models import User
+
+Like = User.posts_liked.through
+
+
+class Reaper:
+    def __init__(self, chunk_size=500, pause=0.05, grace=timedelta(0), using='default', progress=None):
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.grace = grace # soft-deleted rows are kept this long (e.g. to allow an undo)
+        self.using = using
+        self.progress = progress # called with (table, rows deleted so far)
+
+    def _reap(self, name, queryset):
+        model = queryset.model
+        total = 0
+        while True:
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:self.chunk_size])
+            if not pks:
+                return total
+            with transaction.atomic(using=self.using):
+                model._base_manager.using(self.using).filter(pk__in=pks).delete()
+            total += len(pks)
+            if self.progress:
+                self.progress(name, total)
+            if self.pause:
+                time.sleep(self.pause)
+
+    def run(self):
+        """Delete everything that was soft-deleted before the grace period, returns the rows deleted per table."""
+        before = timezone.now() - self.grace
+        revoked_tokens, token_cutoffs = expired()
+        users = User.objects.with_deleted().using(self.using).filter(deleted__lte=before)
+        posts = Post.objects.with_deleted().using(self.using).filter(Q(deleted__lte=before) | Q(author__in=users))
+        comments = Comment.objects.with_deleted().using(self.using).filter(
+            Q(deleted__lte=before) | Q(post__in=posts) | Q(author__in=users)
+        )
+        likes = Like.objects.using(self.using).filter(Q(post__in=posts) | Q(user__in=users))
+        return {
+            'comments': self._reap('comments', comments),
+            'likes': self._reap('likes', likes),
+            'posts': self._reap('posts', posts),
+            'users': self._reap('users', users),
+            'tombstones': self._reap('tombstones', Tombstone.objects.using(self.using).filter(created__lt=timezone.now() - RETENTION)),
+            'revoked_tokens': self._reap('revoked_tokens', revoked_tokens.using(self.using)),
+            'token_cutoffs': self._reap('token_cutoffs', token_cutoffs.using(self.using)),
+        }
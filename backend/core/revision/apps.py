@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class RevisionConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core.revision'
+    label = 'core_revision'
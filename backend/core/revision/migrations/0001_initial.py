@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core_comment', '0006_comment_comment_live_updated_idx'),
+        ('core_post', '0008_remove_post_post_live_updated_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('full', models.BooleanField(default=False)),
+                ('data', models.TextField()),
+                ('created', models.DateTimeField()),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='core_comment.comment')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('comment', 'number'), name='unique_comment_revision')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('full', models.BooleanField(default=False)),
+                ('data', models.TextField()),
+                ('created', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='core_post.post')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('post', 'number'), name='unique_post_revision')],
+            },
+        ),
+    ]
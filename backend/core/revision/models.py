@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class AbstractRevision(models.Model):
+    """A previous version of a body, see core/revision/history.py. Version `number` of the body is rebuilt from
+    version number + 1 (the current body for the latest revision) with `data`, or is `data` itself when
+    `full`."""
+    number = models.PositiveIntegerField() #1 for the body as first written
+    full = models.BooleanField(default=False)
+    data = models.TextField()
+    created = models.DateTimeField() #when this version was written
+
+    class Meta:
+        abstract = True
+
+
+class PostRevision(AbstractRevision):
+    post = models.ForeignKey("core_post.Post", on_delete=models.CASCADE, related_name="revisions")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['post', 'number'], name='unique_post_revision')]
+
+
+class CommentRevision(AbstractRevision):
+    comment = models.ForeignKey("core_comment.Comment", on_delete=models.CASCADE, related_name="revisions")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['comment', 'number'], name='unique_comment_revision')]
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.archive.archiver import Archiver
+from core.comment.models import Comment
+from core.fixtures.post import post
+from core.fixtures.user import user
+from core.post.models import Post
+from core.revision import history
+from core.revision.models import PostRevision
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def test_diff_rebuilds_the_older_text_compactly():
+    newer = "A long enough post about foxes, with a few sentences in it. " * 5 + "The end."
+    older = newer.replace("foxes", "dogs", 1).replace("The end.", "The very end!")
+
+    data = history.diff(newer, older)
+
+    assert history.patch(newer, data) == older
+    assert len(data) < len(older) / 5
+
+
+@pytest.mark.django_db
+def test_post_edits_keep_every_version(user, post):
+    client = _client(user)
+    bodies = [post.body]
+    for body in ["Test Post body, edited", "Test Post body, edited twice", "Something else entirely"]:
+        assert client.patch(f"/api/post/{post.public_id.hex}/", {"body": body}).status_code == 200
+        bodies.append(body)
+
+    listed = client.get(f"/api/post/{post.public_id.hex}/revisions/").json()["results"]
+    assert [(row["number"], row["current"]) for row in listed] == [(4, True), (3, False), (2, False), (1, False)]
+    for number, body in enumerate(bodies, start=1):
+        assert client.get(f"/api/post/{post.public_id.hex}/revisions/{number}/").json()["body"] == body
+    assert client.get(f"/api/post/{post.public_id.hex}/revisions/5/").status_code == 404
+    assert APIClient().get(f"/api/post/{post.public_id.hex}/revisions/1/").status_code == 200 # readable like the post
+
+
+@pytest.mark.django_db
+def test_any_version_is_rebuilt_with_one_query(user, post, monkeypatch, django_assert_num_queries):
+    monkeypatch.setattr(history, "SNAPSHOT_EVERY", 4)
+    bodies = []
+    for index in range(11):
+        bodies.append(post.body)
+        with history.editing(post):
+            post.body = f"{post.body} and edit {index}"
+            post.save()
+
+    assert list(PostRevision.objects.filter(full=True).values_list("number", flat=True)) == [4, 8]
+    for number, body in enumerate(bodies, start=1):
+        with django_assert_num_queries(1): # at most SNAPSHOT_EVERY - 1 deltas, read at once
+            assert history.version(post, number)[1] == body
+
+
+@pytest.mark.django_db
+def test_comment_edits_keep_every_version(user, post):
+    comment = Comment.objects.create(author=user, post=post, body="First comment")
+    client = _client(user)
+    url = f"/api/post/{post.public_id.hex}/comment/{comment.public_id.hex}/"
+
+    response = client.put(url, {"author": user.public_id.hex, "post": post.public_id.hex, "body": "First comment, fixed"})
+
+    assert response.status_code == 200
+    assert client.get(f"{url}revisions/1/").json()["body"] == "First comment"
+    assert client.get(f"{url}revisions/2/").json()["body"] == "First comment, fixed"
+
+
+@pytest.mark.django_db
+def test_archived_posts_keep_their_history(user, post, monkeypatch):
+    monkeypatch.setattr(history, "SNAPSHOT_EVERY", 4)
+    comment = Comment.objects.create(author=user, post=post, body="First comment")
+    bodies = []
+    for index in range(6):
+        bodies.append(post.body)
+        with history.editing(post):
+            post.body = f"{post.body} and edit {index}"
+            post.save()
+    bodies.append(post.body)
+    with history.editing(comment):
+        comment.body = "First comment, fixed"
+        comment.save()
+    Post.objects.filter(pk=post.pk).update(created=timezone.now() - timedelta(days=400))
+    Archiver(timezone.now() - timedelta(days=180), pause=0).run()
+
+    assert not PostRevision.objects.exists()
+    client = _client(user)
+    listed = client.get(f"/api/post/{post.public_id.hex}/revisions/").json()["results"]
+    assert [row["number"] for row in listed] == [7, 6, 5, 4, 3, 2, 1]
+    for number, body in enumerate(bodies, start=1):
+        assert client.get(f"/api/post/{post.public_id.hex}/revisions/{number}/").json()["body"] == body
+    assert client.get(f"/api/post/{post.public_id.hex}/revisions/8/").status_code == 404
+    url = f"/api/post/{post.public_id.hex}/comment/{comment.public_id.hex}/revisions/"
+    assert client.get(f"{url}1/").json()["body"] == "First comment"
+    assert client.get(f"{url}2/").json()["body"] == "First comment, fixed"
@@ -0,0 +1,47 @@
+from functools import partial
+
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.archive import reads as archive
+from core.revision.history import archived_version, archived_versions, version, versions
+
+_datetime = serializers.DateTimeField() # the format of `created` and `updated` in the other responses
+
+
+class RevisionsMixin:
+    """/revisions/ and /revisions/{number}/ of a post or a comment, for whoever can read it."""
+    archived_model = None #ArchivedPost or ArchivedComment, where the revisions of an archived object are kept
+
+    def _history(self):
+        """versions() and version() of the object, read from its archived document once it was archived."""
+        try:
+            instance = self.get_object()
+        except Http404:
+            found = archive.document(self.archived_model, self.kwargs['pk']) if self.archived_model else None
+            if found is None:
+                raise
+            return partial(archived_versions, found), partial(archived_version, found)
+        return partial(versions, instance), partial(version, instance)
+
+    @action(methods=['get'], detail=True) #the versions of the body, latest first
+    def revisions(self, request, *args, **kwargs):
+        rows = self._history()[0]()
+        current = rows[-1][0]
+        return Response({
+            'results': [
+                {'number': number, 'created': _datetime.to_representation(created), 'current': number == current}
+                for number, created in reversed(rows)
+            ],
+        })
+
+    @action(methods=['get'], detail=True, url_path=r'revisions/(?P<number>[0-9]+)') #one version, rebuilt
+    def revision(self, request, *args, **kwargs):
+        number = int(kwargs['number'])
+        found = self._history()[1](number)
+        if found is None:
+            raise Http404
+        created, body = found
+        return Response({'number': number, 'created': _datetime.to_representation(created), 'body': body})
@@ -1,9 +1,16 @@
 from rest_framework import routers # Routers allow you to quickly declare all of the common routes for a given 
 #controller
 from core.user.viewsets import UserViewSet
-from core.auth.viewsets import RegisterViewSet, LoginViewSet, RefreshViewSet
+from core.auth.viewsets import RegisterViewSet, LoginViewSet, RefreshViewSet, LogoutViewSet
 from core.post.viewsets import PostViewSet
 from core.comment.viewsets import CommentViewSet
+from core.tag.viewsets import TagViewSet, MentionViewSet
+from core.trending.viewsets import TrendingViewSet
+from core.batch import BatchViewSet
+from core.notification.viewsets import NotificationViewSet
+from core.analytics.viewsets import AnalyticsViewSet
+from core.outbox.viewsets import ChangeViewSet
+from core.sync.viewsets import SyncViewSet
 from rest_framework_nested import routers#The Django ecosystem has a library called drf-nested-routers, which helps
 #write routers to create nested resources in a Django project
 
@@ -22,9 +29,18 @@ router.register(r'user', UserViewSet, basename='user')
 router.register(r'auth/register', RegisterViewSet, basename='auth-register')
 router.register(r'auth/login', LoginViewSet, basename= 'auth-login')
 router.register(r'auth/refresh', RefreshViewSet, basename='auth-refresh')
+router.register(r'auth/logout', LogoutViewSet, basename='auth-logout') #/auth/logout/ and /auth/logout/all/
 
 #######POST ##########
 router.register(r'post', PostViewSet, basename='post')
+router.register(r'tag', TagViewSet, basename='tag') #/tag/{name}/posts/ and /tag/{name}/comments/
+router.register(r'mention', MentionViewSet, basename='mention') #/mention/{username}/posts/ and /mention/{username}/comments/
+router.register(r'trending', TrendingViewSet, basename='trending') #/trending/ top posts and tags, see core/trending/engine.py
+router.register(r'batch', BatchViewSet, basename='batch') #/batch/ several requests in one, see core/batch.py
+router.register(r'notification', NotificationViewSet, basename='notification') #/notification/, /notification/unread/, /notification/{id}/read/
+router.register(r'analytics', AnalyticsViewSet, basename='analytics') #/analytics/ and /analytics/authors/, staff only, see core/analytics/rollup.py
+router.register(r'changes', ChangeViewSet, basename='changes') #/changes/ and /changes/ack/, staff only, see core/outbox/feed.py
+router.register(r'sync', SyncViewSet, basename='sync') #/sync/?since=<cursor> what changed since, see core/sync/delta.py
 # Creates a nested route under 'post', so we can access related resources like /post/{post_id}/comments/
 
 posts_router = routers.NestedSimpleRouter(router, r'post', lookup='post')
@@ -64,6 +80,3 @@ The viewset: Only representing a valid viewset class.
 The basename argument is optional but it’s a good practice to use one, as it helps for readability and 
 also helps Django for URL registry purposes.
 """
-urlpatterns = [
-    *router.urls
-] # this should be at end
\ No newline at end of file
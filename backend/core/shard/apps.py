@@ -0,0 +1,19 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save, pre_save
+
+
+class ShardConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core.shard'
+    label = 'core_shard'
+
+    def ready(self):
+        from core.comment.models import Comment
+        from core.post.models import Post
+        from core.shard import router
+        from core.user.models import User
+        for model in (Post, Comment):
+            pre_save.connect(router.assign_id, sender=model) #ids unique across the shards
+            post_save.connect(router.record_object, sender=model) #the public_id -> shard lookup
+        post_save.connect(router.replicate_user, sender=User) #every shard joins the users
+        post_delete.connect(router.unreplicate_user, sender=User)
@@ -0,0 +1,70 @@
+"""The post list over the shards: a k-way merge of the same query run on each of them.
+
+ShardedQuerySet has what the paginators use: count(), filter(), order_by() and slicing. A page
+[offset:offset + limit] reads from every shard only the sort key and the id of its first offset + limit rows,
+in the query's order (from the index, see core/benchmark/plans.py); heapq.merge() interleaves them and the page
+is cut from the merged run. Then each shard loads its rows of the page with one `pk IN (...)` query, and they
+are put back in the merged order. A shard contributes no more rows to a page than the page size.
+
+Deep pages cost each shard offset + limit keys: LimitOffsetPagination pays that on one database too."""
+
+import heapq
+from itertools import islice
+
+from core.shard.router import databases
+
+
+def _row_pk(row):
+    return row[0] if isinstance(row, tuple) else row.pk # the compiled read path reads the id first
+
+
+class ShardedQuerySet:
+    def __init__(self, queryset, aliases=None):
+        self.queryset = queryset
+        self.aliases = aliases or databases()
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or ['pk'])
+        ordering.append('-pk' if ordering[0].startswith('-') else 'pk') # the runs are merged on the whole key, ties included
+        self.ordering = ordering
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.descending = [field.startswith('-') for field in ordering]
+        self.model = queryset.model
+
+    def filter(self, *args, **kwargs): # the position of a cursor (CursorPagination, e.g. the tag pages)
+        return ShardedQuerySet(self.queryset.filter(*args, **kwargs), self.aliases)
+
+    def order_by(self, *fields):
+        return ShardedQuerySet(self.queryset.order_by(*fields), self.aliases)
+
+    def count(self):
+        return sum(self.queryset.using(alias).count() for alias in self.aliases)
+
+    def __len__(self):
+        return self.count()
+
+    def _keys(self, alias, stop):
+        keys = self.queryset.using(alias).order_by(*self.ordering).values_list(*self.fields)
+        return [(*key, alias) for key in (keys[:stop] if stop is not None else keys)]
+
+    def _merged(self, runs):
+        if len(set(self.descending)) == 1: # one direction: every run is sorted by the whole key
+            return heapq.merge(*runs, key=lambda key: key[:-1], reverse=self.descending[0])
+        rows = [key for run in runs for key in run] # e.g. ?ordering=updated,-created: stable sorts, last key first
+        for index in reversed(range(len(self.fields))):
+            rows.sort(key=lambda key: key[index], reverse=self.descending[index])
+        return iter(rows)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step is not None:
+            raise TypeError('ShardedQuerySet only supports slices, e.g. queryset[20:40]')
+        start, stop = item.start or 0, item.stop
+        page = list(islice(self._merged([self._keys(alias, stop) for alias in self.aliases]), start, stop))
+        pks = {}
+        for key in page:
+            pks.setdefault(key[-1], []).append(key[-2])
+        rows = {} # by (alias, pk): the ids of the link tables are per shard
+        for alias, ids in pks.items():
+            rows.update(((alias, _row_pk(row)), row) for row in self.queryset.using(alias).filter(pk__in=ids))
+        return [rows[key[-1], key[-2]] for key in page if (key[-1], key[-2]) in rows] # a row deleted between the two reads is skipped
+
+    def __iter__(self):
+        return iter(self[0:None])
@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+from core.shard.router import db_for_public_id
+
+
+class ShardedSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField on the public_id of a post or comment, looked up on the shard that holds it."""
+
+    def to_internal_value(self, data):
+        self.using = db_for_public_id(self.queryset.model, data)
+        return super().to_internal_value(data)
+
+    def get_queryset(self):
+        return super().get_queryset().using(getattr(self, 'using', None))
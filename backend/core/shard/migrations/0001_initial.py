@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core_user', '0010_user_user_live_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorShard',
+            fields=[
+                ('author', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('alias', models.CharField(max_length=64)),
+                ('moving', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('next', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ShardPoint',
+            fields=[
+                ('token', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('alias', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ObjectShard',
+            fields=[
+                ('public_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('author', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class ShardPoint(models.Model):
+    """A point of the consistent-hash ring: an author whose hash falls between the previous point and this
+    one is placed on `alias`. Each database of the SHARDS setting has VNODES points, see core/shard/router.py."""
+    token = models.BigIntegerField(primary_key=True)
+    alias = models.CharField(max_length=64)
+
+
+class AuthorShard(models.Model):
+    """Where the posts of an author are, set when the author is first placed and changed only by
+    `manage.py reshard`, so a change of the ring never moves rows by itself."""
+    author = models.OneToOneField("core_user.User", on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True, related_name="+")
+    alias = models.CharField(max_length=64)
+    moving = models.BooleanField(default=False) #writes to the author's rows wait while reshard copies them
+
+
+class ObjectShard(models.Model):
+    """public_id of a post or a comment -> the author whose shard holds it (the author of the post, for a
+    comment). Through the author, not the database: moving an author doesn't rewrite these rows."""
+    public_id = models.UUIDField(primary_key=True)
+    author = models.ForeignKey("core_user.User", on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+
+
+class IdSequence(models.Model):
+    """The next primary key of a sharded model, handed out in blocks: the ids of the posts and comments are
+    unique across the shards, so a row keeps its id when it moves."""
+    name = models.CharField(max_length=64, primary_key=True)
+    next = models.BigIntegerField()
@@ -0,0 +1,106 @@
+"""Moves the posts of one author, with their comments, likes, view sketches, edit history, tag and mention links
+and notifications, to another shard. Used by `manage.py reshard`.
+
+The author is flagged `moving` first: from then on ShardRouter answers the writes to these rows, new or
+existing, with a 503 (ShardMoving), reads carry on from the source. The writes that bypass the router wait too:
+the views flush and the notification delivery keep the counts and events of these posts for later, the archive
+skips them, marking the notifications as read answers a 503.
+
+The rows are copied in chunks of posts, one transaction on the target per chunk, keeping their ids; a copy that
+failed halfway is picked up by the next run, rows already copied are skipped. Then AuthorShard points to the
+target, which serves the reads and writes, and the source rows are deleted, children first, one transaction
+per chunk like the reaper.
+
+The notifications of the posts go with them, their author is the recipient: the groups with their actors, the
+queued events and the author's UnreadCounter. The tags of the links are copied to the target first (replicate_tags)."""
+
+from django.db import transaction
+
+from core.comment.models import Comment
+from core.notification.models import Notification, NotificationActor, NotificationEvent, UnreadCounter
+from core.post.models import Post, PostSketch
+from core.revision.models import CommentRevision, PostRevision
+from core.shard.models import AuthorShard
+from core.shard.router import replicate_tags
+from core.tag.models import CommentMention, CommentTag, PostMention, PostTag, Tag
+from core.user.models import User
+
+Like = User.posts_liked.through
+
+CHUNK_SIZE = 500
+
+
+def _chunks(pks, size):
+    for start in range(0, len(pks), size):
+        yield pks[start:start + size]
+
+
+def _copy(pks, source, target):
+    posts = list(Post._base_manager.using(source).filter(pk__in=pks))
+    comments = list(Comment._base_manager.using(source).filter(post_id__in=pks))
+    sketches = list(PostSketch.objects.using(source).filter(post_id__in=pks))
+    post_revisions = list(PostRevision.objects.using(source).filter(post_id__in=pks))
+    comment_revisions = list(CommentRevision.objects.using(source).filter(comment__post_id__in=pks))
+    for revision in (*post_revisions, *comment_revisions):
+        revision.pk = None # new ids on the target like the likes, the API finds a revision by its number
+    likes = [ # new ids on the target, nothing refers to the id of a like
+        Like(user_id=user_id, post_id=post_id)
+        for user_id, post_id in Like.objects.using(source).filter(post_id__in=pks).values_list('user_id', 'post_id')
+    ]
+    links = { # new ids too, the unique (tag or user, post or comment) skips the ones already copied
+        PostTag: list(PostTag.objects.using(source).filter(post_id__in=pks)),
+        PostMention: list(PostMention.objects.using(source).filter(post_id__in=pks)),
+        CommentTag: list(CommentTag.objects.using(source).filter(comment__post_id__in=pks)),
+        CommentMention: list(CommentMention.objects.using(source).filter(comment__post_id__in=pks)),
+    }
+    notifications = list(Notification._base_manager.using(source).filter(post_id__in=pks)) # skipped by public_id
+    events = list(NotificationEvent.objects.using(source).filter(post_id__in=pks))
+    actors = list( # by the public_id of their group, which gets a new id on the target
+        NotificationActor.objects.using(source).filter(notification__post_id__in=pks).values_list('notification__public_id', 'actor_id')
+    )
+    for row in (*notifications, *events, *(link for rows in links.values() for link in rows)):
+        row.pk = None
+    tags = Tag.objects.filter(pk__in={link.tag_id for link in (*links[PostTag], *links[CommentTag])})
+    with transaction.atomic(using=target):
+        replicate_tags(list(tags), [target])
+        NotificationEvent.objects.using(target).filter(post_id__in=pks).delete() # a copy that failed halfway
+        for model, rows in (
+            (Post, posts), (Comment, comments), (PostSketch, sketches), (Like, likes),
+            (PostRevision, post_revisions), (CommentRevision, comment_revisions), *links.items(),
+            (Notification, notifications), (NotificationEvent, events),
+        ):
+            model._base_manager.using(target).bulk_create(rows, ignore_conflicts=True)
+        groups = dict(Notification._base_manager.using(target).filter(public_id__in={row[0] for row in actors}).values_list('public_id', 'pk'))
+        NotificationActor.objects.using(target).bulk_create(
+            [NotificationActor(notification_id=groups[public_id], actor_id=actor_id) for public_id, actor_id in actors],
+            ignore_conflicts=True,
+        )
+    return len(posts), len(comments), len(likes)
+
+
+def _delete(pks, source):
+    with transaction.atomic(using=source):
+        Like.objects.using(source).filter(post_id__in=pks).delete()
+        PostSketch.objects.using(source).filter(post_id__in=pks).delete()
+        Comment._base_manager.using(source).filter(post_id__in=pks).delete()
+        Post._base_manager.using(source).filter(pk__in=pks).delete()
+
+
+def move_author(author_id, source, target, chunk_size=CHUNK_SIZE):
+    """Move the rows of `author_id` from `source` to `target`, returns the (posts, comments, likes) moved."""
+    AuthorShard.objects.filter(author_id=author_id).update(moving=True)
+    moved = [0, 0, 0]
+    try:
+        pks = list(Post._base_manager.using(source).filter(author_id=author_id).order_by('pk').values_list('pk', flat=True))
+        for chunk in _chunks(pks, chunk_size):
+            moved = [total + count for total, count in zip(moved, _copy(chunk, source, target))]
+        for counter in UnreadCounter.objects.using(source).filter(user_id=author_id):
+            UnreadCounter.objects.using(target).bulk_create([counter], update_conflicts=True, unique_fields=['user'], update_fields=['unread'])
+        AuthorShard.objects.filter(author_id=author_id).update(alias=target, moving=False)
+    except Exception:
+        AuthorShard.objects.filter(author_id=author_id).update(moving=False) #still on the source
+        raise
+    for chunk in _chunks(pks, chunk_size):
+        _delete(chunk, source) # the links and notifications go with their posts
+    UnreadCounter.objects.using(source).filter(user_id=author_id).delete()
+    return tuple(moved)
@@ -0,0 +1,344 @@
+"""Posts, comments and likes spread over several databases by author.
+
+Off by default: with the SHARDS setting empty, everything stays in `default` and nothing here runs. With
+SHARDS set to database aliases ('default' may be one of them):
+
+  * an author is placed on a shard by a consistent-hash ring (ShardPoint, VNODES points per shard): adding a
+    shard only moves the authors whose hash falls in the new shard's arcs, about 1/N of them. The placement
+    is stored in AuthorShard when the author is first placed, only `manage.py reshard` changes it;
+  * the posts of an author are on their shard, the comments and likes of a post with the post, so one post
+    with its comments and likes is read from one database. ShardRouter routes the writes from the instance
+    being saved, get_object_by_public_id() reads the shard from ObjectShard (public_id -> author);
+  * the users are on `default` and copied to every shard (replicate_user), the posts and comments join them,
+    and so are the tags (replicate_tags) for the tag links;
+  * the tag and mention links, the notification events, and the notification groups and unread counters of
+    an author (the recipient of the notifications of their posts) live with the posts;
+  * the primary keys of posts and comments come from IdSequence blocks: unique across the shards, a row
+    keeps its id when it moves, and everything keyed by a post id (fingerprints, trending, the views) stays
+    right;
+  * the post list is a k-way merge of the shards, see core/shard/feed.py.
+
+The batch jobs (rollup, archive, reap, notification delivery, the views flush, backfills) loop over databases().
+ObjectShard is written on `default` once the post or comment is committed on its shard; a post whose mapping
+is missing (the process stopped in between) is found by looking at every shard, and recorded then."""
+
+import copy
+import hashlib
+import threading
+import time
+from bisect import bisect
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Max
+from rest_framework.exceptions import APIException
+
+from core.shard.models import AuthorShard, IdSequence, ObjectShard, ShardPoint
+
+VNODES = 64 # points per shard on the ring
+RING_SECONDS = 60 # a process reloads the ring this often, reshard changes it
+ID_BLOCK = 100 # ids reserved per IdSequence update
+REPLICATED_FIELDS_SKIPPED = {'last_login'} # a login doesn't need a copy on every shard
+
+
+class ShardMoving(APIException):
+    status_code = 503
+    default_detail = 'These posts are being moved to another database, try again in a moment.'
+    default_code = 'shard_moving'
+
+
+def enabled():
+    return bool(getattr(settings, 'SHARDS', ()))
+
+
+def databases():
+    """The aliases that hold posts, comments and likes."""
+    return list(getattr(settings, 'SHARDS', ())) or [DEFAULT_DB_ALIAS]
+
+
+def _sharded():
+    from core.comment.models import Comment
+    from core.notification.models import Notification, NotificationActor, NotificationEvent
+    from core.post.models import Post, PostSketch
+    from core.revision.models import CommentRevision, PostRevision
+    from core.tag.models import CommentMention, CommentTag, PostMention, PostTag
+    from core.user.models import User
+    return (
+        Post, Comment, PostSketch, User.posts_liked.through, PostRevision, CommentRevision,
+        PostTag, CommentTag, PostMention, CommentMention, NotificationEvent, Notification, NotificationActor,
+    )
+
+
+def _recorded():
+    # the models with an ObjectShard row per public_id
+    from core.comment.models import Comment
+    from core.post.models import Post
+    return (Post, Comment)
+
+
+def is_sharded(model):
+    return model in _sharded()
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big') >> 1 # fits a bigint
+
+
+class Ring:
+    def __init__(self, points):
+        points = sorted(points)
+        self.tokens = [token for token, _ in points]
+        self.aliases = [alias for _, alias in points]
+
+    def lookup(self, author_id):
+        return self.aliases[bisect(self.tokens, _hash(author_id)) % len(self.tokens)]
+
+
+_ring = {'ring': None, 'loaded': 0.0}
+
+
+def points(aliases):
+    """{token: alias} of the ring over `aliases`."""
+    return {_hash(f'{alias}#{index}'): alias for alias in aliases for index in range(VNODES)}
+
+
+def sync_ring():
+    """Make the ring match the SHARDS setting, returns it."""
+    wanted = points(databases())
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        ShardPoint.objects.exclude(token__in=list(wanted)).delete()
+        ShardPoint.objects.bulk_create([ShardPoint(token=token, alias=alias) for token, alias in wanted.items()], ignore_conflicts=True)
+    _ring.update(ring=Ring(wanted.items()), loaded=time.monotonic())
+    return _ring['ring']
+
+
+def ring():
+    if _ring['ring'] is None or time.monotonic() - _ring['loaded'] > RING_SECONDS:
+        points = list(ShardPoint.objects.values_list('token', 'alias'))
+        if not points:
+            return sync_ring()
+        _ring.update(ring=Ring(points), loaded=time.monotonic())
+    return _ring['ring']
+
+
+def db_for_author(author_id):
+    """The shard of an author, placed on the ring the first time. Raises ShardMoving while reshard moves it."""
+    row = AuthorShard.objects.filter(author_id=author_id).values_list('alias', 'moving').first()
+    if row is None:
+        try:
+            AuthorShard.objects.create(author_id=author_id, alias=ring().lookup(author_id))
+        except IntegrityError: # placed meanwhile by another request
+            pass
+        row = AuthorShard.objects.filter(author_id=author_id).values_list('alias', 'moving').get()
+    if row[1]:
+        raise ShardMoving()
+    return row[0]
+
+
+def moving_authors():
+    """The ids of the authors reshard is moving, their rows must not change until AuthorShard points to the
+    target (core/shard/mover.py deletes the source rows after copying them)."""
+    if not enabled():
+        return set()
+    return set(AuthorShard.objects.filter(moving=True).values_list('author_id', flat=True))
+
+
+def check_moving(author_id):
+    """Raise ShardMoving when the rows of `author_id` are being moved, before a write to them."""
+    if enabled() and author_id is not None and AuthorShard.objects.filter(author_id=author_id, moving=True).exists():
+        raise ShardMoving()
+
+
+def db_of_author(author_id):
+    """The shard of an author already placed, `default` when sharding is off or they never posted. Their
+    notifications and unread counter are there."""
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    return AuthorShard.objects.filter(author_id=author_id).values_list('alias', flat=True).first() or DEFAULT_DB_ALIAS
+
+
+def _find(model, public_id):
+    """(author whose shard holds it, alias) of the post or comment `public_id` looked up on every shard."""
+    author = 'author_id' if model._meta.model_name == 'post' else 'post__author_id'
+    for alias in databases():
+        author_id = model._base_manager.using(alias).filter(public_id=public_id).values_list(author, flat=True).first()
+        if author_id is not None:
+            return author_id, alias
+    return None, None
+
+
+def db_for_public_id(model, public_id):
+    """The shard holding the post or comment `public_id`, None when sharding is off or the id is unknown."""
+    if not enabled() or model not in _recorded():
+        return None
+    try:
+        author_id = ObjectShard.objects.filter(public_id=public_id).values_list('author_id', flat=True).first()
+        if author_id is None: # unknown, or the process stopped before recording it
+            author_id, alias = _find(model, public_id)
+            if author_id is not None:
+                ObjectShard.objects.bulk_create([ObjectShard(public_id=public_id, author_id=author_id)], ignore_conflicts=True)
+            return alias
+    except (ValueError, ValidationError): # not a UUID, the caller's own query fails the same way
+        return None
+    return AuthorShard.objects.filter(author_id=author_id).values_list('alias', flat=True).first()
+
+
+def _post_author(post_id):
+    from core.post.models import Post
+    for alias in databases():
+        author_id = Post._base_manager.using(alias).filter(pk=post_id).values_list('author_id', flat=True).first()
+        if author_id is not None:
+            return author_id
+    return None
+
+
+def _comment_post_author(comment_id):
+    from core.comment.models import Comment
+    for alias in databases():
+        author_id = Comment._base_manager.using(alias).filter(pk=comment_id).values_list('post__author_id', flat=True).first()
+        if author_id is not None:
+            return author_id
+    return None
+
+
+def shard_author(instance):
+    """The author whose shard holds `instance`, a post, comment, post sketch, like, link or notification; None
+    for anything else. The revisions are written through post.revisions and comment.revisions, routed from the
+    post or comment."""
+    from core.comment.models import Comment
+    from core.post.models import Post
+    if isinstance(instance, Post):
+        return instance.author_id
+    if isinstance(instance, Comment) and Comment.post.is_cached(instance):
+        return instance.post.author_id
+    if not is_sharded(type(instance)):
+        return None
+    post_id = getattr(instance, 'post_id', None) # a comment without its post, a sketch, a like, a post link
+    if post_id is not None:
+        return _post_author(post_id)
+    comment_id = getattr(instance, 'comment_id', None) # a comment link
+    return _comment_post_author(comment_id) if comment_id is not None else None
+
+
+class ShardRouter:
+    """Routes the writes of the sharded models, see the module docstring. The reads follow the instance they
+    start from (Django's default) or an explicit .using(): the router never guesses a shard for a query."""
+
+    def db_for_read(self, model, **hints):
+        return None
+
+    def db_for_write(self, model, **hints):
+        if not enabled():
+            return None
+        if not is_sharded(model):
+            return DEFAULT_DB_ALIAS if model._meta.label_lower == 'core_user.user' else None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if type(instance) is model and not instance._state.adding:
+            check_moving(shard_author(instance)) # an update or delete would be lost with the source rows
+            return instance._state.db # an existing row stays where it is
+        author_id = shard_author(instance)
+        return db_for_author(author_id) if author_id is not None else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if enabled() and (is_sharded(type(obj1)) or is_sharded(type(obj2))):
+            return True # a post on a shard and its author on default, the user copies share the ids
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None # every database gets every table, the shards only use some
+
+
+class ShardedManagerMixin:
+    """Manager.create() saves on the database of the queryset, `default`; the instance is saved without one
+    instead, so ShardRouter picks the shard."""
+
+    def create(self, **kwargs):
+        if not enabled() or self._db is not None:
+            return super().create(**kwargs)
+        instance = self.model(**kwargs)
+        instance.save(force_insert=True)
+        return instance
+
+
+_blocks = {} # model label -> [next id, end of the reserved block]
+_blocks_lock = threading.Lock()
+
+
+def _reserve(model, count=ID_BLOCK):
+    name = model._meta.label_lower
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        sequence = IdSequence.objects.select_for_update().filter(name=name).first()
+        if sequence is None: # the first block starts after the ids in use
+            highest = max((model._base_manager.using(alias).aggregate(highest=Max('pk'))['highest'] or 0) for alias in databases())
+            sequence = IdSequence.objects.create(name=name, next=highest + 1)
+        start = sequence.next
+        IdSequence.objects.filter(name=name).update(next=start + count)
+    return [start, start + count]
+
+
+def next_id(model):
+    with _blocks_lock:
+        block = _blocks.get(model._meta.label_lower)
+        if block is None or block[0] >= block[1]:
+            block = _blocks[model._meta.label_lower] = _reserve(model)
+        block[0] += 1
+        return block[0] - 1
+
+
+def reserve_ids(model, count):
+    """`count` consecutive ids of `model` taken from IdSequence at once, for bulk inserts (the seeder)."""
+    start, end = _reserve(model, count) if count else (0, 0)
+    return range(start, end)
+
+
+def assign_id(sender, instance, raw=False, **kwargs):
+    # pre_save of Post and Comment
+    if enabled() and not raw and instance._state.adding and instance.pk is None:
+        instance.pk = next_id(sender)
+
+
+def record_object(sender, instance, created=False, raw=False, using=DEFAULT_DB_ALIAS, **kwargs):
+    # post_save of Post and Comment: the mapping is written once the row is committed on its shard, a
+    # rollback leaves none behind
+    if enabled() and created and not raw:
+        row = ObjectShard(public_id=instance.public_id, author_id=shard_author(instance))
+        transaction.on_commit(lambda: ObjectShard.objects.bulk_create([row], ignore_conflicts=True), using=using)
+
+
+def replicate_users(users, aliases=None):
+    """Copy `users` to the shards, inserted or updated by primary key."""
+    from core.user.models import User
+    fields = [f.attname for f in User._meta.concrete_fields if not f.primary_key]
+    for alias in aliases or databases():
+        if alias != DEFAULT_DB_ALIAS:
+            copies = [copy.copy(user) for user in users] # bulk_create sets _state.db of what it saves
+            User._base_manager.using(alias).bulk_create(copies, update_conflicts=True, unique_fields=['id'], update_fields=fields)
+
+
+def replicate_tags(tags, aliases=None):
+    """Copy the Tag rows `tags` (on `default`) to the shards of `aliases`, with their ids; tags never change."""
+    from core.tag.models import Tag
+    for alias in aliases or databases():
+        if alias != DEFAULT_DB_ALIAS:
+            Tag.objects.using(alias).bulk_create([Tag(pk=tag.pk, name=tag.name) for tag in tags], ignore_conflicts=True)
+
+
+def replicate_user(sender, instance, using=DEFAULT_DB_ALIAS, raw=False, update_fields=None, **kwargs):
+    # post_save of User
+    if not enabled() or raw or using != DEFAULT_DB_ALIAS:
+        return
+    if update_fields and set(update_fields) <= REPLICATED_FIELDS_SKIPPED:
+        return
+    replicate_users([instance])
+
+
+def unreplicate_user(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    # post_delete of User, the copies go too, with their posts like on `default`
+    if not enabled() or using != DEFAULT_DB_ALIAS:
+        return
+    for alias in databases():
+        if alias != DEFAULT_DB_ALIAS:
+            sender._base_manager.using(alias).filter(pk=instance.pk).delete()
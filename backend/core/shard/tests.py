@@ -0,0 +1,230 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.analytics.models import DailyStats, Watermark
+from core.analytics.rollup import rollup
+from core.archive.models import ArchivedPost
+from core.comment.models import Comment
+from core.fixtures.shard import shards
+from core.notification.delivery import deliver
+from core.notification.models import Notification, NotificationActor
+from core.post import impressions
+from core.post.models import Post
+from core.shard import router
+from core.shard.feed import ShardedQuerySet
+from core.shard.models import AuthorShard, ObjectShard
+from core.tag.models import PostMention, PostTag
+from core.user.models import User
+
+
+def _author(aliases, alias, name):
+    # a new user whose id the ring over `aliases` places on `alias`
+    ring = router.Ring(router.points(aliases).items())
+    while True:
+        user = User.objects.create_user(username=name, email=f"{name}@example.com", password="test_password", first_name=name, last_name="Test")
+        if ring.lookup(user.pk) == alias:
+            return user
+        user.delete()
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def test_ring_moves_only_the_authors_of_a_new_shard():
+    before = router.Ring(router.points(["a", "b"]).items())
+    after = router.Ring(router.points(["a", "b", "c"]).items())
+
+    moved = [author for author in range(3000) if before.lookup(author) != after.lookup(author)]
+
+    assert all(after.lookup(author) == "c" for author in moved)
+    assert 0.2 < len(moved) / 3000 < 0.45 # about a third
+
+
+@pytest.mark.django_db
+def test_posts_comments_and_likes_live_on_the_author_shard(shards):
+    alice = _author(shards, "shard_a", "alice")
+    bob = _author(shards, "shard_b", "bob")
+
+    post_a = _client(alice).post("/api/post/", {"author": alice.public_id.hex, "body": "On shard a"}).json()
+    post_b = _client(bob).post("/api/post/", {"author": bob.public_id.hex, "body": "On shard b"}).json()
+    comment = _client(alice).post(f"/api/post/{post_b['id']}/comment/", {"author": alice.public_id.hex, "post": post_b["id"], "body": "Hello"})
+    like = _client(alice).post(f"/api/post/{post_b['id']}/like/")
+
+    assert comment.status_code == 201 and like.status_code == 200
+    assert list(Post._base_manager.using("shard_a").values_list("public_id", "body")) == [(uuid.UUID(post_a["id"]), "On shard a")]
+    assert list(Post._base_manager.using("shard_b").values_list("body", flat=True)) == ["On shard b"]
+    assert not Post._base_manager.exists() # nothing on default
+    assert list(Comment._base_manager.using("shard_b").values_list("body", flat=True)) == ["Hello"]
+    assert User.posts_liked.through.objects.using("shard_b").filter(user_id=alice.pk).exists()
+
+    detail = _client(alice).get(f"/api/post/{post_b['id']}/").json()
+    assert (detail["body"], detail["liked"], detail["likes_count"]) == ("On shard b", True, 1)
+    assert _client(alice).get(f"/api/post/{post_b['id']}/comment/").json()["count"] == 1
+    feed = _client(alice).get("/api/post/").json()
+    assert feed["count"] == 2
+    assert [post["body"] for post in feed["results"]] == ["On shard b", "On shard a"] # newest first, across shards
+
+
+@pytest.mark.django_db
+def test_feed_merges_the_shards_in_order(shards):
+    alice = _author(shards, "shard_a", "alice")
+    bob = _author(shards, "shard_b", "bob")
+    for index in range(6):
+        Post.objects.create(author=alice if index % 3 else bob, body=f"Post {index}")
+
+    merged = ShardedQuerySet(Post.objects.order_by("-updated"))
+    expected = sorted(
+        [post for alias in shards for post in Post.objects.using(alias).all()],
+        key=lambda post: (post.updated, post.pk), reverse=True,
+    )
+
+    assert merged.count() == 6
+    assert [post.pk for post in merged[1:4]] == [post.pk for post in expected[1:4]]
+    assert [post.pk for post in merged] == [post.pk for post in expected]
+    assert len({post.pk for post in expected}) == 6 # the ids are unique across the shards
+
+
+@pytest.mark.django_db
+def test_reshard_moves_an_author_with_their_posts(shards, settings):
+    settings.SHARDS = ["shard_a"]
+    alice = _author(["shard_a", "shard_b"], "shard_b", "alice")
+    bob = _author(["shard_a", "shard_b"], "shard_a", "bob")
+    post = _client(alice).post("/api/post/", {"author": alice.public_id.hex, "body": "Moving #go"}).json()
+    post = Post._base_manager.using("shard_a").get(public_id=post["id"])
+    Comment.objects.create(author=bob, post=post, body="Following it")
+    bob.like(post)
+    deliver()
+
+    settings.SHARDS = shards
+    router.replicate_users([alice, bob], ["shard_b"])
+    call_command("reshard")
+
+    assert AuthorShard.objects.get(author=alice).alias == "shard_b"
+    assert not AuthorShard.objects.filter(author=bob).exists() # placed when they first post
+    assert not Post._base_manager.using("shard_a").exists()
+    assert Post._base_manager.using("shard_b").get().pk == post.pk # same id
+    assert Comment._base_manager.using("shard_b").get().body == "Following it"
+    assert User.posts_liked.through.objects.using("shard_b").filter(user_id=bob.pk, post_id=post.pk).exists()
+    detail = _client(bob).get(f"/api/post/{post.public_id.hex}/").json()
+    assert (detail["body"], detail["liked"]) == ("Moving #go", True)
+    assert PostTag.objects.using("shard_b").filter(post_id=post.pk, tag__name="go").exists() # the tag copied too
+    assert Notification.objects.using("shard_b").filter(recipient=alice).count() == 2 # the comment and the like
+    assert not Notification.objects.using("shard_a").exists()
+    assert NotificationActor.objects.using("shard_b").count() == 2 # bob, counted once per group
+    assert _client(alice).get("/api/notification/unread/").json() == {"unread": 2}
+    assert [row["body"] for row in _client(bob).get("/api/tag/go/posts/").json()["results"]] == ["Moving #go"]
+
+
+def test_seeded_graph_is_recorded_then_moved_to_the_shards(shards):
+    from core.benchmark.dataset import seed_dataset
+    from core.shard.models import IdSequence, ObjectShard
+
+    seed_dataset(users=10, posts=30, comments=40, likes=20, seed=1, method="bulk") # COPY would commit on its own connections
+
+    assert ObjectShard.objects.count() == 70
+    assert IdSequence.objects.get(name="core_post.post").next > Post._base_manager.latest("pk").pk
+    assert set(AuthorShard.objects.values_list("alias", flat=True)) == {"default"}
+    assert User._base_manager.using("shard_a").count() == 10 # copied to the shards
+
+    call_command("reshard")
+
+    assert not Post._base_manager.using("default").exists()
+    assert sum(Post._base_manager.using(alias).count() for alias in shards) == 30
+    assert sum(Comment._base_manager.using(alias).count() for alias in shards) == 40
+    assert set(AuthorShard.objects.values_list("alias", flat=True)) <= set(shards)
+
+
+@pytest.mark.django_db
+def test_links_and_notifications_live_with_their_post(shards):
+    alice = _author(shards, "shard_a", "alice")
+    bob = _author(shards, "shard_b", "bob")
+    post = _client(alice).post("/api/post/", {"author": alice.public_id.hex, "body": "Hello #django @bob"}).json()
+    _client(bob).post(f"/api/post/{post['id']}/like/")
+
+    assert PostTag.objects.using("shard_a").count() == 1 and not PostTag.objects.exists()
+    assert PostMention.objects.using("shard_a").filter(user=bob).exists()
+    assert [row["body"] for row in _client(bob).get("/api/tag/django/posts/").json()["results"]] == ["Hello #django @bob"]
+    assert len(_client(bob).get("/api/mention/bob/posts/").json()["results"]) == 1
+
+    assert deliver() == 1
+    assert Notification.objects.using("shard_a").get().actor_id == bob.pk
+    assert _client(alice).get("/api/notification/unread/").json() == {"unread": 1}
+    notification = _client(alice).get("/api/notification/").json()["results"][0]
+    assert _client(alice).post(f"/api/notification/{notification['id']}/read/").json() == {"read": True}
+    assert _client(alice).get("/api/notification/unread/").json() == {"unread": 0}
+
+
+@pytest.mark.django_db
+def test_object_shard_is_recorded_on_commit_and_repaired(shards):
+    alice = _author(shards, "shard_a", "alice")
+    with pytest.raises(RuntimeError), transaction.atomic(using="shard_a"):
+        rolled_back = Post.objects.create(author=alice, body="Rolled back")
+        raise RuntimeError
+    assert not ObjectShard.objects.filter(public_id=rolled_back.public_id).exists()
+
+    post = Post.objects.create(author=alice, body="Kept")
+    ObjectShard.objects.filter(public_id=post.public_id).delete() # the process stopped before recording it
+
+    assert router.db_for_public_id(Post, post.public_id) == "shard_a"
+    assert ObjectShard.objects.filter(public_id=post.public_id, author=alice).exists()
+    assert router.db_for_public_id(Post, "not-a-uuid") is None
+
+
+@pytest.mark.django_db
+def test_batch_jobs_run_on_every_shard(shards):
+    alice = _author(shards, "shard_a", "alice")
+    bob = _author(shards, "shard_b", "bob")
+    old = Post.objects.create(author=alice, body="Old")
+    deleted = Post.objects.create(author=bob, body="Deleted")
+
+    process = impressions.Impressions(flush_seconds=0)
+    process.record([old.pk, deleted.pk], "u1")
+    assert process.flush() == 2
+    assert Post._base_manager.using("shard_b").get(pk=deleted.pk).views == 1
+
+    rollup(now=timezone.now() + timedelta(minutes=5))
+    assert DailyStats.objects.get(day=timezone.localdate()).posts == 2
+    assert {"post@shard_a", "post@shard_b"} <= set(Watermark.objects.values_list("source", flat=True))
+
+    deleted.soft_delete()
+    call_command("reap", pause=0, stdout=open("/dev/null", "w"))
+    assert not Post._base_manager.using("shard_b").exists()
+
+    Post._base_manager.using("shard_a").filter(pk=old.pk).update(created=timezone.now() - timedelta(days=400))
+    call_command("archive", days=180, pause=0, stdout=open("/dev/null", "w"))
+    assert ArchivedPost.objects.using("shard_a").filter(public_id=old.public_id).exists()
+    assert _client(bob).get(f"/api/post/{old.public_id.hex}/").json()["archived"]
+
+
+@pytest.mark.django_db
+def test_writes_wait_while_the_author_is_moving(shards):
+    alice = _author(shards, "shard_a", "alice")
+    bob = _author(shards, "shard_b", "bob")
+    post = Post.objects.create(author=alice, body="Moving")
+    comment = Comment.objects.create(author=bob, post=post, body="On it")
+    bob.like(post)
+    AuthorShard.objects.filter(author=alice).update(moving=True)
+
+    assert _client(alice).delete(f"/api/post/{post.public_id.hex}/").status_code == 503
+    assert _client(bob).delete(f"/api/post/{post.public_id.hex}/comment/{comment.public_id.hex}/").status_code == 503
+    assert _client(alice).post("/api/notification/read_all/").status_code == 503
+    assert not Post._base_manager.using("shard_a").get(pk=post.pk).deleted
+    assert not Comment._base_manager.using("shard_a").get(pk=comment.pk).deleted
+
+    process = impressions.Impressions(flush_seconds=0)
+    process.record([post.pk], "u1")
+    assert process.flush() == 0 and process._views == {post.pk: 1} # kept for a later flush
+    assert deliver() == 0 # the comment and the like wait in the queue
+
+    AuthorShard.objects.filter(author=alice).update(moving=False)
+    assert process.flush() == 1 and deliver() == 2
+    assert _client(alice).delete(f"/api/post/{post.public_id.hex}/").status_code == 204
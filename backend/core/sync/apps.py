@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SyncConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core.sync'
+    label = 'core_sync'
+
+    def ready(self):
+        from core.sync import signals  # noqa: F401 writes the tombstones
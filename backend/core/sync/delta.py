@@ -0,0 +1,191 @@
+"""What changed since a client's last sync, for /api/sync/: the posts and comments created or updated, the
+posts whose likes changed, and the tombstones of what was deleted.
+
+A cursor holds one position per stream:
+
+  * posts and comments: the (updated, id) of the last row sent, the next page is read from the
+    (-updated, -id) index of the rows that are not deleted;
+  * deleted: the (created, public_id) of the last Tombstone sent;
+  * likes: the id of the last like ChangeEvent read on each database (see core/outbox/feed.py), a like has no
+    date of its own. The posts liked or unliked since are sent with their current likes_count and liked.
+
+Every stream only goes up to a horizon, SKEW before the time of the request. `updated` comes from the clock
+of the app server and is set before the row commits: a server whose clock is a bit behind, or a transaction
+still running, can write a row behind a position already sent. Rows younger than SKEW wait for the next sync,
+so the positions only move forward and nothing is passed over. A row changed again comes again, clients
+upsert by id.
+
+The cursor is signed, and carries the time it was made: one older than RETENTION could have missed
+tombstones and like events deleted since, the client starts again from an empty cursor (`reset`)."""
+
+import uuid
+from datetime import datetime, timedelta
+
+from django.core import signing
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from core.abstract.compiled import represent_pks
+from core.comment.models import Comment
+from core.comment.serializers import CommentSerializer
+from core.outbox import feed
+from core.outbox.models import LIKE, ChangeEvent
+from core.post.models import Post
+from core.post.serializers import PostSerializer
+from core.shard.router import databases
+from core.sync.models import Tombstone
+from core.user.models import User
+
+Like = User.posts_liked.through
+
+SKEW = timedelta(seconds=10)
+RETENTION = feed.RETENTION # like events are kept that long, tombstones as well
+PAGE_SIZE = 100 # per stream
+MAX_PAGE_SIZE = 500
+SALT = 'core.sync.cursor'
+
+
+def _key(value):
+    if value is None:
+        return None
+    return [value[0].isoformat(), value[1] if isinstance(value[1], int) else value[1].hex]
+
+
+def _parse_key(value, second):
+    if value is None:
+        return None
+    return datetime.fromisoformat(value[0]), second(value[1])
+
+
+def dumps(cursor):
+    return signing.dumps(
+        {
+            'at': cursor['at'].isoformat(),
+            'posts': _key(cursor['posts']),
+            'comments': _key(cursor['comments']),
+            'deleted': _key(cursor['deleted']),
+            'likes': cursor['likes'],
+        },
+        salt=SALT, compress=True,
+    )
+
+
+def loads(text):
+    """The cursor of `text`, ValueError when it isn't one of ours."""
+    try:
+        data = signing.loads(text, salt=SALT)
+        return {
+            'at': datetime.fromisoformat(data['at']),
+            'posts': _parse_key(data['posts'], int),
+            'comments': _parse_key(data['comments'], int),
+            'deleted': _parse_key(data['deleted'], uuid.UUID),
+            'likes': {alias: int(position) for alias, position in data['likes'].items() if alias in databases()},
+        }
+    except (signing.BadSignature, KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError('Not a sync cursor.')
+
+
+def start(now):
+    """The cursor of a client with nothing: every post and comment, no tombstones and no like changes."""
+    return {
+        'at': now,
+        'posts': None,
+        'comments': None,
+        'deleted': (now - SKEW, uuid.UUID(int=0)),
+        'likes': {alias: ChangeEvent.objects.using(alias).aggregate(last=Max('pk'))['last'] or 0 for alias in databases()},
+    }
+
+
+def _after(queryset, field, since, second):
+    # the rows past the (field, second) position `since`, in that order
+    if since is not None:
+        queryset = queryset.filter(**{f'{field}__gte': since[0]}).exclude(**{field: since[0], f'{second}__lte': since[1]})
+    return queryset.order_by(field, second)
+
+
+def _changed(model, since, horizon, limit):
+    """(updated, pk, alias) of the first `limit` rows of `model` updated after `since`, over the shards."""
+    keys = []
+    for alias in databases():
+        rows = _after(model.objects.using(alias).filter(updated__lt=horizon), 'updated', since, 'pk')
+        keys += [(*key, alias) for key in rows.values_list('updated', 'pk')[:limit]]
+    return sorted(keys)[:limit]
+
+
+def _represent(serializer, model, keys):
+    # grouped by database, each in (updated, id) order
+    pks = {}
+    for _, pk, alias in keys:
+        pks.setdefault(alias, []).append(pk)
+    return [item for alias, ids in pks.items() for item in represent_pks(serializer, model, ids, using=alias)]
+
+
+def _deleted(since, horizon, limit):
+    keys = []
+    for alias in databases():
+        rows = _after(Tombstone.objects.using(alias).filter(created__lt=horizon), 'created', since, 'public_id')
+        keys += rows.values_list('created', 'public_id', 'kind')[:limit]
+    return sorted(keys)[:limit]
+
+
+def _likes(positions, horizon, limit, user):
+    """(items, positions, full) of the posts liked or unliked past `positions`."""
+    positions = dict(positions)
+    items, full = [], False
+    for alias in databases():
+        events = list(
+            ChangeEvent.objects.using(alias).filter(topic=LIKE, pk__gt=positions.get(alias, 0)).order_by('pk')
+            .values_list('pk', 'data', 'created')[:limit]
+        )
+        touched = set()
+        for pk, data, created in events:
+            if created >= horizon: #the events after it could still be committing
+                break
+            touched.add(data['post'])
+            positions[alias] = pk
+        full = full or len(events) == limit and positions[alias] == events[-1][0]
+        if not touched:
+            continue
+        posts = dict(Post.objects.using(alias).filter(public_id__in=touched).values_list('pk', 'public_id'))
+        counts = dict(
+            Like.objects.using(alias).filter(post_id__in=posts).values('post_id').annotate(count=Count('pk'))
+            .values_list('post_id', 'count')
+        )
+        liked = set(user.posts_liked.db_manager(alias).filter(pk__in=posts).values_list('pk', flat=True))
+        items += [
+            {'post': public_id.hex, 'likes_count': counts.get(pk, 0), 'liked': pk in liked}
+            for pk, public_id in posts.items()
+        ]
+    return items, positions, full
+
+
+def sync(since, request, limit=PAGE_SIZE, now=None):
+    """The changes past the cursor `since` (None for a first sync) seen by the user of `request`."""
+    now = now or timezone.now()
+    horizon = now - SKEW
+    cursor = loads(since) if since else None
+    reset = cursor is not None and cursor['at'] < now - RETENTION
+    if cursor is None or reset:
+        cursor = start(now)
+    context = {'request': request}
+
+    posts = _changed(Post, cursor['posts'], horizon, limit)
+    comments = _changed(Comment, cursor['comments'], horizon, limit)
+    deleted = _deleted(cursor['deleted'], horizon, limit)
+    likes, like_positions, likes_full = _likes(cursor['likes'], horizon, limit, request.user)
+    following = {
+        'at': now,
+        'posts': posts[-1][:2] if posts else cursor['posts'],
+        'comments': comments[-1][:2] if comments else cursor['comments'],
+        'deleted': deleted[-1][:2] if deleted else cursor['deleted'],
+        'likes': like_positions,
+    }
+    return {
+        'posts': _represent(PostSerializer(context=context), Post, posts),
+        'comments': _represent(CommentSerializer(context=context), Comment, comments),
+        'likes': likes,
+        'deleted': [{'type': kind, 'id': public_id.hex} for _, public_id, kind in deleted],
+        'cursor': dumps(following),
+        'more': likes_full or limit in (len(posts), len(comments), len(deleted)),
+        'reset': reset,
+    }
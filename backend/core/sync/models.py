@@ -0,0 +1,17 @@
+from django.db import models
+
+POST = 'post'
+COMMENT = 'comment'
+USER = 'user'
+KINDS = [(POST, 'Post'), (COMMENT, 'Comment'), (USER, 'User')]
+
+
+class Tombstone(models.Model):
+    """A soft-deleted post, comment or user, for the clients of /api/sync/ to drop their copy. Outlives the
+    row, which the reaper removes; pruned by the reaper after core/sync/delta.py RETENTION."""
+    kind = models.CharField(max_length=8, choices=KINDS)
+    public_id = models.UUIDField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['created', 'public_id'], name='tombstone_sync_idx')]
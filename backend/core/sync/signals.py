@@ -0,0 +1,21 @@
+"""soft_delete() writes a Tombstone in the transaction of the deletion (see AbstractModel.save_base()), on the
+database of the row. The posts and comments hidden with a deleted user or post get no tombstone of their own:
+clients drop them with the user's or the post's."""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.comment.models import Comment
+from core.post.models import Post
+from core.sync.models import COMMENT, POST, USER, Tombstone
+from core.user.models import User
+
+KINDS = {Post: POST, Comment: COMMENT, User: USER}
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=User)
+def soft_deleted(sender, instance, raw, using, update_fields, **kwargs):
+    if not raw and update_fields and 'deleted' in update_fields and instance.deleted is not None:
+        Tombstone.objects.using(using).create(kind=KINDS[sender], public_id=instance.public_id)
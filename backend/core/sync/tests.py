@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.comment.models import Comment
+from core.fixtures.post import post
+from core.fixtures.user import user
+from core.post.models import Post
+from core.sync import delta
+from core.sync.models import Tombstone
+
+
+@pytest.fixture
+def no_skew(monkeypatch):
+    monkeypatch.setattr(delta, "SKEW", timedelta(0))
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.mark.django_db
+def test_sync_sends_only_what_changed(user, post, no_skew):
+    client = _client(user)
+    other = Post.objects.create(author=user, body="Other")
+    comment = Comment.objects.create(author=user, post=post, body="First")
+
+    first = client.get("/api/sync/").json()
+    assert {item["id"] for item in first["posts"]} == {post.public_id.hex, other.public_id.hex}
+    assert [item["id"] for item in first["comments"]] == [comment.public_id.hex]
+    assert (first["likes"], first["deleted"], first["more"], first["reset"]) == ([], [], False, False)
+
+    nothing = client.get("/api/sync/", {"since": first["cursor"]}).json()
+    assert (nothing["posts"], nothing["comments"], nothing["likes"], nothing["deleted"]) == ([], [], [], [])
+
+    post.body = "Edited"
+    post.save()
+    user.like(other)
+    comment.soft_delete()
+    changes = client.get("/api/sync/", {"since": nothing["cursor"]}).json()
+    assert [item["body"] for item in changes["posts"]] == ["Edited"]
+    assert changes["comments"] == []
+    assert changes["likes"] == [{"post": other.public_id.hex, "likes_count": 1, "liked": True}]
+    assert changes["deleted"] == [{"type": "comment", "id": comment.public_id.hex}]
+
+
+@pytest.mark.django_db
+def test_sync_pages_through_rows_updated_at_the_same_time(user, no_skew):
+    posts = [Post.objects.create(author=user, body=f"Post {i}") for i in range(5)]
+    Post.objects.update(updated=timezone.now() - timedelta(minutes=1)) # ties everywhere
+    client = _client(user)
+
+    seen, cursor, more = [], None, True
+    while more:
+        page = client.get("/api/sync/", {"limit": 2, **({"since": cursor} if cursor else {})}).json()
+        seen += [item["id"] for item in page["posts"]]
+        cursor, more = page["cursor"], page["more"]
+
+    assert sorted(seen) == sorted(post.public_id.hex for post in posts)
+    assert len(seen) == 5
+
+
+@pytest.mark.django_db
+def test_recent_rows_wait_for_the_skew_window(user, post):
+    client = _client(user)
+    page = client.get("/api/sync/").json()
+    assert page["posts"] == [] # could still have a row committing behind it
+
+    Post.objects.update(updated=timezone.now() - delta.SKEW - timedelta(seconds=1)) # the window has passed
+    page = client.get("/api/sync/", {"since": page["cursor"]}).json()
+    assert [item["id"] for item in page["posts"]] == [post.public_id.hex]
+
+
+@pytest.mark.django_db
+def test_bad_and_stale_cursors(user, post, no_skew):
+    client = _client(user)
+    assert client.get("/api/sync/", {"since": "forged"}).status_code == 400
+    assert APIClient().get("/api/sync/").status_code == 401
+
+    old = delta.start(timezone.now() - delta.RETENTION - timedelta(days=1))
+    page = client.get("/api/sync/", {"since": delta.dumps(old)}).json()
+    assert page["reset"] is True
+    assert [item["id"] for item in page["posts"]] == [post.public_id.hex] # everything again
+
+
+@pytest.mark.django_db
+def test_soft_deleted_users_and_posts_leave_tombstones(user, post):
+    post.soft_delete()
+    user.soft_delete()
+
+    assert list(Tombstone.objects.order_by("pk").values_list("kind", "public_id")) == [
+        ("post", post.public_id), ("user", user.public_id),
+    ]
@@ -0,0 +1,26 @@
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.auth.throttling import ThrottleFirstMixin
+from core.sync.delta import MAX_PAGE_SIZE, PAGE_SIZE, sync
+
+
+class SyncViewSet(ThrottleFirstMixin, viewsets.ViewSet):
+    """/api/sync/?since=<cursor> for the offline clients: only what changed since their last sync, see
+    core/sync/delta.py. They call it again with the returned cursor while `more` is true."""
+    permission_classes = (IsAuthenticated,)
+    http_method_names = ['get']
+
+    def list(self, request, *args, **kwargs):
+        try:
+            limit = min(int(request.query_params.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            raise ValidationError({'limit': 'An integer is required.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'At least 1.'})
+        try:
+            return Response(sync(request.query_params.get('since'), request, limit))
+        except ValueError as error:
+            raise ValidationError({'since': str(error)})
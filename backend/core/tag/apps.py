@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class TagConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core.tag'
+    label = 'core_tag'
@@ -0,0 +1,77 @@
+"""Writes the PostTag/CommentTag and PostMention/CommentMention rows of posts and comments, on the database of
+the post or comment (its shard, see core/shard/router.py). The Tag rows are on `default`, copied to the shard."""
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core.comment.models import Comment
+from core.post.models import Post
+from core.shard.router import replicate_tags
+from core.tag.models import CommentMention, CommentTag, PostMention, PostTag, Tag
+from core.tag.parser import hashtags, mentions
+from core.trending.engine import record_tags
+from core.user.models import User
+
+LINKS = { # model -> (tag rows, mention rows, their foreign key to the model)
+    Post: (PostTag, PostMention, "post"),
+    Comment: (CommentTag, CommentMention, "comment"),
+}
+
+
+def link(instances, trend=True):
+    """Add the tag and mention rows of `instances` (posts or comments, all of the same model) with a fixed
+    number of queries, whatever the number of instances. Rows that already exist are left alone.
+
+    With `trend`, the tags also count as used for the trending tags (core/trending/engine.py)."""
+    by_database = {}
+    for instance in instances:
+        by_database.setdefault(instance._state.db or DEFAULT_DB_ALIAS, []).append(instance)
+    for using, group in by_database.items():
+        _link(group, trend, using)
+
+
+def _link(instances, trend, using):
+    tag_model, mention_model, field = LINKS[type(instances[0])]
+    parsed = [(instance, hashtags(instance.body), mentions(instance.body)) for instance in instances]
+
+    with transaction.atomic(), transaction.atomic(using=using): #the new tags and the links to them, or none of them
+        names = {name for _, names, _ in parsed for name in names}
+        tags = {}
+        if names:
+            Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+            found = list(Tag.objects.filter(name__in=names))
+            replicate_tags(found, [using])
+            tags = {tag.name: tag.pk for tag in found}
+
+        usernames = {username for _, _, usernames in parsed for username in usernames}
+        users = dict(User.objects.filter(username__in=usernames).values_list("username", "pk")) if usernames else {}
+
+        tag_model.objects.using(using).bulk_create(
+            [
+                tag_model(tag_id=tags[name], created=instance.created, **{field: instance})
+                for instance, names, _ in parsed
+                for name in names
+            ],
+            ignore_conflicts=True,
+        )
+        if trend:
+            for instance, names, _ in parsed:
+                record_tags([tags[name] for name in names], instance.created)
+        mention_model.objects.using(using).bulk_create(
+            [
+                mention_model(user_id=users[username], created=instance.created, **{field: instance})
+                for instance, _, usernames in parsed
+                for username in usernames
+                if username in users
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def relink(instance):
+    """Replace the tag and mention rows of `instance` after its body changed."""
+    tag_model, mention_model, field = LINKS[type(instance)]
+    using = instance._state.db or DEFAULT_DB_ALIAS
+    with transaction.atomic(using=using):
+        tag_model.objects.using(using).filter(**{field: instance}).delete()
+        mention_model.objects.using(using).filter(**{field: instance}).delete()
+        link([instance], trend=False) #an edit is not a new use of its tags
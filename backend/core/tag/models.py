@@ -0,0 +1,54 @@
+"""Hashtags and mentions found in post and comment bodies, one row per (tag or mentioned user, post or comment).
+
+The rows keep a copy of the post/comment `created` so that /api/tag/{name}/posts/ and the mention endpoints
+read one index range, (tag, -created, -id) or (user, -created, -id), instead of scanning bodies with LIKE. They are
+written by core/tag/links.py when a serializer saves a post or a comment, and by manage.py backfill_tags."""
+
+from django.db import models
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=100, unique=True) #normalized, see core/tag/parser.py
+
+    def __str__(self):
+        return f"#{self.name}"
+
+
+class PostTag(models.Model):
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="+")
+    post = models.ForeignKey("core_post.Post", on_delete=models.CASCADE, related_name="+")
+    created = models.DateTimeField() #the post's
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["tag", "post"], name="unique_post_tag")]
+        indexes = [models.Index(fields=["tag", "-created", "-id"], name="post_tag_created_idx")]
+
+
+class CommentTag(models.Model):
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="+")
+    comment = models.ForeignKey("core_comment.Comment", on_delete=models.CASCADE, related_name="+")
+    created = models.DateTimeField() #the comment's
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["tag", "comment"], name="unique_comment_tag")]
+        indexes = [models.Index(fields=["tag", "-created", "-id"], name="comment_tag_created_idx")]
+
+
+class PostMention(models.Model):
+    user = models.ForeignKey("core_user.User", on_delete=models.CASCADE, related_name="+")
+    post = models.ForeignKey("core_post.Post", on_delete=models.CASCADE, related_name="+")
+    created = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "post"], name="unique_post_mention")]
+        indexes = [models.Index(fields=["user", "-created", "-id"], name="post_mention_created_idx")]
+
+
+class CommentMention(models.Model):
+    user = models.ForeignKey("core_user.User", on_delete=models.CASCADE, related_name="+")
+    comment = models.ForeignKey("core_comment.Comment", on_delete=models.CASCADE, related_name="+")
+    created = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "comment"], name="unique_comment_mention")]
+        indexes = [models.Index(fields=["user", "-created", "-id"], name="comment_mention_created_idx")]
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class LinkCursorPagination(CursorPagination):
+    """Newest first over the (tag or user, -created, -id) index of the link tables. The cursor is a position in
+    that index, so deep pages cost the same as the first one, unlike ?offset=."""
+    ordering = ('-created', '-pk')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,26 @@
+"""#hashtag and @mention extraction. A tag or a mention starts after a character that can't be part of a word
+(so emails and URLs fragments like a@b or page#anchor are not picked up) and is made of word characters.
+
+Tags are casefolded, which can make them longer ("ß" becomes "ss"): a tag longer than MAX_TAG_LENGTH once
+normalized doesn't fit Tag.name and is dropped."""
+
+import re
+
+MAX_TAG_LENGTH = 100 # Tag.name
+HASHTAG = re.compile(r"(?<![\w#&])#(\w{1,%d})" % MAX_TAG_LENGTH)
+MENTION = re.compile(r"(?<![\w@.])@(\w{1,150})")
+
+
+def normalize_tag(name):
+    return name.casefold()
+
+
+def hashtags(text):
+    """The normalized hashtags of `text`, in order of first appearance."""
+    names = (normalize_tag(name) for name in HASHTAG.findall(text or ""))
+    return list(dict.fromkeys(name for name in names if len(name) <= MAX_TAG_LENGTH))
+
+
+def mentions(text):
+    """The usernames mentioned in `text`, in order of first appearance."""
+    return list(dict.fromkeys(MENTION.findall(text or "")))
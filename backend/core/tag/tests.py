@@ -0,0 +1,64 @@
+import pytest
+from django.core.management import call_command
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.comment.models import Comment
+from core.fixtures.user import user
+from core.fixtures.post import post
+from core.post.models import Post
+from core.tag.models import PostMention, PostTag
+from core.tag.parser import hashtags, mentions
+
+
+def test_parser():
+    text = "#Django and #django, @test_user! mail me at a@b.com, see page#anchor &#39; #web_dev"
+
+    assert hashtags(text) == ["django", "web_dev"]
+    assert mentions(text) == ["test_user"]
+
+
+def test_tags_too_long_once_casefolded_are_dropped():
+    assert hashtags("#" + "ß" * 50 + " #" + "ß" * 51) == ["ss" * 50] # 100 and 102 characters once casefolded
+
+
+@pytest.mark.django_db
+def test_tag_and_mention_endpoints(client, user):
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+    for i in range(3):
+        response = client.post(
+            "/api/post/", {"author": user.public_id.hex, "body": f"Post {i} #Python @test_user"}, **headers
+        )
+        assert response.status_code == 201
+
+    first = client.get("/api/tag/python/posts/?page_size=2")
+    assert first.status_code == 200
+    assert [result["body"] for result in first.json()["results"]] == ["Post 2 #Python @test_user", "Post 1 #Python @test_user"]
+    assert first.json()["results"][0]["author"]["username"] == user.username
+
+    second = client.get(first.json()["next"])
+    assert [result["body"] for result in second.json()["results"]] == ["Post 0 #Python @test_user"]
+
+    mentioned = client.get("/api/mention/test_user/posts/").json()["results"]
+    assert len(mentioned) == 3
+    assert client.get("/api/tag/unknown/posts/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_edit_replaces_tags(client, user, post):
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+
+    client.patch(f"/api/post/{post.public_id.hex}/", {"body": "Now about #rust"}, content_type="application/json", **headers)
+
+    assert list(PostTag.objects.filter(post=post).values_list("tag__name", flat=True)) == ["rust"]
+
+
+@pytest.mark.django_db
+def test_backfill_tags(user):
+    Post.objects.bulk_create([Post(author=user, body=f"#old{i % 2} hello @test_user") for i in range(5)])
+    Comment.objects.create(author=user, post=Post.objects.first(), body="#old0")
+
+    call_command("backfill_tags", chunk_size=2, stdout=open("/dev/null", "w"))
+    call_command("backfill_tags", chunk_size=2, stdout=open("/dev/null", "w")) # idempotent
+
+    assert PostTag.objects.filter(tag__name="old0").count() == 3
+    assert PostMention.objects.filter(user=user).count() == 5
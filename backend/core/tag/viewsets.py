@@ -0,0 +1,72 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny
+
+from core.abstract.compiled import represent_pks
+from core.auth.throttling import ThrottleFirstMixin
+from core.comment.models import Comment
+from core.comment.serializers import CommentSerializer
+from core.post.models import Post
+from core.post.serializers import PostSerializer
+from core.shard import router as sharding
+from core.shard.feed import ShardedQuerySet
+from core.tag.models import CommentMention, CommentTag, PostMention, PostTag, Tag
+from core.tag.pagination import LinkCursorPagination
+from core.tag.parser import normalize_tag
+from core.user.models import User
+
+
+class LinkViewSet(ThrottleFirstMixin, viewsets.GenericViewSet):
+    """Pages of posts or comments read through a link table, newest first with a cursor."""
+    permission_classes = (AllowAny,)
+    pagination_class = LinkCursorPagination
+    http_method_names = ['get']
+
+    def links_response(self, links, field, model, serializer_class):
+        links = links.only('pk', 'created', f'{field}_id') #rows of the link table
+        using = None
+        if sharding.enabled(): #the links are with their posts, the pages of every shard merged
+            links, using = ShardedQuerySet(links), sharding.databases()
+        page = self.paginate_queryset(links)
+        pks = [getattr(link, f'{field}_id') for link in page]
+
+        serializer = serializer_class(context=self.get_serializer_context())
+        data = represent_pks(serializer, model, pks, using=using) #same output as the list endpoints, see core/abstract/compiled.py
+        return self.get_paginated_response(data) #soft-deleted posts and comments are skipped
+
+
+class TagViewSet(LinkViewSet):
+    lookup_field = 'name'
+    lookup_value_regex = r'[^/]+'
+
+    def get_tag(self):
+        return get_object_or_404(Tag, name=normalize_tag(self.kwargs['name'].lstrip('#')))
+
+    @action(methods=['get'], detail=True) #/api/tag/{name}/posts/
+    def posts(self, request, *args, **kwargs):
+        links = PostTag.objects.filter(tag=self.get_tag())
+        return self.links_response(links, 'post', Post, PostSerializer)
+
+    @action(methods=['get'], detail=True) #/api/tag/{name}/comments/
+    def comments(self, request, *args, **kwargs):
+        links = CommentTag.objects.filter(tag=self.get_tag())
+        return self.links_response(links, 'comment', Comment, CommentSerializer)
+
+
+class MentionViewSet(LinkViewSet):
+    lookup_field = 'username'
+    lookup_value_regex = r'[^/]+'
+
+    def get_user(self):
+        return get_object_or_404(User, username=self.kwargs['username'].lstrip('@'))
+
+    @action(methods=['get'], detail=True) #/api/mention/{username}/posts/ the posts mentioning @username
+    def posts(self, request, *args, **kwargs):
+        links = PostMention.objects.filter(user=self.get_user())
+        return self.links_response(links, 'post', Post, PostSerializer)
+
+    @action(methods=['get'], detail=True) #/api/mention/{username}/comments/
+    def comments(self, request, *args, **kwargs):
+        links = CommentMention.objects.filter(user=self.get_user())
+        return self.links_response(links, 'comment', Comment, CommentSerializer)
@@ -0,0 +1,60 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.batch import MAX_REQUESTS, groups
+from core.fixtures.user import user
+from core.fixtures.post import post
+
+
+@pytest.mark.django_db
+def test_batch_endpoint(client, user, post):
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+    path = f"/api/post/{post.public_id.hex}/"
+    requests = [
+        {"method": "GET", "path": path},
+        {"method": "GET", "path": f"{path}comment/?limit=5"},
+        {"method": "GET", "path": f"/api/user/{user.public_id.hex}/"},
+        {"method": "POST", "path": f"{path}like/"},
+        {"method": "GET", "path": path},
+        {"method": "POST", "path": f"{path}comment/", "body": {"author": user.public_id.hex, "post": post.public_id.hex, "body": "Hi"}},
+        {"method": "GET", "path": "/api/nothing/"},
+        {"method": "GET", "path": "/api/batch/"},
+        {"method": "TRACE", "path": path},
+    ]
+    response = client.post("/api/batch/", {"requests": requests}, content_type="application/json", **headers)
+
+    assert response.status_code == 200
+    responses = response.json()["responses"]
+    assert [r["status"] for r in responses] == [200, 200, 200, 200, 200, 201, 404, 400, 400]
+    assert responses[0]["body"]["liked"] is False and responses[4]["body"]["liked"] is True
+    assert responses[2]["body"]["username"] == user.username
+    assert responses[5]["body"]["body"] == "Hi"
+
+    # the sub-requests need the user of the batch
+    anonymous = client.post("/api/batch/", {"requests": [{"method": "POST", "path": f"{path}like/"}]}, content_type="application/json")
+    assert anonymous.json()["responses"][0]["status"] == 401
+
+    too_many = [{"method": "GET", "path": path}] * (MAX_REQUESTS + 1)
+    assert client.post("/api/batch/", {"requests": too_many}, content_type="application/json", **headers).status_code == 400
+
+
+@pytest.mark.django_db
+def test_batch_loads_objects_once(client, user, post):
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+    one = {"requests": [{"method": "GET", "path": f"/api/post/{post.public_id.hex}/"}]}
+    two = {"requests": one["requests"] * 2}
+
+    client.post("/api/batch/", one, content_type="application/json", **headers) # builds the revocation filter
+    with CaptureQueriesContext(connection) as single:
+        client.post("/api/batch/", one, content_type="application/json", **headers)
+    with CaptureQueriesContext(connection) as double:
+        client.post("/api/batch/", two, content_type="application/json", **headers)
+    # the second GET of the same post doesn't load the post again, nor the user of the token
+    assert len(double) - len(single) < len(single) - 1
+
+
+def test_batch_groups():
+    items = [{"method": "GET"}, {"method": "get"}, {"method": "POST"}, {}, "nope", {"method": "GET"}]
+    assert [[index for index, _ in run] for run in groups(items)] == [[0, 1], [2], [3], [4], [5]]
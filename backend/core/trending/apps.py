@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class TrendingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core.trending'
+    label = 'core_trending'
+
+    def ready(self):
+        from core.trending import signals  # noqa: F401 connects the receivers recording likes, comments and tags
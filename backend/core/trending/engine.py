@@ -0,0 +1,175 @@
+"""Trending posts and tags without GROUP BY over the likes, comments or tag tables.
+
+Writes: every like, unlike, comment and tag use appends its points for the current BUCKET_SECONDS of time to
+TrendEvent (one INSERT, no row shared with the other events of a viral post). refresh() first adds the queued
+events up into the TrendBucket row of their object and bucket, FOLD_CHUNK events at a time, and deletes them.
+
+Scores: an event of `points` at time t is worth points * 2 ** (-(now - t) / HALF_LIFE) now. The factor of now
+is the same for every object, so the ranking is kept with scores relative to a fixed reference time, the
+epoch of TrendingState:
+
+    score = sum(points * 2 ** ((t - epoch) / HALF_LIFE))
+
+An event only ever adds to the score of its object, older scores never need to be decayed again. refresh()
+reads the buckets that got points since the previous refresh (only the current buckets can get any), adds
+the points not applied yet to the TrendScore rows, then copies the TOP_K best of each kind into TrendingItem,
+which is all /api/trending/ reads. The work is proportional to the new events, whatever the history.
+
+The relative scores grow by 2 every HALF_LIFE, so every REBASE_HALF_LIVES the epoch is moved forward and the
+scores divided accordingly; the scores too small to ever trend again are deleted at the same time."""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.trending.models import POST, TAG, TrendBucket, TrendEvent, TrendingItem, TrendingState, TrendScore
+
+BUCKET_SECONDS = 300
+HALF_LIFE = 6 * 3600 # seconds for an event to lose half of its weight
+TOP_K = 50
+RETENTION = timedelta(days=2) # applied buckets are deleted after it
+REBASE_HALF_LIVES = 64
+FORGET = 2 ** -40 # scores below FORGET times the best score are deleted by a rebase
+FOLD_CHUNK = 10000 # events added up into the buckets per query
+
+LIKE_POINTS = 1
+COMMENT_POINTS = 2
+TAG_POINTS = 1
+
+
+def bucket_of(when):
+    return int(when.timestamp()) // BUCKET_SECONDS
+
+
+def bucket_time(bucket):
+    return datetime.fromtimestamp(bucket * BUCKET_SECONDS, tz=dt_timezone.utc)
+
+
+def record(kind, object_id, points, when=None):
+    """Add `points` (negative for an unlike) to the object in the bucket of `when`, now by default. Events
+    older than the current bucket were already refreshed past and are ignored, e.g. links written by
+    backfill_tags."""
+    now = timezone.now()
+    bucket = bucket_of(when or now)
+    if bucket < bucket_of(now) - 1 or not points:
+        return
+    TrendEvent.objects.create(kind=kind, object_id=object_id, bucket=bucket, points=points)
+
+
+def record_tags(tag_ids, when=None):
+    now = timezone.now()
+    bucket = bucket_of(when or now)
+    if bucket < bucket_of(now) - 1:
+        return
+    counts = defaultdict(int)
+    for tag_id in tag_ids:
+        counts[tag_id] += TAG_POINTS
+    TrendEvent.objects.bulk_create(
+        [TrendEvent(kind=TAG, object_id=tag_id, bucket=bucket, points=points) for tag_id, points in counts.items()]
+    )
+
+
+def _fold():
+    # the queued events into their buckets; only refresh() writes the buckets, under the lock of _state()
+    while True:
+        events = list(TrendEvent.objects.order_by('pk').values_list('pk', 'kind', 'object_id', 'bucket', 'points')[:FOLD_CHUNK])
+        if not events:
+            return
+        sums = defaultdict(int)
+        for _, kind, object_id, bucket, points in events:
+            sums[kind, object_id, bucket] += points
+        existing = {
+            (row.kind, row.object_id, row.bucket): row
+            for row in TrendBucket.objects.filter(
+                bucket__in={key[2] for key in sums}, object_id__in={key[1] for key in sums}
+            ).only('pk', 'kind', 'object_id', 'bucket', 'points')
+            if (row.kind, row.object_id, row.bucket) in sums
+        }
+        for key, row in existing.items():
+            row.points += sums[key]
+        TrendBucket.objects.bulk_update(existing.values(), ['points'], batch_size=500)
+        TrendBucket.objects.bulk_create(
+            [TrendBucket(kind=key[0], object_id=key[1], bucket=key[2], points=points) for key, points in sums.items() if key not in existing],
+            batch_size=500,
+        )
+        TrendEvent.objects.filter(pk__in=[event[0] for event in events]).delete() # the ones committed since stay
+        if len(events) < FOLD_CHUNK:
+            return
+
+
+def _weight(when, epoch):
+    return 2 ** ((when - epoch).total_seconds() / HALF_LIFE)
+
+
+def _state():
+    state = TrendingState.objects.select_for_update().filter(pk=1).first() # also keeps two refreshes apart
+    if state is None:
+        TrendingState.objects.get_or_create(pk=1, defaults={'epoch': timezone.now()})
+        state = TrendingState.objects.select_for_update().get(pk=1)
+    return state
+
+
+def _rebase(state, now):
+    half_lives = int((now - state.epoch).total_seconds() // HALF_LIFE)
+    if half_lives < REBASE_HALF_LIVES:
+        return
+    TrendScore.objects.update(score=F('score') * 2.0 ** -half_lives)
+    state.epoch += timedelta(seconds=half_lives * HALF_LIFE)
+    for kind in (POST, TAG):
+        best = TrendScore.objects.filter(kind=kind).order_by('-score').values_list('score', flat=True).first()
+        if best:
+            TrendScore.objects.filter(kind=kind, score__lt=best * FORGET).delete()
+
+
+def refresh(now=None, top_k=TOP_K):
+    """Apply the new points to the scores and rewrite TrendingItem, returns the number of buckets applied."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        state = _state()
+        _fold()
+        _rebase(state, now)
+
+        rows = list(
+            TrendBucket.objects.filter(bucket__gte=state.last_bucket)
+            .exclude(points=F('applied'))
+            .values_list('pk', 'kind', 'object_id', 'bucket', 'points', 'applied')
+        )
+        deltas = defaultdict(float)
+        for pk, kind, object_id, bucket, points, applied in rows:
+            deltas[kind, object_id] += (points - applied) * _weight(bucket_time(bucket), state.epoch)
+        # the events queued while this runs are folded by the next refresh
+        TrendBucket.objects.bulk_update(
+            [TrendBucket(pk=pk, applied=points) for pk, _, _, _, points, _ in rows], ['applied'], batch_size=500
+        )
+
+        for kind in (POST, TAG):
+            ids = [object_id for (delta_kind, object_id) in deltas if delta_kind == kind]
+            scores = {score.object_id: score for score in TrendScore.objects.filter(kind=kind, object_id__in=ids)}
+            for object_id in ids:
+                if object_id in scores:
+                    scores[object_id].score += deltas[kind, object_id]
+            TrendScore.objects.bulk_update(scores.values(), ['score'], batch_size=500)
+            TrendScore.objects.bulk_create(
+                [TrendScore(kind=kind, object_id=i, score=deltas[kind, i]) for i in ids if i not in scores],
+                batch_size=500,
+            )
+
+            decay = _weight(state.epoch, now) # from relative to the epoch to decayed until now
+            best = TrendScore.objects.filter(kind=kind, score__gt=0).order_by('-score')[:top_k]
+            TrendingItem.objects.filter(kind=kind).delete()
+            TrendingItem.objects.bulk_create(
+                [
+                    TrendingItem(kind=kind, rank=rank, object_id=score.object_id, score=score.score * decay)
+                    for rank, score in enumerate(best, start=1)
+                ]
+            )
+
+        state.last_bucket = bucket_of(now) - 1 # a late event can still land in the previous bucket
+        state.refreshed = now
+        state.save()
+        TrendBucket.objects.filter(bucket__lt=bucket_of(now - RETENTION), points=F('applied')).delete()
+    return len(rows)
+
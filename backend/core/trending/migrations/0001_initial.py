@@ -0,0 +1,64 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField()),
+                ('last_bucket', models.IntegerField(default=0)),
+                ('refreshed', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('tag', 'Tag')], max_length=8)),
+                ('object_id', models.BigIntegerField()),
+                ('bucket', models.IntegerField()),
+                ('points', models.IntegerField(default=0)),
+                ('applied', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='trend_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id', 'bucket'), name='unique_trend_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('tag', 'Tag')], max_length=8)),
+                ('rank', models.PositiveIntegerField()),
+                ('object_id', models.BigIntegerField()),
+                ('score', models.FloatField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'rank'), name='unique_trending_rank')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('tag', 'Tag')], max_length=8)),
+                ('object_id', models.BigIntegerField()),
+                ('score', models.FloatField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', '-score'], name='trend_score_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_trend_score')],
+            },
+        ),
+    ]
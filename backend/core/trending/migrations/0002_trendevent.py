@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_trending', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('tag', 'Tag')], max_length=8)),
+                ('object_id', models.BigIntegerField()),
+                ('bucket', models.IntegerField()),
+                ('points', models.IntegerField()),
+            ],
+        ),
+    ]
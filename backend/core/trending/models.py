@@ -0,0 +1,59 @@
+"""Tables of the trending engine, see core/trending/engine.py."""
+
+from django.db import models
+
+POST = 'post'
+TAG = 'tag'
+KINDS = [(POST, 'Post'), (TAG, 'Tag')]
+
+
+class TrendBucket(models.Model):
+    """Points (likes, comments, tag uses) an object got during one bucket of time. `applied` is the part of
+    `points` already added to its TrendScore by a refresh."""
+    kind = models.CharField(max_length=8, choices=KINDS)
+    object_id = models.BigIntegerField()
+    bucket = models.IntegerField() #start of the bucket in seconds since 1970 // BUCKET_SECONDS
+    points = models.IntegerField(default=0)
+    applied = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['kind', 'object_id', 'bucket'], name='unique_trend_bucket')]
+        indexes = [models.Index(fields=['bucket'], name='trend_bucket_idx')]
+
+
+class TrendEvent(models.Model):
+    """The queue between the likes, comments and tag uses and the refresh (core/trending/engine.py): an event
+    costs one INSERT, never an update of the TrendBucket row that a viral post would make hot."""
+    kind = models.CharField(max_length=8, choices=KINDS)
+    object_id = models.BigIntegerField()
+    bucket = models.IntegerField()
+    points = models.IntegerField()
+
+
+class TrendScore(models.Model):
+    """Decayed score of an object, relative to TrendingState.epoch."""
+    kind = models.CharField(max_length=8, choices=KINDS)
+    object_id = models.BigIntegerField()
+    score = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_trend_score')]
+        indexes = [models.Index(fields=['kind', '-score'], name='trend_score_idx')]
+
+
+class TrendingItem(models.Model):
+    """The top TOP_K of each kind at the last refresh, what /api/trending/ reads."""
+    kind = models.CharField(max_length=8, choices=KINDS)
+    rank = models.PositiveIntegerField()
+    object_id = models.BigIntegerField()
+    score = models.FloatField() #decayed to the time of the refresh
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['kind', 'rank'], name='unique_trending_rank')]
+
+
+class TrendingState(models.Model):
+    """Single row: the reference time of the scores and how far the refreshes got."""
+    epoch = models.DateTimeField()
+    last_bucket = models.IntegerField(default=0) #buckets before it have no points left to apply
+    refreshed = models.DateTimeField(null=True)
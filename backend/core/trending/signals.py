@@ -0,0 +1,29 @@
+"""Likes and comments are queued for the trending buckets, see core/trending/engine.py. Tag uses are recorded by
+core.tag.links.link()."""
+
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from core.comment.models import Comment
+from core.trending.engine import COMMENT_POINTS, LIKE_POINTS, record
+from core.trending.models import POST
+from core.user.models import User
+
+
+@receiver(m2m_changed, sender=User.posts_liked.through)
+def like_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # User.like() and remove_like() (or post.liked_by.add()); for post_add, pk_set only has the new likes
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse: #instance is the post, pk_set the users
+        record(POST, instance.pk, sign * LIKE_POINTS * len(pk_set))
+    else:
+        for post_id in pk_set:
+            record(POST, post_id, sign * LIKE_POINTS)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        record(POST, instance.post_id, COMMENT_POINTS, instance.created)
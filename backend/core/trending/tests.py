@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.comment.models import Comment
+from core.fixtures.user import user
+from core.fixtures.post import post
+from core.post.models import Post
+from core.trending import engine
+from core.trending.models import POST, TAG, TrendBucket, TrendEvent, TrendingItem, TrendScore
+from core.user.models import User
+
+
+@pytest.mark.django_db
+def test_events_are_queued_then_counted_in_buckets(user, post):
+    user.like(post)
+    user.like(post) # already liked, not counted again
+    Comment.objects.create(author=user, post=post, body="Nice")
+    other = Post.objects.create(author=user, body="Other")
+    user.like(other)
+    user.remove_like(other)
+
+    assert not TrendBucket.objects.exists() # only INSERTs into the queue, no row shared by the events of a post
+    assert TrendEvent.objects.count() == 4
+    engine.refresh()
+
+    assert not TrendEvent.objects.exists()
+    points = dict(TrendBucket.objects.filter(kind=POST).values_list("object_id", "points"))
+    assert points == {post.pk: engine.LIKE_POINTS + engine.COMMENT_POINTS, other.pk: 0}
+
+
+@pytest.mark.django_db
+def test_refresh_and_endpoint(client, user, post):
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+    client.post("/api/post/", {"author": user.public_id.hex, "body": "#django #python"}, **headers)
+    client.post("/api/post/", {"author": user.public_id.hex, "body": "#python"}, **headers)
+    quiet = Post.objects.create(author=user, body="Nobody likes me")
+    user.like(post)
+    fan = User.objects.create_user(username="fan", email="fan@test.com", password="test_password", first_name="F", last_name="an")
+    fan.like(quiet)
+    fan.like(post)
+
+    assert engine.refresh() > 0
+
+    data = client.get("/api/trending/").json()
+    assert [item["id"] for item in data["posts"]] == [post.public_id.hex, quiet.public_id.hex]
+    assert [tag["name"] for tag in data["tags"]] == ["python", "django"]
+
+    # nothing new: no bucket applied, same top
+    assert engine.refresh() == 0
+    assert TrendingItem.objects.filter(kind=POST).count() == 2
+
+    # a deleted post drops out of the response without a refresh
+    post.soft_delete()
+    assert [item["id"] for item in client.get("/api/trending/").json()["posts"]] == [quiet.public_id.hex]
+
+
+@pytest.mark.django_db
+def test_refresh_only_reads_new_buckets(user, post, django_assert_max_num_queries):
+    engine.refresh()
+    for i in range(20):
+        engine.record(POST, post.pk, 1)
+    engine.refresh()
+    # old applied buckets, outside of what a refresh reads
+    TrendBucket.objects.bulk_create(
+        [TrendBucket(kind=TAG, object_id=i, bucket=1000 + i, points=5, applied=5) for i in range(200)]
+    )
+
+    user.like(post)
+    with django_assert_max_num_queries(18): # the same whatever the number of old buckets and scores, 4 fold the queue
+        assert engine.refresh() == 1
+    assert TrendScore.objects.get(kind=POST, object_id=post.pk).score > 20
+
+
+@pytest.mark.django_db
+def test_older_events_weigh_less(user):
+    now = timezone.now()
+    old, new = (Post.objects.create(author=user, body=body) for body in ("old", "new"))
+    engine.refresh(now=now)
+    for _ in range(3):
+        engine.record(POST, old.pk, 1, now)
+    engine.refresh(now=now)
+
+    later = now + timedelta(seconds=2 * engine.HALF_LIFE)
+    engine.record(POST, new.pk, 1, later)
+    engine.refresh(now=later)
+
+    items = list(TrendingItem.objects.filter(kind=POST).order_by("rank").values_list("object_id", "score"))
+    # 3 points two half-lives old are worth 0.75 now, less than the single new point
+    assert [object_id for object_id, _ in items] == [new.pk, old.pk]
+    assert items[1][1] == pytest.approx(0.75, rel=0.05)
@@ -0,0 +1,34 @@
+from rest_framework import viewsets
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from core.abstract.compiled import represent_pks
+from core.auth.throttling import ThrottleFirstMixin
+from core.post.models import Post
+from core.post.serializers import PostSerializer
+from core.shard.router import databases, enabled
+from core.tag.models import Tag
+from core.trending.models import POST, TAG, TrendingItem, TrendingState
+
+
+class TrendingViewSet(ThrottleFirstMixin, viewsets.ViewSet):
+    """/api/trending/: the top posts and tags of the last refresh (manage.py refresh_trending), read from
+    the TrendingItem table only: a fixed number of queries for at most TOP_K rows of each kind."""
+    permission_classes = (AllowAny,)
+    http_method_names = ['get']
+
+    def list(self, request):
+        items = {POST: [], TAG: []}
+        for kind, object_id, score in TrendingItem.objects.order_by('kind', 'rank').values_list('kind', 'object_id', 'score'):
+            items[kind].append((object_id, score))
+
+        serializer = PostSerializer(context={'request': request, 'view': self, 'format': self.format_kwarg})
+        using = databases() if enabled() else None #the posts are on their author's shard
+        posts = represent_pks(serializer, Post, [object_id for object_id, _ in items[POST]], using=using)
+        names = dict(Tag.objects.filter(pk__in=[object_id for object_id, _ in items[TAG]]).values_list('pk', 'name'))
+        refreshed = TrendingState.objects.filter(pk=1).values_list('refreshed', flat=True).first()
+        return Response({
+            'refreshed': refreshed,
+            'posts': posts, #soft-deleted posts are left out
+            'tags': [{'name': names[object_id], 'score': round(score, 3)} for object_id, score in items[TAG] if object_id in names],
+        })
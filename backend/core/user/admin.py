@@ -1,13 +1,14 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from core.abstract.admin import LargeTableAdminMixin, SoftDeleteAdminMixin
 from .models import User
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(LargeTableAdminMixin, SoftDeleteAdminMixin, BaseUserAdmin):
     list_display = ('email', 'username', 'first_name', 'last_name', 'is_staff', 'is_active')
     list_filter = ('is_staff', 'is_active', 'is_superuser')
-    search_fields = ('email', 'username', 'first_name', 'last_name')
-    ordering = ('email',)
+    search_fields = ('email', 'username', 'first_name', 'last_name') #trigram indexes of migrations 0007 and 0009 on PostgreSQL, also used by the autocomplete of the post and comment authors
+    ordering = ('email',) #unique, so indexed
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         ('Personal info', {'fields': ('username', 'first_name', 'last_name', 'bio', 'avatar')}),
@@ -1,7 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core.user'
     label = 'core_user'
+
+    def ready(self):
+        from core.user.models import User
+        from core.user.search import user_saved
+        post_save.connect(user_saved, sender=User) #keeps the prefix index of /api/user/search/ up to date
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:45
+
+from django.db import migrations, models
+
+SEARCH_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # GIN trigram indexes for the icontains lookups of /api/user/search/ (core/user/search.py). Django writes
+    # them UPPER("column"::text) LIKE UPPER('%q%'), the indexes are on the same expression.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return # the search still works, with a scan of the users table
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS user_{field}_trgm ON core_user_user '
+            f'USING gin (UPPER("{field}"::text) gin_trgm_ops) WHERE deleted IS NULL'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS user_{field}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core_post', '0003_post_deleted'),
+        ('core_user', '0006_user_deleted'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['updated'], name='user_updated_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
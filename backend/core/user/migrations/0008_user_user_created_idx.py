@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core_post', '0005_post_post_created_idx'),
+        ('core_user', '0007_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created'], name='user_created_idx'),
+        ),
+    ]
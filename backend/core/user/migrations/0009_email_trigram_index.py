@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:28
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN trigram index for the email search of the user admin, next to the ones of 0007_search_indexes. Django writes the icontains lookups
+    # UPPER("email"::text) LIKE UPPER('%q%'), the index is on the same expression.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return # the search still works, with a scan of the table
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS user_email_trgm ON core_user_user '
+        'USING gin (UPPER("email"::text) gin_trgm_ops) WHERE deleted IS NULL'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS user_email_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_user', '0008_user_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
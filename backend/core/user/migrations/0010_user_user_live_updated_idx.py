@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core_post', '0007_post_post_live_updated_idx'),
+        ('core_user', '0009_email_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('deleted__isnull', True)), fields=['-updated'], name='user_live_updated_idx'),
+        ),
+    ]
@@ -11,15 +11,16 @@ from django.core.exceptions import ObjectDoesNotExist  #an exception raised when
                                                     #matching object (e.g., Model.objects.get() with no result).
 from django.http import Http404 # from the http module inside the Django package. 
 from core.abstract.models import AbstractModel, AbstractManager
+from core.abstract.objectcache import cached
 
 class UserManager(BaseUserManager, AbstractManager):
     def get_object_by_public_id(self, public_id):#This method tries to find and return an object with the given 
                                                     #public_id; if found, it returns the matching instance.
         try:
-            instance = self.get(public_id = public_id) #Calls a custom 'get' method (likely defined in the same class) to fetch a single object using its public_id (a unique identifier).
+            instance = cached((self.model, str(public_id)), lambda: self.get(public_id = public_id)) #Calls a custom 'get' method (likely defined in the same class) to fetch a single object using its public_id (a unique identifier).
             return instance
         except(ObjectDoesNotExist, ValueError, TypeError):
-            return Http404
+            raise Http404
     
     def create_user(self, username, email, password=None, **kwargs): #pasword=None means means the password is optional when calling create_user. This allows flexibility — if no password is passed, the method can still run (e.g., for inactive users or external auth), and you can handle it manually inside the function.
         """Create and return a `User` with an email, phone
@@ -75,12 +76,13 @@ class User(AbstractModel, AbstractBaseUser, PermissionsMixin):
     
     def like(self, post):
         #Like post if it hasn't been done yet
-        return self.posts_liked.add(post) #add method from models is used to add the liked post to liked_posts
+        return post.liked_by.add(self) #add method from models is used to add the liked post to liked_posts, from the post's side:
+                                       #the like is written on the post's database when the posts are sharded (core/shard/router.py)
     def remove_like(self, post):
-        return self.posts_liked.remove(post) #remove method is from models
+        return post.liked_by.remove(self) #remove method is from models
 
     def has_liked(self, post):                              #post in self.posts_liked loads the entire posts_liked queryset into memory.
-        return self.posts_liked.filter(pk=post.pk).exists() #Using .filter(...).exists() as It runs a single optimized database query to check if a like exists. It does not fetch all liked posts into memory.
+        return post.liked_by.filter(pk=self.pk).exists() #read where the post is. Using .filter(...).exists() as It runs a single optimized database query to check if a like exists. It does not fetch all liked posts into memory.
                                                             # there's no restriction that you must use only Django ORM in model methods — you can use regular Python logic freely. Django encourages ORM usage for interacting with the database, as it's optimized, secure, and integrates cleanly with Django features.
                                                             #.exists() is not a model method, but a QuerySet method in Django ORM.
     
@@ -90,6 +92,14 @@ class User(AbstractModel, AbstractBaseUser, PermissionsMixin):
     @property
     def name(self):
         return f"{self.first_name} {self.last_name}" #@property turns a method into a read-only attribute, letting you access it like a variable (e.g., user.name instead of user.name()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated'], name='user_updated_idx'), #the -updated list order and the sync of core/user/search.py
+            models.Index(fields=['created'], name='user_created_idx'), #the range read by each analytics rollup
+            models.Index(fields=['-updated'], name='user_live_updated_idx', condition=models.Q(deleted__isnull=True)), #the user list, SQLite would pick the `deleted` index and sort
+        ]
+        # the trigram indexes of the search are PostgreSQL only, see migration 0007
     
 
 """ Instead of adding fields such as likes_count in the Post model and generating more fields in 
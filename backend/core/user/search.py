@@ -0,0 +1,179 @@
+"""Type-ahead search of users on username, first_name and last_name.
+
+Queries of 3 characters and more are substring matches (icontains) done by the database. On PostgreSQL the
+trigram GIN indexes of migration 0007 serve them, a trigram index is the only kind that helps a LIKE '%q%'.
+
+Queries of 1 or 2 characters match too many rows for any index to help, so they are answered from memory:
+PrefixIndex keeps, for every prefix of up to SHORT characters of the three fields, the KEEP users with the
+smallest usernames starting with it. It is built on the first search of the process (in a thread, the
+database answers meanwhile), kept up to date by the User post_save signal for the saves of this process,
+and by sync() for the ones of other processes: every SYNC_SECONDS one indexed query on `updated`/`deleted`
+reloads the users changed since. Everything is rebuilt every REBUILD_SECONDS, e.g. to fill again the prefixes
+which lost users."""
+
+import bisect
+import threading
+import time
+from datetime import timedelta
+
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from core.user.models import User
+
+SHORT = 2
+KEEP = 50
+LIMIT = 20 # at most LIMIT results, KEEP leaves room for the users removed between two rebuilds
+SYNC_SECONDS = 5
+REBUILD_SECONDS = 3600
+FIELDS = ('username', 'first_name', 'last_name')
+INDEXED_FIELDS = {'username', 'first_name', 'last_name', 'is_superuser', 'is_active', 'deleted'}
+
+
+def searchable():
+    """The users any search can return, superusers are only listed to superusers (see UserViewSet)."""
+    return User.objects.filter(is_superuser=False, is_active=True)
+
+
+def _prefixes(values):
+    prefixes = set()
+    for value in values:
+        value = (value or '').lower()
+        prefixes.update(value[:n] for n in range(1, min(SHORT, len(value)) + 1))
+    return prefixes
+
+
+class PrefixIndex:
+    def __init__(self, rebuild_seconds=REBUILD_SECONDS, sync_seconds=SYNC_SECONDS):
+        self.rebuild_seconds = rebuild_seconds
+        self.sync_seconds = sync_seconds
+        self._lists = None # prefix -> sorted [(username, pk)], the first KEEP users of the prefix
+        self._full = set() # prefixes which had more than KEEP users
+        self._stale = set() # full prefixes that lost users, answered by the database until the next rebuild
+        self._where = {} # pk -> the prefixes listing it
+        self._built = 0.0
+        self._synced = None
+        self._building = False
+        self._pending = set() # pks saved during a rebuild, applied once it's done
+        self._lock = threading.RLock()
+
+    def rebuild(self):
+        started = timezone.now()
+        with self._lock:
+            self._building = True
+            self._pending = set()
+        lists, full, where = {}, set(), {}
+        rows = searchable().order_by('pk').values_list('pk', *FIELDS)
+        for pk, username, first_name, last_name in rows.iterator(chunk_size=5000):
+            self._insert(lists, full, where, pk, username, (username, first_name, last_name))
+        with self._lock:
+            self._lists, self._full, self._stale, self._where = lists, full, set(), where
+            self._built = time.monotonic()
+            self._synced = started
+            self._building = False
+            pending, self._pending = self._pending, set()
+        if pending:
+            self.reload(pending)
+
+    @staticmethod
+    def _insert(lists, full, where, pk, username, values):
+        entry = (username.lower(), pk)
+        for prefix in _prefixes(values):
+            entries = lists.setdefault(prefix, [])
+            if prefix in full and entry > entries[-1]:
+                continue
+            bisect.insort(entries, entry)
+            where.setdefault(pk, set()).add(prefix)
+            if len(entries) > KEEP:
+                _, dropped = entries.pop()
+                full.add(prefix)
+                where[dropped].discard(prefix)
+
+    def _remove(self, pk):
+        for prefix in self._where.pop(pk, ()):
+            entries = self._lists[prefix]
+            entries[:] = [entry for entry in entries if entry[1] != pk]
+            if prefix in self._full and len(entries) < KEEP:
+                self._stale.add(prefix) #users past the KEEP first ones are not known anymore
+
+    def reload(self, pks):
+        """Apply the current state of the users `pks` to the index."""
+        with self._lock:
+            if self._lists is None and not self._building:
+                return
+            if self._building:
+                self._pending.update(pks)
+                return
+        users = {pk: values for pk, *values in searchable().filter(pk__in=pks).values_list('pk', *FIELDS)}
+        with self._lock:
+            if self._lists is None:
+                return
+            for pk in pks:
+                self._remove(pk)
+                if pk in users:
+                    self._insert(self._lists, self._full, self._where, pk, users[pk][0], users[pk])
+
+    def sync(self):
+        """Reload the users saved by other processes since the last sync."""
+        now = timezone.now()
+        since = self._synced - timedelta(seconds=2) # transactions that committed late
+        changed = User.objects.with_deleted().filter(Q(updated__gte=since) | Q(deleted__gte=since))
+        pks = list(changed.values_list('pk', flat=True))
+        self._synced = now
+        if pks:
+            self.reload(pks)
+
+    def _ready(self):
+        with self._lock:
+            building, lists = self._building, self._lists
+            expired = time.monotonic() - self._built > self.rebuild_seconds
+        if not building and (lists is None or expired):
+            with self._lock:
+                self._building = True
+            threading.Thread(target=self.rebuild, daemon=True).start()
+        if lists is None:
+            return False
+        if (timezone.now() - self._synced).total_seconds() > self.sync_seconds:
+            self.sync()
+        return True
+
+    def lookup(self, prefix, limit=LIMIT):
+        """pks of the first `limit` users by username with a field starting with `prefix`, or None when the
+        database has to answer."""
+        prefix = prefix.lower()
+        if not 0 < len(prefix) <= SHORT or limit > KEEP or not self._ready():
+            return None
+        with self._lock:
+            if prefix in self._stale:
+                return None
+            return [pk for _, pk in self._lists.get(prefix, [])[:limit]]
+
+
+prefix_index = PrefixIndex()
+
+
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # connected to post_save in UserConfig.ready(); a login only saves last_login
+    if update_fields is None or INDEXED_FIELDS.intersection(update_fields):
+        prefix_index.reload([instance.pk])
+
+
+def search(q, limit=LIMIT, queryset=None):
+    """pks of the users matching `q`, ordered by username. Every word of `q` has to match one of the fields:
+    at the start for words of up to SHORT characters, anywhere for longer ones."""
+    words = q.split()
+    if not words:
+        return []
+    if queryset is None:
+        if len(words) == 1:
+            pks = prefix_index.lookup(words[0], limit)
+            if pks is not None:
+                return pks
+        queryset = searchable()
+    for word in words:
+        lookup = 'istartswith' if len(word) <= SHORT else 'icontains'
+        queryset = queryset.filter(
+            Q(**{f'username__{lookup}': word}) | Q(**{f'first_name__{lookup}': word}) | Q(**{f'last_name__{lookup}': word})
+        )
+    return list(queryset.order_by(Lower('username'), 'pk').values_list('pk', flat=True)[:limit])
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from core.user.models import User
 from core.abstract.serializers import AbstractSerializer
 
@@ -9,4 +10,10 @@ class UserSerializer(AbstractSerializer):
         fields = ['id', 'username', 'first_name',
                   'last_name', 'bio', 'avatar', 'email',
                   'is_active', 'created', 'updated'] # include only the listed fields in the serialized output — controlling what data is exposed via the API.
-        read_only_field = ['is_active',]
\ No newline at end of file
+        read_only_field = ['is_active',]
+        # the unique username and email are checked against every user, the soft-deleted ones included: they keep
+        # theirs until the reaper deletes them, User.objects (which hides them) would let a duplicate reach the database
+        extra_kwargs = {
+            'username': {'validators': [UniqueValidator(User._base_manager.all(), message='user with this username already exists.')]},
+            'email': {'validators': [UniqueValidator(User._base_manager.all(), message='user with this email already exists.')]},
+        }
\ No newline at end of file
@@ -3,6 +3,7 @@ from django.test import TestCase
 # Create your tests here.
 import pytest
 from .models import User
+from core.fixtures.user import user
 data_user = {
     "username": "test_user",
     "email" : "test@gmail.com",
@@ -38,3 +39,91 @@ def test_create_superuser():
     assert user.last_name == data_superuser["last_name"]
     assert user.is_superuser == True
     assert user.is_staff == True
+
+
+@pytest.mark.django_db
+def test_reaper_deletes_soft_deleted_user_in_chunks(user):
+    from core.comment.models import Comment
+    from core.post.models import Post
+    from core.reaper import Reaper
+
+    other = User.objects.create_user(username="other", email="other@gmail.com", password="test_password")
+    posts = [Post.objects.create(author=user, body=f"Post {i}") for i in range(3)]
+    kept = Post.objects.create(author=other, body="Kept")
+    Comment.objects.create(author=other, post=posts[0], body="On a deleted post")
+    Comment.objects.create(author=user, post=kept, body="By a deleted user")
+    other.like(posts[1])
+    user.like(kept)
+    user.soft_delete()
+
+    assert not Post.objects.filter(author=user).exists() # hidden right away
+    chunks = []
+    counts = Reaper(chunk_size=2, pause=0, progress=lambda table, count: chunks.append(table)).run()
+
+    assert counts == {"comments": 2, "likes": 2, "posts": 3, "users": 1, "tombstones": 0, "revoked_tokens": 0, "token_cutoffs": 0}
+    assert chunks.count("posts") == 2
+    assert not User.objects.with_deleted().filter(pk=user.pk).exists()
+    assert list(Post.objects.all()) == [kept]
+    assert kept.liked_by.count() == 0
+
+
+@pytest.fixture
+def prefix_index(monkeypatch):
+    from core.user import search
+
+    index = search.PrefixIndex()
+    monkeypatch.setattr(search, "prefix_index", index)
+    return index
+
+
+def _people():
+    for username, first_name, last_name in [
+        ("john_doe", "John", "Doe"), ("jane", "Jane", "Johnson"), ("bob", "Bob", "Jones"), ("alice", "Alice", "Smith")
+    ]:
+        User.objects.create_user(
+            username=username, email=f"{username}@test.com", password="test_password", first_name=first_name, last_name=last_name
+        )
+
+
+@pytest.mark.django_db
+def test_search_endpoint(client, user, prefix_index):
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    _people()
+    prefix_index.rebuild()
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+
+    def usernames(q, **params):
+        response = client.get("/api/user/search/", {"q": q, **params}, **headers)
+        assert response.status_code == 200
+        return [result["username"] for result in response.json()["results"]]
+
+    assert usernames("jo") == ["bob", "jane", "john_doe"] # any field starting with "jo", from the prefix index
+    assert usernames("jo", limit=2) == ["bob", "jane"]
+    assert usernames("ohn") == ["jane", "john_doe"] # substring, from the database
+    assert usernames("jane joh") == ["jane"]
+    assert usernames("") == []
+
+
+@pytest.mark.django_db
+def test_prefix_index_follows_saves(user, prefix_index, django_assert_num_queries):
+    from core.user import search
+
+    _people()
+    prefix_index.rebuild()
+    alice = User.objects.get(username="alice")
+    with django_assert_num_queries(0):
+        assert search.search("al") == [alice.pk]
+
+    alice.first_name = "Zoe"
+    alice.save()
+    bob = User.objects.get(username="bob")
+    bob.soft_delete()
+    User.objects.create_user(username="albert", email="albert@test.com", password="test_password")
+
+    assert search.search("al") == [User.objects.get(username="albert").pk, alice.pk] # alice still by username
+    assert search.search("zo") == [alice.pk]
+    assert bob.pk not in search.search("b")
+    # the prefix index and the database agree
+    for q in ("j", "jo", "a", "zo", "b"):
+        assert search.search(q) == search.search(q, queryset=search.searchable())
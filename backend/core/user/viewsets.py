@@ -1,14 +1,19 @@
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from core.abstract.compiled import represent_pks
 from core.abstract.viewsets import AbstractViewSet
 
 from core.user.serializers import UserSerializer
 from core.user.models import User
+from core.user.search import LIMIT, search
 
 class UserViewSet(AbstractViewSet): # viewsets.ModelViewSet is a Django REST Framework class that provides default CRUD operations (list, create, retrieve, update, delete) for a model — all in one place.
     http_method_names = ('patch', 'get') #This restricts the viewset to accept only GET (read) and PATCH (partial update) HTTP methods — blocking others like POST, PUT, DELETE.
     permission_classes = (IsAuthenticated,) #This allows any user, authenticated or not, to access the view — no permission checks are enforced.
     serializer_class = UserSerializer
+    throttle_scopes = {'search': ('search-user',)} #type-ahead sends a request per key stroke, see core/auth/throttling.py
     
     def get_queryset(self):
         if self.request.user.is_superuser:#is_superuser is the actual attribute name of the User model in Django
@@ -19,6 +24,18 @@ class UserViewSet(AbstractViewSet): # viewsets.ModelViewSet is a Django REST Fra
         obj= User.objects.get_object_by_public_id(self.kwargs['pk'])#kwargs holds the URL parameters captured by the view (e.g., from /users/<pk>/). So self.kwargs['pk'] fetches the value of pk from the URL. pk stands for primary key — typically the unique ID of a model instance (like id or public_id)
         self.check_object_permissions(self.request, obj)  #checks if the current user (self.request.user) has permission to access the given object (obj) — raises a 403 error if not allowed.
         return obj
+
+    @action(methods=['get'], detail=False) #/api/user/search/?q=jo&limit=10 for the mention and "find friends" type-ahead
+    def search(self, request, *args, **kwargs):
+        try:
+            limit = min(max(int(request.query_params.get('limit', LIMIT)), 1), LIMIT)
+        except ValueError:
+            limit = LIMIT
+        #superusers also find superusers, so they skip the prefix index (see core/user/search.py)
+        queryset = User.objects.filter(is_active=True) if request.user.is_superuser else None
+        pks = search(request.query_params.get('q', ''), limit, queryset)
+        serializer = self.get_serializer()
+        return Response({'results': represent_pks(serializer, User, pks)})
     
     
 